@@ -1,41 +1,424 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import as_completed
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
-from langchain.chat_models import init_chat_model
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.runnables.config import get_executor_for_config
 from langgraph.prebuilt import create_react_agent
 
-from tools.dogapi_tools import list_dog_breeds, get_dog_breed, list_dog_facts, list_dog_groups, get_dog_group
+from apis.dogapi_facts import DOG_FACT_POOL_ENABLED
+from tools.dogapi_tools import get_dog_fact_pool, get_dog_index
+from tools.registry import get_tool_registry
+from model.chat_model import get_chat_model
+from agents.tool_execution import build_tool_node, timed_tools, TOOL_MAX_CONCURRENCY
+from agents.history import DogAgentState, HistoryWindow
+from agents.answer_cache import AnswerCache, ANSWER_CACHE_ENABLED
+from agents.intent_router import IntentRouter, INTENT_ROUTER_ENABLED
+from agents.tracing import tracing_handler
+from agents.prompt_cache import PROMPT_CACHE_STABLE, SYSTEM_PROMPT, sort_tools
+from agents.coordination import ThreadCoordinator
+from agents.batch import (
+    BATCH_MAX_CONCURRENCY, BATCH_MAX_ITEMS, BatchInput, BatchJournal, batch_result, batch_waves, normalize_items,
+)
+from memory.checkpointer import create_checkpointer
+from memory.memory_manager import ChatMemoryManager
+from utils.telemetry import activate, deactivate, span, start_span
 
+logger = logging.getLogger(__name__)
 
-from model.chat_model import chat_model
+TOOL_EVENT_OUTPUT_CHARS = 500
+DOG_INDEX_TOOLS = ("find_dog_breed", "list_breeds_in_group")
+
+
+async def _routed_events(exchange: List[Any], source: str = "intent_router") -> AsyncIterator[Dict[str, Any]]:
+    """
+    Replay a recorded exchange (an intent-router turn, or a cached [human, answer] pair)
+    as the graph events astream_events() would produce for it.
+    """
+    answer = exchange[-1]
+    for call, result in zip(exchange[1:-1:2], exchange[2:-1:2]):
+        tool_call = call.tool_calls[0]
+        tool_event = {"name": tool_call["name"], "run_id": tool_call["id"], "metadata": {"langgraph_node": "tools"}}
+        yield {**tool_event, "event": "on_tool_start", "data": {"input": tool_call["args"]}}
+        yield {**tool_event, "event": "on_tool_end", "data": {"output": result}}
+    model_event = {"name": source, "run_id": answer.id, "metadata": {"langgraph_node": "agent"}}
+    yield {**model_event, "event": "on_chat_model_stream", "data": {"chunk": AIMessageChunk(answer.content)}}
+    yield {**model_event, "event": "on_chat_model_end", "data": {"output": answer}}
 
 
 class DogChatAgent:
-    def __init__(self):
-        self.memory = MemorySaver()
-        self.tools = [list_dog_breeds, get_dog_breed, list_dog_facts, list_dog_groups, get_dog_group]
-        self.model = chat_model
-        self.agent_executor = create_react_agent(self.model, self.tools, checkpointer=self.memory)
+    def __init__(self, checkpointer=None, answer_cache=None, tools: Union[str, Sequence[str], None] = None,
+                 intent_router: Optional[bool] = None):
+        """
+        `tools` names the toolsets/tools to bind (see tools.registry); defaults to ENABLED_TOOLS.
+        `intent_router` answers simple tool requests without the LLM; defaults to INTENT_ROUTER_ENABLED.
+        """
+        self.answer_cache = answer_cache if answer_cache is not None else (AnswerCache() if ANSWER_CACHE_ENABLED else None)
+        self.memory = checkpointer if checkpointer is not None else create_checkpointer()
+        # One turn at a time per thread; duplicate submits with the same idempotency key share a result
+        self.coordinator = ThreadCoordinator()
+        self.model = get_chat_model()
+        self.history = HistoryWindow(summarizer=self.model, append_only=PROMPT_CACHE_STABLE)
+        self._graphs: Dict[Tuple[str, ...], Any] = {}
+        self._graphs_lock = threading.Lock()
+        self.tools = get_tool_registry().select(tools)
+        self.agent_executor = self.graph_for(self.tools)
+        use_router = INTENT_ROUTER_ENABLED if intent_router is None else intent_router
+        # Routed tool calls get the same per-tool timeouts as the graph's tool node
+        self.intent_router = IntentRouter(timed_tools(self.tools)) if use_router else None
+        self._uses_dog_index = any(tool.name in DOG_INDEX_TOOLS for tool in self.tools)
+        self._uses_fact_pool = DOG_FACT_POOL_ENABLED and any(tool.name == "list_dog_facts" for tool in self.tools)
+        # Warm the breed/group index so the first lookup doesn't page through the API
+        if self._uses_dog_index:
+            get_dog_index().prefetch()
+        if self._uses_fact_pool:
+            get_dog_fact_pool().prefetch()
+
+    def graph_for(self, tools: Union[str, Sequence[Any]]):
+        """
+        The compiled agent graph binding `tools` (tool objects, or names for the registry).
+        Graphs are built once per distinct tool set and share this agent's model,
+        checkpointer and history window, so they can serve the same threads.
+        """
+        if isinstance(tools, str) or any(isinstance(tool, str) for tool in tools):
+            tools = get_tool_registry().select(tools)
+        if PROMPT_CACHE_STABLE:
+            # Fixed system prompt and tool order keep every request's prefix cacheable by the provider
+            tools = sort_tools(tools)
+        key = tuple(tool.name for tool in tools)
+        graph = self._graphs.get(key)
+        if graph is None:
+            with self._graphs_lock:
+                graph = self._graphs.get(key)
+                if graph is None:
+                    graph = self._graphs[key] = create_react_agent(
+                        self.model,
+                        build_tool_node(tools),
+                        prompt=SYSTEM_PROMPT if PROMPT_CACHE_STABLE else None,
+                        checkpointer=self.memory,
+                        pre_model_hook=self.history,
+                        state_schema=DogAgentState,
+                    )
+        return graph
+
+    def warm_up(self):
+        """Load the breed index and fact pool, opening the pooled Dog API connections before the first request."""
+        if self._uses_dog_index:
+            get_dog_index().ensure_loaded()
+        if self._uses_fact_pool:
+            get_dog_fact_pool().ensure_loaded()
+
+    def memory_manager(self, thread_id: str) -> ChatMemoryManager:
+        return ChatMemoryManager(thread_id, self.agent_executor)
+
+    def _config(self, thread_id: str):
+        # Tool calls from one model step run as parallel tasks; cap how many run at once
+        return {"configurable": {"thread_id": thread_id}, "max_concurrency": TOOL_MAX_CONCURRENCY,
+                "callbacks": [tracing_handler]}
+
+    def _cached_exchange(self, human_message: str, has_history: bool):
+        """Return [HumanMessage, AIMessage] for a cached answer to a thread's first message, else None."""
+        if self.answer_cache is None or has_history:
+            return None
+        cached = self.answer_cache.lookup(human_message)
+        if cached is None:
+            return None
+        answer, match = cached
+        return [HumanMessage(human_message), AIMessage(answer, response_metadata={"answer_cache": match})]
 
-    def invoke(self, human_message: str, thread_id: str = "abc123"):
+    def _remember_answer(self, human_message: str, response):
+        if self.answer_cache is None or not response or not response.get("messages"):
+            return
+        messages = response["messages"]
+        if sum(isinstance(m, HumanMessage) for m in messages) != 1:
+            return  # not a context-free turn
+        tool_names = [call["name"] for m in messages if isinstance(m, AIMessage) for call in m.tool_calls]
+        if self.answer_cache.is_cacheable(tool_names) and isinstance(messages[-1].content, str):
+            self.answer_cache.store(human_message, messages[-1].content)
+
+    def invoke(self, human_message: str, thread_id: str = "abc123", idempotency_key: Optional[str] = None):
+        return self.coordinator.run(thread_id, idempotency_key, lambda: self._invoke_turn(human_message, thread_id))
+
+    def _invoke_turn(self, human_message: str, thread_id: str):
         input_message = {"role": "user", "content": human_message}
-        config = {"configurable": {"thread_id": thread_id}}
-        response = self.agent_executor.invoke({"messages": [input_message]}, config)
-        #for msg in response["messages"]:
-        #    msg.pretty_print()
-        #return response["messages"][-1].content if response["messages"] else None
-        return response
+        config = self._config(thread_id)
+        with span("agent.request", name="invoke", thread_id=thread_id) as request_span:
+            if self.intent_router is not None:
+                exchange = self.intent_router.route(human_message, config)
+                request_span.set_attribute("intent_routed", exchange is not None)
+                if exchange is not None:
+                    self.agent_executor.update_state(config, {"messages": exchange}, as_node="agent")
+                    return {"messages": exchange}
+            if self.answer_cache is not None:
+                has_history = bool(self.agent_executor.get_state(config).values.get("messages"))
+                exchange = self._cached_exchange(human_message, has_history)
+                request_span.set_attribute("answer_cache_hit", exchange is not None)
+                if exchange is not None:
+                    # Record the exchange so follow-up turns see it in the thread
+                    self.agent_executor.update_state(config, {"messages": exchange}, as_node="agent")
+                    return {"messages": exchange}
+            response = self.agent_executor.invoke({"messages": [input_message]}, config)
+            self._remember_answer(human_message, response)
+            return response
     
     def stream(self, human_message: str, thread_id: str = "abc123"):
+        """Run a turn and return the final message's content. Intermediate messages are logged at debug level."""
+        input_message = {"role": "user", "content": human_message}
+        config = self._config(thread_id)
+        last = state = None
+        with self.coordinator.lock(thread_id):
+            if self.answer_cache is not None:
+                has_history = bool(self.agent_executor.get_state(config).values.get("messages"))
+                exchange = self._cached_exchange(human_message, has_history)
+                if exchange is not None:
+                    self.agent_executor.update_state(config, {"messages": exchange}, as_node="agent")
+                    return exchange[-1].content
+            for state in self.agent_executor.stream({"messages": [input_message]}, config, stream_mode="values"):
+                if state["messages"]:
+                    last = state["messages"][-1]
+                    logger.debug("Thread %s %s message: %.200s", thread_id, last.type, last.content)
+            self._remember_answer(human_message, state)
+        return getattr(last, "content", None) if last is not None else None
+
+    async def ainvoke(self, human_message: str, thread_id: str = "abc123", idempotency_key: Optional[str] = None):
+        return await self.coordinator.arun(thread_id, idempotency_key,
+                                           lambda: self._ainvoke_turn(human_message, thread_id))
+
+    async def _ainvoke_turn(self, human_message: str, thread_id: str):
+        input_message = {"role": "user", "content": human_message}
+        config = self._config(thread_id)
+        with span("agent.request", name="ainvoke", thread_id=thread_id) as request_span:
+            if self.intent_router is not None:
+                exchange = await self.intent_router.aroute(human_message, config)
+                request_span.set_attribute("intent_routed", exchange is not None)
+                if exchange is not None:
+                    await self.agent_executor.aupdate_state(config, {"messages": exchange}, as_node="agent")
+                    return {"messages": exchange}
+            if self.answer_cache is not None:
+                has_history = bool((await self.agent_executor.aget_state(config)).values.get("messages"))
+                exchange = self._cached_exchange(human_message, has_history)
+                request_span.set_attribute("answer_cache_hit", exchange is not None)
+                if exchange is not None:
+                    await self.agent_executor.aupdate_state(config, {"messages": exchange}, as_node="agent")
+                    return {"messages": exchange}
+            response = await self.agent_executor.ainvoke({"messages": [input_message]}, config)
+            self._remember_answer(human_message, response)
+            return response
+
+    async def astream(self, human_message: str, thread_id: str = "abc123"):
+        """Yield each new message (AI turns, tool calls and tool results) as the graph produces it."""
         input_message = {"role": "user", "content": human_message}
-        config = {"configurable": {"thread_id": thread_id}}
-        responses = []
-        for step in self.agent_executor.stream({"messages": [input_message]}, config, stream_mode="values"):
-            for msg in step["messages"]:
-                if hasattr(msg, "pretty_print"):
-                    msg.pretty_print()
-                responses.append(getattr(msg, "content", str(msg)))
-        return responses[-1] if responses else None
+        config = self._config(thread_id)
+        async with self.coordinator.alock(thread_id):
+            async for update in self.agent_executor.astream({"messages": [input_message]}, config,
+                                                            stream_mode="updates"):
+                for node_output in update.values():
+                    for msg in (node_output or {}).get("messages", []):
+                        yield msg
+
+    async def astream_events(self, human_message: str, thread_id: str = "abc123",
+                             idempotency_key: Optional[str] = None):
+        """
+        Yield chat events for streaming clients as {"event": ..., "data": {...}} dicts.
+
+        Events are "token" (LLM content deltas), "tool_start", "tool_end" and a
+        final "done" carrying the complete answer. Time to first token is logged.
+        The stream waits for earlier turns on the thread; a duplicate of a turn
+        already running (same idempotency key) gets only its "done" event.
+        """
+        if idempotency_key is None:
+            async with self.coordinator.alock(thread_id):
+                async for event in self._astream_turn(human_message, thread_id):
+                    yield event
+            return
+        future, owner = self.coordinator.begin(thread_id, idempotency_key)
+        if not owner:
+            response = await asyncio.wrap_future(future)
+            yield {"event": "done", "data": {"content": response["messages"][-1].content, "thread_id": thread_id}}
+            return
+        try:
+            async with self.coordinator.alock(thread_id):
+                async for event in self._astream_turn(human_message, thread_id):
+                    if event["event"] == "done":
+                        # Publish before yielding, in case the client closes the stream right after
+                        self.coordinator.finish(thread_id, idempotency_key, future,
+                                                {"messages": [AIMessage(event["data"]["content"])]})
+                    yield event
+        except BaseException as e:
+            if not future.done():
+                self.coordinator.finish(thread_id, idempotency_key, future, error=e)
+            raise
+
+    async def _astream_turn(self, human_message: str, thread_id: str):
+        input_message = {"role": "user", "content": human_message}
+        config = self._config(thread_id)
+        start_time = time.time()
+        first_token_at = None
+        final_content = ""
+        request_span = start_span("agent.request", name="astream_events", thread_id=thread_id)
+        token = activate(request_span)
+        try:
+            exchange = (await self.intent_router.aroute(human_message, config)
+                        if self.intent_router is not None else None)
+            source = "intent_router"
+            if exchange is not None:
+                request_span.set_attribute("intent_routed", True)
+            elif self.answer_cache is not None:
+                has_history = bool((await self.agent_executor.aget_state(config)).values.get("messages"))
+                exchange = self._cached_exchange(human_message, has_history)
+                request_span.set_attribute("answer_cache_hit", exchange is not None)
+                source = "answer_cache"
+            if exchange is not None:
+                # Record the exchange so follow-up turns see it, then replay it as stream events
+                await self.agent_executor.aupdate_state(config, {"messages": exchange}, as_node="agent")
+                events = _routed_events(exchange, source)
+            else:
+                events = self.agent_executor.astream_events({"messages": [input_message]}, config, version="v2")
+            async for event in events:
+                kind = event["event"]
+                if event.get("metadata", {}).get("langgraph_node") not in ("agent", "tools"):
+                    continue
+                if kind == "on_chat_model_stream":
+                    content = event["data"]["chunk"].content
+                    if not content or not isinstance(content, str):
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.time()
+                        request_span.set_attribute("ttft_ms", round((first_token_at - start_time) * 1000, 1))
+                        logger.debug("Thread %s time to first token: %.3fs", thread_id, first_token_at - start_time)
+                    yield {"event": "token", "data": {"content": content}}
+                elif kind == "on_chat_model_end":
+                    output = event["data"].get("output")
+                    if output is not None and not getattr(output, "tool_calls", None):
+                        final_content = output.content
+                elif kind == "on_tool_start":
+                    yield {"event": "tool_start", "data": {"id": event["run_id"], "name": event["name"],
+                                                           "input": event["data"].get("input")}}
+                elif kind == "on_tool_end":
+                    output = event["data"].get("output")
+                    output = getattr(output, "content", output)
+                    yield {"event": "tool_end", "data": {"id": event["run_id"], "name": event["name"],
+                                                         "output": str(output)[:TOOL_EVENT_OUTPUT_CHARS]}}
+            if exchange is None and self.answer_cache is not None:
+                self._remember_answer(human_message, (await self.agent_executor.aget_state(config)).values)
+        except Exception as e:
+            request_span.record_error(e)
+            raise
+        finally:
+            try:
+                deactivate(token)
+            except ValueError:
+                pass  # the generator was closed from another context
+            request_span.end()
+        logger.debug("Thread %s stream completed in %.3fs", thread_id, time.time() - start_time)
+        yield {"event": "done", "data": {"content": final_content, "thread_id": thread_id}}
+
+    def _batch_plan(self, items: Iterable[BatchInput], batch_id: Optional[str]):
+        items = normalize_items(items)
+        if len(items) > BATCH_MAX_ITEMS:
+            raise ValueError(f"A batch can have at most {BATCH_MAX_ITEMS} items")
+        journal = BatchJournal(batch_id) if batch_id else None
+        done = journal.completed() if journal else {}
+        replayed = [{**done[item["id"]], "resumed": True} for item in items if item["id"] in done]
+        waves = batch_waves([item for item in items if item["id"] not in done])
+        return items, journal, replayed, waves
+
+    def _batch_inputs(self, wave: List[Dict[str, Any]]):
+        # Each item keeps the per-turn tool concurrency; the batch limit is applied by the wave runner
+        inputs = [{"messages": [{"role": "user", "content": item["content"]}]} for item in wave]
+        return inputs, [self._config(item["thread_id"]) for item in wave]
+
+    def _batch_item(self, item_input: Dict[str, Any], config: Dict[str, Any]):
+        with self.coordinator.lock(config["configurable"]["thread_id"]):
+            return self.agent_executor.invoke(item_input, config)
+
+    async def _abatch_item(self, item_input: Dict[str, Any], config: Dict[str, Any]):
+        async with self.coordinator.alock(config["configurable"]["thread_id"]):
+            return await self.agent_executor.ainvoke(item_input, config)
+
+    def _run_wave(self, inputs: List[Dict[str, Any]], configs: List[Dict[str, Any]], max_concurrency: int):
+        """Yield (index, output or exception) as the wave's items finish, each holding its thread's turn lock."""
+        with get_executor_for_config({"max_concurrency": max_concurrency}) as executor:
+            futures = {executor.submit(self._batch_item, item_input, config): index
+                       for index, (item_input, config) in enumerate(zip(inputs, configs))}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    yield futures[future], e
+
+    async def _arun_wave(self, inputs: List[Dict[str, Any]], configs: List[Dict[str, Any]], max_concurrency: int):
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(index: int):
+            async with semaphore:
+                try:
+                    return index, await self._abatch_item(inputs[index], configs[index])
+                except Exception as e:
+                    return index, e
+
+        tasks = [asyncio.ensure_future(run(index)) for index in range(len(inputs))]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def batch(self, items: Iterable[BatchInput], max_concurrency: Optional[int] = None,
+              batch_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Run many messages (or (message, thread_id) pairs) through the graph, at most
+        `max_concurrency` at a time, and return one result per item in input order.
+        Items on the same thread run in order. With a batch_id, finished items are
+        journaled and a rerun only runs the ones that failed.
+        """
+        items, journal, replayed, waves = self._batch_plan(items, batch_id)
+        results = {result["id"]: result for result in replayed}
+        if self._uses_dog_index:
+            get_dog_index().ensure_loaded()  # otherwise the first wave pages through the API once per item
+        with span("agent.batch", name="batch", items=len(items), resumed=len(replayed)):
+            for wave in waves:
+                inputs, configs = self._batch_inputs(wave)
+                for index, output in self._run_wave(inputs, configs, max_concurrency or BATCH_MAX_CONCURRENCY):
+                    result = batch_result(wave[index], output)
+                    if journal is not None:
+                        journal.append(result)
+                    results[result["id"]] = result
+        return [results[item["id"]] for item in items]
+
+    async def abatch_as_completed(self, items: Iterable[BatchInput], max_concurrency: Optional[int] = None,
+                                  batch_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Async batch(): yields each item's result as soon as it finishes, replayed results first."""
+        items, journal, replayed, waves = self._batch_plan(items, batch_id)
+        for result in replayed:
+            yield result
+        if self._uses_dog_index:
+            await asyncio.to_thread(get_dog_index().ensure_loaded)
+        batch_span = start_span("agent.batch", name="abatch", items=len(items), resumed=len(replayed))
+        token = activate(batch_span)
+        try:
+            for wave in waves:
+                inputs, configs = self._batch_inputs(wave)
+                async for index, output in self._arun_wave(inputs, configs,
+                                                           max_concurrency or BATCH_MAX_CONCURRENCY):
+                    result = batch_result(wave[index], output)
+                    if journal is not None:
+                        await asyncio.to_thread(journal.append, result)
+                    yield result
+        except Exception as e:
+            batch_span.record_error(e)
+            raise
+        finally:
+            try:
+                deactivate(token)
+            except ValueError:
+                pass  # the generator was closed from another context
+            batch_span.end()
 
     def chat(self, human_message: str, thread_id: str = "abc123"):
-        # For backward compatibility, use stream
+        # For backward compatibility, use stream (which takes the thread's turn lock)
         return self.stream(human_message, thread_id)
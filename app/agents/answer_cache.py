@@ -0,0 +1,114 @@
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.9"))
+# Answers built from these tools must differ on every ask, so they are never cached
+NON_DETERMINISTIC_TOOLS = frozenset({"list_dog_facts", "get_random_cat_facts"})
+
+_STOPWORDS = frozenset(
+    "a an the me my i you your please can could would will tell show give what which who is are was "
+    "were do does of in on for to about some any and or with there it this that".split()
+)
+
+
+def normalize_question(text: str) -> str:
+    text = re.sub(r"[^a-z0-9 ]+", " ", text.lower())
+    return " ".join(text.split())
+
+
+def _terms(normalized: str) -> Counter:
+    # Singularize naively so "breeds"/"breed" and "facts"/"fact" match
+    words = [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in normalized.split() if w not in _STOPWORDS]
+    # Adjacent word pairs make the score order-aware: "beagle bigger than poodle" isn't its reverse
+    return Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[term] for term, count in a.items())
+    return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())))
+
+
+class AnswerCache:
+    """
+    TTL + LRU cache of final answers to context-free questions.
+
+    Lookups try the normalized question first, then the most similar cached question by
+    cosine similarity of its content words and adjacent content-word pairs (stopwords
+    removed), accepted above `similarity`. Numbers must match exactly so "3 dog facts" never answers "5 dog facts".
+    """
+
+    def __init__(self, ttl: float = ANSWER_CACHE_TTL, max_entries: int = ANSWER_CACHE_SIZE,
+                 similarity: float = ANSWER_CACHE_SIMILARITY):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._entries: "OrderedDict[str, Tuple[str, Counter, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _numbers(normalized: str) -> Tuple[str, ...]:
+        return tuple(re.findall(r"\d+", normalized))
+
+    def lookup(self, question: str) -> Optional[Tuple[str, str]]:
+        """Return (answer, "exact" | "near") or None."""
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry[0], "exact"
+            terms, numbers = _terms(key), self._numbers(key)
+            best_key, best_score = None, 0.0
+            for cached_key, (_, cached_terms, expires_at) in self._entries.items():
+                if expires_at <= now or self._numbers(cached_key) != numbers:
+                    continue
+                score = _cosine(terms, cached_terms)
+                if score > best_score:
+                    best_key, best_score = cached_key, score
+            if best_key is not None and best_score >= self.similarity:
+                self._entries.move_to_end(best_key)
+                self.near_hits += 1
+                return self._entries[best_key][0], "near"
+            self.misses += 1
+            return None
+
+    def store(self, question: str, answer: str):
+        key = normalize_question(question)
+        with self._lock:
+            self._entries[key] = (answer, _terms(key), time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            now = time.time()
+            for stale in [k for k, (_, _, expires_at) in self._entries.items() if expires_at <= now]:
+                del self._entries[stale]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def is_cacheable(tool_names: Iterable[str]) -> bool:
+        return not NON_DETERMINISTIC_TOOLS.intersection(tool_names)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.exact_hits + self.near_hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.near_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
@@ -0,0 +1,110 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from uuid import uuid4
+
+from utils.json_codec import dumps
+
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+# Under the temp dir, like the SQLite checkpointer, so it stays writable when the app runs from a read-only package
+BATCH_JOURNAL_DIR = os.getenv("BATCH_JOURNAL_DIR", os.path.join(tempfile.gettempdir(), "batches"))
+
+_BATCH_ID = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+BatchInput = Union[str, Tuple[str, Optional[str]], Dict[str, Any]]
+
+
+def normalize_items(items: Iterable[BatchInput]) -> List[Dict[str, Any]]:
+    """
+    Accept messages, (message, thread_id) pairs or {"content", "thread_id", "id"} dicts.
+    Items without an id are numbered by position; items without a thread get a new one.
+    """
+    normalized = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"content": item}
+        elif isinstance(item, (tuple, list)):
+            item = {"content": item[0], "thread_id": item[1] if len(item) > 1 else None}
+        normalized.append({
+            "id": str(item.get("id") if item.get("id") is not None else index),
+            "content": item["content"],
+            "thread_id": item.get("thread_id") or str(uuid4()),
+        })
+    ids = [item["id"] for item in normalized]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Batch item ids must be unique")
+    return normalized
+
+
+def batch_waves(items: Sequence[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Split items into waves that can run concurrently: wave k holds the k-th item of
+    every thread, so turns of one conversation run in order and never overlap.
+    """
+    waves: List[List[Dict[str, Any]]] = []
+    turns: Dict[str, int] = {}
+    for item in items:
+        turn = turns.get(item["thread_id"], 0)
+        turns[item["thread_id"]] = turn + 1
+        if turn == len(waves):
+            waves.append([])
+        waves[turn].append(item)
+    return waves
+
+
+def batch_result(item: Dict[str, Any], output: Any) -> Dict[str, Any]:
+    """One JSONL result line: the item's answer, or the error it failed with."""
+    result = {"id": item["id"], "thread_id": item["thread_id"]}
+    if isinstance(output, Exception):
+        return {**result, "content": None, "error": f"{type(output).__name__}: {output}"}
+    messages = (output or {}).get("messages") or []
+    return {**result, "content": messages[-1].content if messages else "", "error": None}
+
+
+class BatchJournal:
+    """
+    Append-only JSONL record of a batch's finished items under BATCH_JOURNAL_DIR.
+
+    Rerunning a batch with the same batch_id replays the items that succeeded and
+    runs only the ones that failed or never finished.
+    """
+
+    def __init__(self, batch_id: str, directory: str = BATCH_JOURNAL_DIR):
+        if not _BATCH_ID.match(batch_id):
+            raise ValueError("batch_id may only contain letters, digits, '.', '_' and '-' (max 64)")
+        self.path = os.path.join(directory, f"{batch_id}.jsonl")
+        self._lock = threading.Lock()
+
+    def completed(self) -> Dict[str, Dict[str, Any]]:
+        """Latest successful result per item id."""
+        results: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return results
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                if result.get("error") is None:
+                    results[result["id"]] = result
+                else:
+                    results.pop(result["id"], None)
+        return results
+
+    def append(self, result: Dict[str, Any]):
+        line = dumps(result) + b"\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(line)
+
+
+async def jsonl_stream(results: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Encode batch results as JSON Lines for a streaming response."""
+    async for result in results:
+        yield dumps(result) + b"\n"
@@ -0,0 +1,180 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately, get_buffer_string
+from langchain_core.runnables import RunnableConfig
+from langgraph.prebuilt.chat_agent_executor import AgentState
+from typing_extensions import NotRequired
+
+from agents.prompt_cache import PROMPT_CACHE_STABLE, message_fingerprint
+
+logger = logging.getLogger(__name__)
+
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "3000"))
+HISTORY_SUMMARIZE = os.getenv("HISTORY_SUMMARIZE", "true").lower() == "true"
+OLD_TOOL_MESSAGE_CHARS = int(os.getenv("HISTORY_OLD_TOOL_MESSAGE_CHARS", "300"))
+# Share of the budget kept for verbatim recent turns; the rest is room for the summary
+RECENT_SHARE = 0.75
+# In append-only mode each fold shrinks the window further, so the prefix changes less often
+APPEND_ONLY_RECENT_SHARE = 0.5
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and a dog-facts assistant. "
+    "Update the summary with the new messages. Keep names, breeds, preferences and open questions; "
+    "drop raw tool payloads. Reply with the summary only, in at most 150 words."
+)
+
+
+class DogAgentState(AgentState):
+    # Running summary of messages[:summarized_until] (dropped unsummarized in append-only mode), written by
+    # HistoryWindow
+    summary: NotRequired[str]
+    summarized_until: NotRequired[int]
+
+
+class HistoryStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.tokens_in_history = 0
+        self.tokens_sent = 0
+        self.summaries = 0
+        self.prefix_tokens_reused = 0
+        self.last_tokens_sent: Dict[str, int] = {}
+        self._last_input: Dict[str, List[int]] = {}
+
+    def record(self, thread_id: Optional[str], history_tokens: int, sent_tokens: int, summarized: bool,
+               llm_input: Sequence[AnyMessage] = ()):
+        fingerprints = [message_fingerprint(m) for m in llm_input]
+        shared = 0
+        with self._lock:
+            self.turns += 1
+            self.tokens_in_history += history_tokens
+            self.tokens_sent += sent_tokens
+            self.summaries += int(summarized)
+            if thread_id is not None:
+                previous = self._last_input.get(thread_id, [])
+                while shared < min(len(previous), len(fingerprints)) and previous[shared] == fingerprints[shared]:
+                    shared += 1
+                self._last_input[thread_id] = fingerprints
+                self.last_tokens_sent[thread_id] = sent_tokens
+                if len(self.last_tokens_sent) > 1000:
+                    oldest = next(iter(self.last_tokens_sent))
+                    self.last_tokens_sent.pop(oldest)
+                    self._last_input.pop(oldest, None)
+        if shared:
+            reused = count_tokens_approximately(llm_input[:shared])
+            with self._lock:
+                self.prefix_tokens_reused += reused
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "model_calls": self.turns,
+                "avg_tokens_in_history": self.tokens_in_history / self.turns if self.turns else 0,
+                "avg_tokens_sent": self.tokens_sent / self.turns if self.turns else 0,
+                "summaries": self.summaries,
+                # Share of sent tokens that repeat the previous call's prefix on the same thread: the most
+                # a provider-side prompt cache could serve
+                "prefix_reuse": round(self.prefix_tokens_reused / self.tokens_sent, 3) if self.tokens_sent else 0,
+            }
+
+
+def _shrink_old_tool_messages(messages: Sequence[AnyMessage], current_turn_start: int,
+                              max_chars: int) -> List[AnyMessage]:
+    shrunk = []
+    for index, message in enumerate(messages):
+        if (index < current_turn_start and isinstance(message, ToolMessage)
+                and isinstance(message.content, str) and len(message.content) > max_chars):
+            message = message.model_copy(update={"content": message.content[:max_chars] + " ...[truncated]"})
+        shrunk.append(message)
+    return shrunk
+
+
+class HistoryWindow:
+    """
+    pre_model_hook that sends the model a token-budgeted view of the thread.
+
+    Old tool results are truncated first. If the thread is still over budget, whole
+    turns (cut at HumanMessage boundaries so tool calls stay paired with their
+    results) are folded into a running summary produced by `summarizer`. The stored
+    history is never modified; only llm_input_messages is trimmed.
+
+    With `append_only` (PROMPT_CACHE_STABLE) every call's input extends the previous
+    one on the thread, so the provider can serve it from its prompt cache: old tool
+    results are left as they were sent, and the window only moves when the thread
+    goes over budget, then by enough (down to APPEND_ONLY_RECENT_SHARE) that it
+    stays put for a while, even when summarization is off or fails.
+
+    Per-thread overrides: config["configurable"]["history_max_tokens"] and
+    ["history_summarize"].
+    """
+
+    def __init__(self, summarizer: Optional[BaseChatModel] = None, max_tokens: int = HISTORY_MAX_TOKENS,
+                 summarize: bool = HISTORY_SUMMARIZE, old_tool_message_chars: int = OLD_TOOL_MESSAGE_CHARS,
+                 append_only: bool = PROMPT_CACHE_STABLE):
+        self.summarizer = summarizer
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.old_tool_message_chars = old_tool_message_chars
+        self.append_only = append_only
+        self.stats = HistoryStats()
+
+    def _summarize(self, summary: str, messages: Sequence[AnyMessage]) -> str:
+        prompt = [
+            SystemMessage(SUMMARY_PROMPT),
+            HumanMessage(f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{get_buffer_string(messages)}"),
+        ]
+        return self.summarizer.invoke(prompt).content
+
+    def __call__(self, state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        configurable = (config or {}).get("configurable", {})
+        max_tokens = int(configurable.get("history_max_tokens", self.max_tokens))
+        summarize = bool(configurable.get("history_summarize", self.summarize)) and self.summarizer is not None
+        messages = state["messages"]
+        summary = state.get("summary", "")
+        start = min(state.get("summarized_until", 0), len(messages))
+
+        human_indexes = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        current_turn_start = human_indexes[-1] if human_indexes else 0
+        if not self.append_only:
+            messages = _shrink_old_tool_messages(messages, current_turn_start, self.old_tool_message_chars)
+        recent_share = APPEND_ONLY_RECENT_SHARE if self.append_only else RECENT_SHARE
+
+        def with_summary(window: List[AnyMessage], text: str) -> List[AnyMessage]:
+            if not text:
+                return window
+            return [SystemMessage(f"Summary of the earlier conversation:\n{text}")] + window
+
+        update: Dict[str, Any] = {}
+        window = list(messages[start:])
+        llm_input = with_summary(window, summary)
+        if count_tokens_approximately(llm_input) > max_tokens:
+            # Earliest turn boundary after which the recent turns fit in their share of the budget
+            candidates = [i for i in human_indexes if i >= start] or [current_turn_start]
+            cut = next(
+                (i for i in candidates
+                 if count_tokens_approximately(messages[i:]) <= max_tokens * recent_share),
+                candidates[-1],
+            )
+            if cut > start:
+                if summarize:
+                    try:
+                        summary = self._summarize(summary, messages[start:cut])
+                        update = {"summary": summary, "summarized_until": cut}
+                    except Exception:
+                        logger.exception("History summarization failed; dropping old turns instead")
+                if self.append_only and not update:
+                    update = {"summarized_until": cut}  # keep the window start fixed until the next fold
+                llm_input = with_summary(list(messages[cut:]), summary)
+
+        history_tokens = count_tokens_approximately(state["messages"])
+        sent_tokens = count_tokens_approximately(llm_input)
+        self.stats.record(configurable.get("thread_id"), history_tokens, sent_tokens, "summary" in update, llm_input)
+        logger.debug("Thread %s: %d history tokens, %d sent", configurable.get("thread_id"), history_tokens,
+                     sent_tokens)
+        return {"llm_input_messages": llm_input, **update}
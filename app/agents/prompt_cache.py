@@ -0,0 +1,43 @@
+"""
+Keep the model input's prefix byte-identical across calls so the provider's
+prompt cache (DeepSeek context caching, Azure OpenAI prompt caching) can serve it.
+
+With PROMPT_CACHE_STABLE=true the agent sends a fixed system prompt, binds its
+tools sorted by name, and HistoryWindow only ever appends to what it sent
+before on a thread (see HistoryWindow.append_only). Cache hits reported by the
+provider are recorded as `llm_tokens{type="cache_read"}`.
+"""
+
+import os
+from typing import Any, Optional, Sequence
+
+from langchain_core.messages import BaseMessage
+
+PROMPT_CACHE_STABLE = os.getenv("PROMPT_CACHE_STABLE", "false").lower() == "true"
+
+# Never put per-request data (dates, user names, ids) in here: it is the start of every cached prefix
+SYSTEM_PROMPT = (
+    "You are a friendly assistant that answers questions about dogs: breeds, breed groups and dog facts. "
+    "Use the tools to look up breed and group information instead of relying on memory, and prefer "
+    "find_dog_breed and list_breeds_in_group for lookups by name. Keep answers concise, and say so when "
+    "the tools return nothing relevant."
+)
+
+
+def sort_tools(tools: Sequence[Any]) -> list:
+    """Tools in name order, so their schemas serialize identically in every request."""
+    return sorted(tools, key=lambda tool: tool.name)
+
+
+def cache_read_tokens(message: BaseMessage) -> Optional[int]:
+    """Prompt tokens the provider served from its cache, if it reported them."""
+    details = (getattr(message, "usage_metadata", None) or {}).get("input_token_details") or {}
+    if details.get("cache_read") is not None:
+        return details["cache_read"]
+    # DeepSeek reports hits outside the OpenAI-style details
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    return token_usage.get("prompt_cache_hit_tokens")
+
+
+def message_fingerprint(message: BaseMessage) -> int:
+    return hash((message.type, str(message.content), str(getattr(message, "tool_calls", None) or "")))
@@ -0,0 +1,145 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Sequence
+
+from langchain_core.tools import BaseTool, ToolException
+from langgraph.prebuilt import ToolNode
+
+# Max tool calls from one model step that run at once (passed as the graph's max_concurrency)
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+DEFAULT_TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT_SECONDS", "15"))
+# Threads shared by every sync tool call in the process. Timed-out calls keep theirs until they return
+TOOL_THREADS = int(os.getenv("TOOL_THREADS", str(TOOL_MAX_CONCURRENCY * 8)))
+
+
+class _ToolCall:
+    """
+    One sync tool call for the shared tool pool. `started` is set when a worker picks
+    it up, so a call's timeout only counts the time it actually runs.
+    """
+
+    def __init__(self, func: Callable, args, kwargs, on_start: Optional[Callable[[], None]] = None):
+        self.context = contextvars.copy_context()
+        self.func, self.args, self.kwargs = func, args, kwargs
+        self.on_start = on_start
+        self.started = threading.Event()
+
+    def run(self):
+        self.started.set()
+        if self.on_start is not None:
+            self.on_start()
+        return self.context.run(self.func, *self.args, **self.kwargs)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _tool_executor() -> ThreadPoolExecutor:
+    """The process-wide pool sync tool calls run on, created on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=TOOL_THREADS, thread_name_prefix="tool")
+    return _executor
+
+
+def parse_tool_timeouts(spec: Optional[str]) -> Dict[str, float]:
+    """Parse "tool_a=5,tool_b=30" into {"tool_a": 5.0, "tool_b": 30.0}."""
+    timeouts = {}
+    for item in (spec or "").split(","):
+        name, _, seconds = item.partition("=")
+        if name.strip() and seconds.strip():
+            timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
+def with_timeout(tool: BaseTool, seconds: float) -> BaseTool:
+    """
+    Return a copy of a tool whose sync and async runs fail with a ToolException after `seconds`.
+
+    Sync calls run on the shared tool pool, and the timeout starts when a worker picks the
+    call up; a call that can't get a worker within `seconds` fails the same way. A timed-out
+    sync call keeps running on its worker (Python can't cancel it), but the HTTP clients'
+    own timeouts bound how long that lasts.
+    """
+    func = getattr(tool, "func", None)
+    coroutine = getattr(tool, "coroutine", None)
+    update = {}
+
+    def timed_out():
+        return ToolException(f"Tool '{tool.name}' timed out after {seconds:g}s")
+
+    if func is not None:
+        @functools.wraps(func)
+        def timed_func(*args, **kwargs):
+            call = _ToolCall(func, args, kwargs)
+            future = _tool_executor().submit(call.run)
+            if not call.started.wait(seconds):
+                future.cancel()
+                raise timed_out()
+            try:
+                return future.result(timeout=seconds)
+            except FutureTimeoutError:
+                raise timed_out()
+        update["func"] = timed_func
+
+    if coroutine is not None:
+        @functools.wraps(coroutine)
+        async def timed_coroutine(*args, **kwargs):
+            try:
+                return await asyncio.wait_for(coroutine(*args, **kwargs), timeout=seconds)
+            except asyncio.TimeoutError:
+                raise timed_out()
+        update["coroutine"] = timed_coroutine
+    elif func is not None:
+        # Await the pool future directly instead of hopping through run_in_executor first
+        @functools.wraps(func)
+        async def threaded_coroutine(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            started = loop.create_future()
+
+            def on_start():
+                try:
+                    loop.call_soon_threadsafe(lambda: started.done() or started.set_result(None))
+                except RuntimeError:
+                    pass  # the loop closed before the call got a worker
+
+            call = _ToolCall(func, args, kwargs, on_start)
+            future = _tool_executor().submit(call.run)
+            try:
+                await asyncio.wait_for(started, timeout=seconds)
+            except asyncio.TimeoutError:
+                future.cancel()
+                raise timed_out()
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout=seconds)
+            except asyncio.TimeoutError:
+                raise timed_out()
+        update["coroutine"] = threaded_coroutine
+
+    return tool.model_copy(update=update) if update else tool
+
+
+def timed_tools(tools: Sequence[BaseTool], timeouts: Optional[Dict[str, float]] = None,
+                default_timeout: float = DEFAULT_TOOL_TIMEOUT) -> List[BaseTool]:
+    """`tools` wrapped with with_timeout(), using TOOL_TIMEOUTS overridden by `timeouts`."""
+    timeouts = {**parse_tool_timeouts(os.getenv("TOOL_TIMEOUTS")), **(timeouts or {})}
+    return [with_timeout(tool, timeouts.get(tool.name, default_timeout)) for tool in tools]
+
+
+def build_tool_node(tools: Sequence[BaseTool], timeouts: Optional[Dict[str, float]] = None,
+                    default_timeout: float = DEFAULT_TOOL_TIMEOUT) -> ToolNode:
+    """
+    Build the agent's ToolNode with per-tool timeouts.
+
+    create_react_agent dispatches every tool call of a model step as its own task, so
+    independent calls already run concurrently (bounded by max_concurrency in the run
+    config) and their ToolMessages are applied in the order the model emitted them.
+    """
+    return ToolNode(timed_tools(tools, timeouts, default_timeout), handle_tool_errors=True)
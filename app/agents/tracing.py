@@ -0,0 +1,141 @@
+import threading
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agents.prompt_cache import cache_read_tokens
+from utils.telemetry import Span, activate, current_span, deactivate, llm_tokens, start_span
+
+REACT_NODES = ("agent", "tools")
+
+
+class AgentTracingHandler(BaseCallbackHandler):
+    """
+    Turns LangChain callbacks into telemetry spans.
+
+    - react.step: each run of the "agent" or "tools" graph node (attributes: node, step)
+    - llm.call: each chat model call, with input/output token counts when the provider reports them,
+      and cache_read_tokens when part of the prompt was served from the provider's prompt cache
+    - tool.call: each tool run, with output size. The span is made current while the tool
+      runs, so the HTTP spans of its upstream calls nest under it.
+
+    Runs are parented through LangChain's parent_run_id chain, falling back to the span that
+    was current when the run started (the request span opened by DogChatAgent).
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: Dict[UUID, Span] = {}
+        self._parents: Dict[UUID, Optional[UUID]] = {}
+        self._tokens: Dict[UUID, Any] = {}
+
+    def _parent_span(self, parent_run_id: Optional[UUID]) -> Optional[Span]:
+        with self._lock:
+            while parent_run_id is not None:
+                parent = self._spans.get(parent_run_id)
+                if parent is not None:
+                    return parent
+                parent_run_id = self._parents.get(parent_run_id)
+        return current_span()
+
+    def _start(self, span_name: str, run_id: UUID, parent_run_id: Optional[UUID], /, **attributes) -> Span:
+        started = start_span(span_name, parent=self._parent_span(parent_run_id), **attributes)
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            self._spans[run_id] = started
+        return started
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **attributes) -> Optional[Span]:
+        with self._lock:
+            self._parents.pop(run_id, None)
+            ended = self._spans.pop(run_id, None)
+        if ended is not None:
+            ended.set_attributes(attributes)
+            if error is not None:
+                ended.record_error(error)
+            ended.end()
+        return ended
+
+    # -- graph nodes ----------------------------------------------------------
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        if node in REACT_NODES and kwargs.get("name") == node:
+            self._start("react.step", run_id, parent_run_id, name=node, node=node,
+                        step=metadata.get("langgraph_step"))
+        else:
+            with self._lock:
+                self._parents[run_id] = parent_run_id
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # -- LLM calls ------------------------------------------------------------
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name", "")
+        self._start("llm.call", run_id, parent_run_id, name=model, messages=sum(len(m) for m in messages))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage: Dict[str, Any] = {}
+        cache_read = None
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or usage
+                if message is not None:
+                    cache_read = cache_read_tokens(message) if cache_read is None else cache_read
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        if not usage:
+            usage = {"input_tokens": token_usage.get("prompt_tokens"),
+                     "output_tokens": token_usage.get("completion_tokens")}
+        if cache_read is None:
+            cache_read = token_usage.get("prompt_cache_hit_tokens")
+        usage = {**usage, "cache_read_tokens": cache_read}
+        attributes = {key: usage.get(key) for key in ("input_tokens", "output_tokens", "cache_read_tokens")
+                      if usage.get(key) is not None}
+        ended = self._end(run_id, **attributes)
+        if ended is not None:
+            for kind in ("input", "output", "cache_read"):
+                if f"{kind}_tokens" in attributes:
+                    llm_tokens.observe(attributes[f"{kind}_tokens"], type=kind, name=ended.attributes["name"])
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # -- tool calls -----------------------------------------------------------
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "")
+        started = self._start("tool.call", run_id, parent_run_id, name=name)
+        # BaseTool.run copies the context after this callback, so the tool body sees this span as current
+        with self._lock:
+            self._tokens[run_id] = activate(started)
+
+    def _end_tool(self, run_id, output=None, error=None):
+        with self._lock:
+            token = self._tokens.pop(run_id, None)
+        if token is not None:
+            try:
+                deactivate(token)
+            except ValueError:
+                pass  # ended in a different context than it started; nothing to restore
+        content = getattr(output, "content", output)
+        attributes = {"output_bytes": len(str(content).encode())} if output is not None else {}
+        self._end(run_id, error, **attributes)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end_tool(run_id, output=output)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end_tool(run_id, error=error)
+
+
+tracing_handler = AgentTracingHandler()
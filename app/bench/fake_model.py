@@ -0,0 +1,80 @@
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+# Questions the benchmark asks, with the tool calls the model makes for each. The
+# breed and group names exist in fixtures/dogapi.json.
+SCRIPT: List[Tuple[str, List[Dict[str, Any]]]] = [
+    ("Tell me about the Beagle", [{"name": "find_dog_breed", "args": {"name": "beagle"}}]),
+    ("Which breeds are in the herding group?", [{"name": "list_breeds_in_group", "args": {"group_name": "herding"}}]),
+    ("Give me 3 dog facts", [{"name": "list_dog_facts", "args": {"limit": 3}}]),
+    ("Compare the Pug and the Chihuahua", [
+        {"name": "find_dog_breed", "args": {"name": "pug"}},
+        {"name": "find_dog_breed", "args": {"name": "chihuahua"}},
+    ]),
+    ("List some dog groups", [{"name": "list_dog_groups", "args": {"page": 1}}]),
+    ("Thanks, that's all!", []),
+]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for the chat model.
+
+    For a scripted question it first emits that question's tool calls, then answers
+    from the tool results. Unscripted prompts (including history summaries) get a
+    plain answer. Each call sleeps `latency` seconds to model LLM time and reports
+    approximate token usage.
+    """
+
+    latency: float = 0.0
+    script: Dict[str, List[Dict[str, Any]]] = {}
+    _ids: Any = PrivateAttr(default_factory=itertools.count)
+
+    def __init__(self, latency: float = 0.0, script: Optional[Sequence[Tuple[str, List[Dict[str, Any]]]]] = None,
+                 **kwargs):
+        super().__init__(latency=latency, script=dict(script if script is not None else SCRIPT), **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        human_index = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+        question = messages[human_index].content if human_index >= 0 else ""
+        tool_results = [m for m in messages[human_index + 1:] if isinstance(m, ToolMessage)]
+        calls = self.script.get(question, [])
+        if calls and not tool_results:
+            message = AIMessage(content="", tool_calls=[
+                {**call, "id": f"call_{next(self._ids)}"} for call in calls
+            ])
+        elif tool_results:
+            sizes = ", ".join(f"{m.name}: {len(str(m.content))} chars" for m in tool_results)
+            message = AIMessage(content=f"Here is what I found for '{question}' ({sizes}).")
+        else:
+            message = AIMessage(content=f"Happy to help with '{question[:60]}'.")
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = count_tokens_approximately([message])
+        message.usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                                  "total_tokens": input_tokens + output_tokens}
+        return message
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
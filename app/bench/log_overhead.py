@@ -0,0 +1,95 @@
+"""
+Per-request logging cost on the request thread.
+
+Compares the Chat handler's former logging (five eagerly formatted INFO lines through a
+synchronous stream handler) with one request_log() record through the non-blocking
+queue, both writing to the same file. Run from the app/ folder:
+
+    python -m bench.log_overhead --requests 20000 --sample-rate 0.1
+"""
+
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+from functools import partial
+from uuid import uuid4
+
+from utils.structured_logging import TEXT_FORMAT, JsonFormatter, NonBlockingQueueHandler, request_log
+
+
+def legacy_request(logger: logging.Logger, message: str, thread_id: str):
+    start_time = time.time()
+    request_id = str(uuid4())[:8]
+    logger.info(f"[{request_id}] Chat endpoint triggered - Method: POST, URL: http://localhost/api/chat")
+    logger.info(f"[{request_id}] Processing message - Thread: {thread_id}, Message length: {len(message)}")
+    agent_start_time = time.time()
+    logger.info(f"[{request_id}] Agent processing completed in {time.time() - agent_start_time:.2f}s")
+    logger.info(f"[{request_id}] Response generated - Content length: {len(message) * 4}")
+    logger.info(f"[{request_id}] Request completed successfully in {time.time() - start_time:.2f}s")
+
+
+def structured_request(logger: logging.Logger, message: str, thread_id: str, sample_rate: float = 1.0):
+    request_id = str(uuid4())[:8]
+    with request_log("chat", logger, sample_rate=sample_rate, request_id=request_id, method="POST") as log:
+        log.set(thread_id=thread_id, message_chars=len(message))
+        with log.timed("agent"):
+            pass
+        log.set(response_chars=len(message) * 4)
+        log.finish(200)
+
+
+def measure(mode: str, requests: int, path: str, sample_rate: float) -> dict:
+    logger = logging.getLogger(f"bench.log_overhead.{mode}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    output = logging.FileHandler(path)
+    listener = None
+    if mode == "legacy":
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+        logger.addHandler(output)
+        run = legacy_request
+    else:
+        output.setFormatter(JsonFormatter())
+        records = queue.Queue(maxsize=requests + 1)
+        logger.addHandler(NonBlockingQueueHandler(records))
+        listener = logging.handlers.QueueListener(records, output)
+        listener.start()
+        run = partial(structured_request, sample_rate=sample_rate)
+
+    start = time.perf_counter()
+    for i in range(requests):
+        run(logger, "tell me about the beagle", f"thread-{i % 64}")
+    request_path_s = time.perf_counter() - start
+    if listener is not None:
+        listener.stop()
+    total_s = time.perf_counter() - start
+    output.close()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    return {
+        "mode": mode,
+        "us_per_request": round(request_path_s / requests * 1e6, 2),
+        "us_per_request_incl_writer": round(total_s / requests * 1e6, 2),
+        "bytes_per_request": round(os.path.getsize(path) / requests, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request logging overhead.")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sample-rate", type=float, default=1.0, help="LOG_SAMPLE_RATE for the structured run")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("legacy", "structured"):
+            result = measure(mode, args.requests, os.path.join(tmp, f"{mode}.log"), args.sample_rate)
+            print(f"{result['mode']:<10}  {result['us_per_request']} us/request on the request path, "
+                  f"{result['us_per_request_incl_writer']} us including the writer, "
+                  f"{result['bytes_per_request']} B/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+"""
+Offline benchmark for the chat agent.
+
+Drives DogChatAgent, the FastAPI /api/chat endpoint or the Azure Functions Chat handler
+with a scripted chat model and a local replay of the Dog API, so it needs no network
+or API keys. Run from the app/ folder:
+
+    python -m bench.run --target agent --concurrency 8 --conversations 32 --turns 3
+    python -m bench.run --target fastapi --llm-latency 0.2 --api-latency 0.05 --json
+    python -m bench.run --target functions --max-p95-ms 500   # exits 1 above the threshold
+
+Reports requests/s, p50/p95/p99 latency, mean time per request spent in LLM calls,
+tools and checkpoint I/O (and within it, encoding and decoding), and memory and
+checkpoint bytes per conversation thread. Compare checkpoint encodings with e.g.
+
+    python -m bench.run --checkpoint-compression zlib --no-checkpoint-dedup
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import math
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from bench.fake_model import SCRIPT, ScriptedChatModel
+from bench.stub_dogapi import StubDogApi
+
+FUNCTIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "functions"))
+TARGETS = ("agent", "fastapi", "functions")
+CHECKPOINT_METHODS = ("aget_tuple", "aput", "aput_writes")
+
+
+class StageTimer(BaseCallbackHandler):
+    """Callback handler summing wall time spent in LLM and tool runs across all requests."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: Dict[Any, float] = {}
+        self.totals = {"llm": 0.0, "tools": 0.0, "checkpoint": 0.0}
+        self.counts = {"llm": 0, "tools": 0, "checkpoint": 0}
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.totals[stage] += seconds
+            self.counts[stage] += 1
+
+    def _start(self, run_id):
+        self._started[run_id] = time.perf_counter()
+
+    def _end(self, stage: str, run_id):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.add(stage, time.perf_counter() - started)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end("llm", run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end("llm", run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end("tools", run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end("tools", run_id)
+
+
+_stage_timer_var: contextvars.ContextVar[Optional[StageTimer]] = contextvars.ContextVar("bench_stage_timer",
+                                                                                        default=None)
+register_configure_hook(_stage_timer_var, inheritable=True)
+
+
+def time_checkpointer(saver, timer: StageTimer):
+    """Wrap the saver's async methods (the ones the graph awaits) to record checkpoint I/O time."""
+    for name in CHECKPOINT_METHODS:
+        method = getattr(saver, name)
+
+        def timed(method=method):
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    timer.add("checkpoint", time.perf_counter() - start)
+            return wrapper
+
+        setattr(saver, name, timed())
+
+
+def checkpoint_bytes(saver) -> Optional[int]:
+    """Bytes the checkpointer holds: SQLite file size (with WAL) or the in-memory saver's payloads."""
+    path = getattr(saver, "path", None)
+    if path:
+        return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+    if hasattr(saver, "storage"):
+        total = 0
+        for namespaces in saver.storage.values():
+            for checkpoints in namespaces.values():
+                for checkpoint, metadata, _ in checkpoints.values():
+                    total += len(checkpoint[1]) + len(metadata[1])
+        total += sum(len(value[1]) for value in saver.blobs.values())
+        total += sum(len(write[2][1]) for writes in saver.writes.values() for write in writes.values())
+        return total
+    return None
+
+
+def stored_bytes(saver) -> Optional[int]:
+    """Encoded checkpoint data without SQLite page and WAL overhead."""
+    if hasattr(saver, "stored_bytes"):
+        return saver.stored_bytes()
+    return checkpoint_bytes(saver)
+
+
+def serde_ms() -> Dict[str, float]:
+    """Total checkpoint encode ("dump") and decode ("load") time so far."""
+    from memory.checkpointer import serde_time
+    return {series["labels"]["op"]: series["sum"] for series in serde_time.snapshot()}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def build_target(target: str) -> Dict[str, Any]:
+    """Return {"send": async (message, thread_id) -> str, "agent": DogChatAgent, "close": async ()}."""
+    if target == "agent":
+        from agents.agent import DogChatAgent
+        agent = DogChatAgent()
+
+        async def send(message: str, thread_id: str) -> str:
+            response = await agent.ainvoke(message, thread_id)
+            return response["messages"][-1].content
+
+        async def close():
+            pass
+
+        return {"send": send, "agent": agent, "close": close}
+
+    if target == "fastapi":
+        import httpx
+        from controller.api import app, agent
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+        async def send(message: str, thread_id: str) -> str:
+            response = await client.post("/api/chat", json={"content": message, "thread_id": thread_id})
+            response.raise_for_status()
+            return response.json()["content"]
+
+        return {"send": send, "agent": agent, "close": client.aclose}
+
+    if target == "functions":
+        import azure.functions as func
+        import function_app
+        handler = next(f.get_user_function() for f in function_app.app.get_functions()
+                       if f.get_function_name() == "Chat")
+        agent = await function_app.aget_agent()
+
+        async def send(message: str, thread_id: str) -> str:
+            request = func.HttpRequest("POST", "/api/chat", body=json.dumps(
+                {"content": message, "thread_id": thread_id}).encode())
+            response = await handler(request)
+            if response.status_code != 200:
+                raise RuntimeError(f"Chat returned {response.status_code}: {response.get_body()[:200]!r}")
+            return json.loads(response.get_body())["content"]
+
+        async def close():
+            pass
+
+        return {"send": send, "agent": agent, "close": close}
+
+    raise ValueError(f"Unknown target {target!r}; expected one of {TARGETS}")
+
+
+async def run_load(send: Callable[[str, str], Awaitable[str]], conversations: int, turns: int,
+                   concurrency: int) -> Dict[str, Any]:
+    """Run `conversations` threads of `turns` sequential messages, `concurrency` threads at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    async def conversation(index: int):
+        thread_id = f"bench-{index}-{uuid4().hex[:8]}"
+        async with semaphore:
+            for turn in range(turns):
+                question = SCRIPT[(index + turn) % len(SCRIPT)][0]
+                start = time.perf_counter()
+                try:
+                    await send(question, thread_id)
+                    latencies.append(time.perf_counter() - start)
+                except Exception as e:
+                    errors.append(f"{type(e).__name__}: {e}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(i) for i in range(conversations)))
+    return {"latencies": latencies, "errors": errors, "duration": time.perf_counter() - start}
+
+
+async def benchmark(args) -> Dict[str, Any]:
+    timer = StageTimer()
+    _stage_timer_var.set(timer)
+    target = await build_target(args.target)
+    agent = target["agent"]
+    time_checkpointer(agent.memory, timer)
+    from tools.dogapi_tools import get_dog_index
+    await asyncio.to_thread(get_dog_index().ensure_loaded)
+
+    if args.warmup:
+        await run_load(target["send"], min(args.warmup, args.conversations), 1, args.concurrency)
+    timer.totals = dict.fromkeys(timer.totals, 0.0)
+    timer.counts = dict.fromkeys(timer.counts, 0)
+    bytes_before = checkpoint_bytes(agent.memory) or 0
+    stored_before = stored_bytes(agent.memory) or 0
+    serde_before = serde_ms()
+    from agents.intent_router import routing_counts
+    routing_before = routing_counts()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    result = await run_load(target["send"], args.conversations, args.turns, args.concurrency)
+    await target["close"]()
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    bytes_after = checkpoint_bytes(agent.memory)
+    stored_after = stored_bytes(agent.memory)
+    serde = {op: total - serde_before.get(op, 0.0) for op, total in serde_ms().items()}
+    routing = {outcome: int(count - routing_before[outcome]) for outcome, count in routing_counts().items()}
+    latencies = result["latencies"]
+    requests = len(latencies)
+    mean_latency = statistics.mean(latencies) if latencies else 0.0
+    stages = {stage: total / requests * 1000 if requests else 0.0 for stage, total in timer.totals.items()}
+    stages["other"] = max(mean_latency * 1000 - sum(stages.values()), 0.0)
+    return {
+        "target": args.target,
+        "concurrency": args.concurrency,
+        "conversations": args.conversations,
+        "turns": args.turns,
+        "llm_latency_s": args.llm_latency,
+        "api_latency_s": args.api_latency,
+        "checkpointer": args.checkpointer,
+        "checkpoint_encoding": {"compression": args.checkpoint_compression, "dedup": not args.no_checkpoint_dedup},
+        "requests": requests,
+        "errors": len(result["errors"]),
+        "error_samples": result["errors"][:5],
+        "duration_s": round(result["duration"], 3),
+        "requests_per_s": round(requests / result["duration"], 2) if result["duration"] else 0.0,
+        "latency_ms": {
+            "mean": round(mean_latency * 1000, 2),
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(max(latencies, default=0.0) * 1000, 2),
+        },
+        "stages_ms_per_request": {stage: round(ms, 2) for stage, ms in stages.items()},
+        "checkpoint_serde_ms_per_request": {
+            "serialize": round(serde.get("dump", 0.0) / requests, 3) if requests else 0.0,
+            "deserialize": round(serde.get("load", 0.0) / requests, 3) if requests else 0.0,
+        },
+        "prompt": {
+            "avg_tokens_sent": round(agent.history.stats.snapshot()["avg_tokens_sent"], 1),
+            "prefix_reuse": agent.history.stats.snapshot()["prefix_reuse"],
+        },
+        "intent_router": routing if args.intent_router else None,
+        "llm_calls_per_request": round(timer.counts["llm"] / requests, 2) if requests else 0.0,
+        "tool_calls_per_request": round(timer.counts["tools"] / requests, 2) if requests else 0.0,
+        "memory": {
+            # ru_maxrss is in KiB on Linux
+            "rss_growth_kb_per_thread": round(max(rss_after - rss_before, 0) / args.conversations, 1),
+            "checkpoint_bytes_per_thread": round((bytes_after - bytes_before) / args.conversations)
+            if bytes_after is not None else None,
+            "checkpoint_stored_bytes_per_thread": round((stored_after - stored_before) / args.conversations)
+            if stored_after is not None else None,
+        },
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    latency = report["latency_ms"]
+    print(f"{report['target']}: {report['requests']} requests ({report['errors']} errors) in "
+          f"{report['duration_s']}s at concurrency {report['concurrency']} -> {report['requests_per_s']} req/s")
+    print(f"latency ms  mean {latency['mean']}  p50 {latency['p50']}  p95 {latency['p95']}  "
+          f"p99 {latency['p99']}  max {latency['max']}")
+    print("stages ms/request  " + "  ".join(f"{k} {v}" for k, v in report["stages_ms_per_request"].items()))
+    serde = report["checkpoint_serde_ms_per_request"]
+    print(f"checkpoint encoding ms/request  serialize {serde['serialize']}  deserialize {serde['deserialize']}")
+    if report["intent_router"]:
+        print(f"intent router  routed {report['intent_router']['routed']}  "
+              f"fallthrough {report['intent_router']['fallthrough']}")
+    print(f"llm calls/request {report['llm_calls_per_request']}  tool calls/request "
+          f"{report['tool_calls_per_request']}")
+    print(f"prompt  tokens sent/call {report['prompt']['avg_tokens_sent']}  "
+          f"prefix reuse {report['prompt']['prefix_reuse']:.0%}")
+    print(f"memory  rss growth {report['memory']['rss_growth_kb_per_thread']} KiB/thread  "
+          f"checkpoints {report['memory']['checkpoint_bytes_per_thread']} B/thread on disk, "
+          f"{report['memory']['checkpoint_stored_bytes_per_thread']} B/thread encoded")
+    for sample in report["error_samples"]:
+        print(f"error: {sample}")
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline chat agent benchmark.")
+    parser.add_argument("--target", choices=TARGETS, default="agent")
+    parser.add_argument("--concurrency", type=int, default=8, help="Conversations in flight at once")
+    parser.add_argument("--conversations", type=int, default=32, help="Threads to run")
+    parser.add_argument("--turns", type=int, default=3, help="Messages per conversation")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per fake LLM call")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Seconds per stub Dog API response")
+    parser.add_argument("--checkpointer", choices=("memory", "sqlite"), default="sqlite")
+    parser.add_argument("--checkpoint-compression", choices=("zstd", "zlib", "none"), default="zstd")
+    parser.add_argument("--no-checkpoint-dedup", action="store_true",
+                        help="Store whole message lists in every checkpoint instead of message references")
+    parser.add_argument("--stable-prefix", action="store_true",
+                        help="Run with PROMPT_CACHE_STABLE=true (fixed system prompt, append-only history)")
+    parser.add_argument("--intent-router", action="store_true",
+                        help="Run with INTENT_ROUTER_ENABLED=true (simple tool requests skip the LLM)")
+    parser.add_argument("--warmup", type=int, default=4, help="Single-turn conversations run before measuring")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="Exit 1 if p95 latency is above this")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    with StubDogApi(latency=args.api_latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            "DOGAPI_BASE_URL": stub.base_url,
+            "DOGAPI_CACHE_PATH": "",
+            "CHECKPOINTER_BACKEND": args.checkpointer,
+            "CHECKPOINTER_COMPRESSION": args.checkpoint_compression,
+            "CHECKPOINTER_DEDUP": "false" if args.no_checkpoint_dedup else "true",
+            "CHECKPOINTER_SQLITE_PATH": os.path.join(tmp, "bench-checkpoints.sqlite"),
+            "ANSWER_CACHE_ENABLED": "false",
+            "PROMPT_CACHE_STABLE": "true" if args.stable_prefix else "false",
+            "INTENT_ROUTER_ENABLED": "true" if args.intent_router else "false",
+            "DEEPSEEK_API_KEY": os.getenv("DEEPSEEK_API_KEY", "bench"),
+        })
+        if args.target == "functions":
+            # The Functions tree reuses the same top-level module names, so it must come first on the path
+            sys.path.insert(0, FUNCTIONS_DIR)
+        import model.chat_model
+        model.chat_model._chat_model = ScriptedChatModel(latency=args.llm_latency)
+
+        report = asyncio.run(benchmark(args))
+        report["upstream_requests"] = stub.requests
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.max_p95_ms is not None and report["latency_ms"]["p95"] > args.max_p95_ms:
+        print(f"p95 {report['latency_ms']['p95']} ms is above --max-p95-ms {args.max_p95_ms}", file=sys.stderr)
+        sys.exit(1)
+    if report["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
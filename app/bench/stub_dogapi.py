@@ -0,0 +1,147 @@
+"""
+Local HTTP server that replays recorded dogapi.dog responses.
+
+Fixtures map "<path>?<query>" (relative to /api/v2, query unencoded and sorted) to the
+JSON body; anything else is a 404, except `facts?limit=N`, which like the live API
+returns N facts drawn at random from all recorded ones. Re-record them against the live API with
+
+    python -m bench.stub_dogapi --record
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "dogapi.json")
+API_PREFIX = "/api/v2/"
+
+
+def fixture_key(path: str, query: str = "") -> str:
+    path = path[len(API_PREFIX):] if path.startswith(API_PREFIX) else path.lstrip("/")
+    params = sorted(parse_qsl(query))
+    return f"{path}?{'&'.join(f'{k}={v}' for k, v in params)}" if params else path
+
+
+def load_fixtures(path: str = FIXTURES_PATH) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class StubDogApi:
+    """
+    Replay server for the Dog API, usable as a context manager.
+
+    `latency` (seconds) is added to every response to model the upstream round trip.
+    `requests` counts the calls served, so runs can report upstream traffic.
+    """
+
+    def __init__(self, fixtures: Optional[Dict[str, Any]] = None, latency: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.fixtures = fixtures if fixtures is not None else load_fixtures()
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._facts = list({fact["id"]: fact for key, payload in self.fixtures.items() if key.startswith("facts")
+                            for fact in payload.get("data", [])}.values())
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                key = fixture_key(url.path, url.query)
+                body = stub.fixtures.get(key)
+                if body is None and stub._facts and key.startswith("facts?limit="):
+                    body = stub.random_facts(int(dict(parse_qsl(url.query)).get("limit") or 1))
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                payload = json.dumps(body if body is not None else {"errors": [{"detail": "not found"}]}).encode()
+                self.send_response(200 if body is not None else 404)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def random_facts(self, limit: int) -> Dict[str, Any]:
+        return {"data": random.sample(self._facts, min(limit, len(self._facts)))}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v2"
+
+    def start(self) -> "StubDogApi":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-dogapi", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "StubDogApi":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def record(path: str = FIXTURES_PATH, base_url: str = "https://dogapi.dog/api/v2", breed_pages: int = 2):
+    """Re-record the fixtures from the live API: list pages, every listed resource, and facts."""
+    import requests
+
+    def get(endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        response = requests.get(f"{base_url}/{endpoint}", params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    fixtures: Dict[str, Any] = {}
+    for kind, pages in (("groups", 1), ("breeds", breed_pages)):
+        for page in range(1, pages + 1):
+            payload = get(kind, {"page[number]": page})
+            if page == pages:
+                # End pagination at the last recorded page so clients don't ask for more
+                payload.setdefault("meta", {}).setdefault("pagination", {}).update(next=None, last=pages)
+            fixtures[f"{kind}?page[number]={page}"] = payload
+            for resource in payload.get("data", []):
+                fixtures[f"{kind}/{resource['id']}"] = {"data": resource}
+        fixtures[kind] = fixtures[f"{kind}?page[number]=1"]
+    for limit in range(1, 6):
+        fixtures[f"facts?limit={limit}"] = get("facts", {"limit": limit})
+    fixtures["facts"] = fixtures["facts?limit=1"]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(fixtures, f, indent=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded Dog API responses.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--record", action="store_true", help="Re-record the fixtures from dogapi.dog")
+    args = parser.parse_args()
+    if args.record:
+        record()
+        return
+    stub = StubDogApi(latency=args.latency, port=args.port)
+    print(f"Serving Dog API fixtures at {stub.base_url}")
+    stub.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
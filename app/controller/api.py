@@ -1,12 +1,34 @@
-from fastapi import FastAPI, Request
-from pydantic import BaseModel
-from typing import Optional
-from uuid import uuid4
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from agents.agent import DogChatAgent
+from agents.batch import BATCH_MAX_CONCURRENCY, BATCH_MAX_ITEMS, BatchJournal, jsonl_stream, normalize_items
+from agents.coordination import idempotency_key, resolve_thread_id
+from utils.async_webclient import close_async_clients
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from memory.memory_manager import HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE, etag_matches
+from utils.admission import AdmissionController, AdmissionRejected, rate_limit_key, release_after
+from utils.sse import sse_stream
+from utils.structured_logging import configure_logging, request_log
+from utils.telemetry import metrics, span
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    yield
+    await close_async_clients()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 agent = DogChatAgent()
+admission = AdmissionController()
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,6 +38,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, e: AdmissionRejected):
+    return ORJSONResponse(status_code=e.status_code, content=e.to_dict(), headers={"Retry-After": e.retry_after_header})
+
+
 class ChatRequest(BaseModel):
     content: str
     thread_id: Optional[str] = None
@@ -24,9 +51,94 @@ class ChatResponse(BaseModel):
     content: str
     thread_id: str
 
+class BatchItem(BaseModel):
+    content: str
+    thread_id: Optional[str] = None
+    id: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    batch_id: Optional[str] = None
+    max_concurrency: Optional[int] = Field(None, ge=1)
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
-    thread_id = request.thread_id or str(uuid4())
-    response = agent.invoke(request.content, thread_id=thread_id)
-    agent_content = response["messages"][-1].content if response and "messages" in response and response["messages"] else ""
+async def chat_endpoint(request: ChatRequest, http_request: Request):
+    key = idempotency_key(http_request.headers)
+    thread_id = resolve_thread_id(request.thread_id, key)
+    client = rate_limit_key(http_request.headers, request.thread_id, getattr(http_request.client, "host", None))
+    with request_log("chat", logger, thread_id=thread_id, message_chars=len(request.content)) as log:
+        with log.timed("agent"):
+            async with admission.admit(client):
+                with span("chat.request", name="/api/chat", thread_id=thread_id):
+                    response = await agent.ainvoke(request.content, thread_id=thread_id, idempotency_key=key)
+        agent_content = response["messages"][-1].content if response and "messages" in response and response["messages"] else ""
+        log.set(response_chars=len(agent_content))
+        log.finish(200)
     return ChatResponse(content=agent_content, thread_id=thread_id)
+
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, http_request: Request):
+    key = idempotency_key(http_request.headers)
+    thread_id = resolve_thread_id(request.thread_id, key)
+    client = rate_limit_key(http_request.headers, request.thread_id, getattr(http_request.client, "host", None))
+    ticket = await admission.acquire(client)
+    events = agent.astream_events(request.content, thread_id=thread_id, idempotency_key=key)
+    return StreamingResponse(
+        release_after(ticket, sse_stream(events)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/chat/batch")
+async def chat_batch_endpoint(request: BatchRequest, http_request: Request):
+    """
+    Run many messages and stream one JSON line per item as it finishes. Resend the
+    same batch_id to resume: items that already succeeded are replayed, not rerun.
+    """
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch can have at most {BATCH_MAX_ITEMS} items")
+    items = [item.model_dump() for item in request.items]
+    try:
+        normalize_items(items)
+        if request.batch_id:
+            BatchJournal(request.batch_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ticket = await admission.acquire(rate_limit_key(http_request.headers, None,
+                                                    getattr(http_request.client, "host", None)))
+    concurrency = min(request.max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    results = agent.abatch_as_completed(items, max_concurrency=concurrency, batch_id=request.batch_id)
+    return StreamingResponse(release_after(ticket, jsonl_stream(results)), media_type="application/x-ndjson")
+
+
+@app.get("/api/threads/{thread_id}/messages")
+async def thread_messages_endpoint(thread_id: str, http_request: Request,
+                                   limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+                                   cursor: Optional[str] = None, include_tools: bool = True):
+    """
+    A thread's messages, newest first, `limit` at a time; pass the returned `next_cursor`
+    as `cursor` for older ones. Send the ETag back in If-None-Match to get a 304 when
+    the thread hasn't changed.
+    """
+    manager = agent.memory_manager(thread_id)
+    headers = {"Cache-Control": "private, no-cache"}
+    if_none_match = http_request.headers.get("if-none-match")
+    if if_none_match:
+        etag = manager.page_etag(await asyncio.to_thread(manager.checkpoint_id), limit, cursor, include_tools)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={**headers, "ETag": etag})
+    try:
+        page = await manager.aget_page(limit, cursor, include_tools)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(page.to_dict(), headers={**headers, "ETag": page.etag})
+
+
+@app.get("/metrics")
+async def metrics_endpoint(format: str = "prometheus"):
+    """Stage latency histograms (LLM, tools, HTTP, checkpoints) and counters; ?format=json for quantiles."""
+    if format == "json":
+        return {**metrics.snapshot(), "admission": admission.stats()}
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
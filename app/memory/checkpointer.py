@@ -0,0 +1,611 @@
+"""
+Persistent LangGraph checkpointers for conversation threads.
+
+SqliteCheckpointSaver is the default backend: one row per checkpoint, channel
+values stored once per (channel, version) so unchanged channels are never
+rewritten, zstd- (or zlib-) compressed blobs, and idle threads evicted after a TTL.
+Message lists are stored by reference: each message is written once per thread
+to a content-addressed `payloads` table, and channel values and pending writes
+hold only the digests. A checkpoint therefore adds just the messages that are new
+since the previous one, and a tool result shared by `messages`,
+`llm_input_messages` and the node's pending write is stored once.
+create_checkpointer() picks the backend from CHECKPOINTER_BACKEND so a shared
+networked store (Postgres) can be used when several instances serve one app.
+"""
+
+import asyncio
+import contextvars
+import functools
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from utils.telemetry import current_span, metrics, span
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = os.path.join(tempfile.gettempdir(), "dogchat-checkpoints.sqlite")
+DEFAULT_THREAD_TTL = float(os.getenv("CHECKPOINTER_THREAD_TTL", str(7 * 24 * 3600)))
+EVICTION_INTERVAL = 300
+COMPRESS_MIN_BYTES = 512
+CHECKPOINTER_COMPRESSION = os.getenv("CHECKPOINTER_COMPRESSION", "zstd" if zstandard else "zlib").lower()
+CHECKPOINTER_DEDUP = os.getenv("CHECKPOINTER_DEDUP", "true").lower() == "true"
+# Message lists are stored as refs: each message's payload digest followed by its id and a NUL.
+# Payloads are encoded without the id, so a message written before and after the messages
+# reducer assigns its id is stored once. "refs" rows from before ids were split out list digests only.
+_REFS_TYPE = "msgrefs"
+_LEGACY_REFS_TYPE = "refs"
+_DIGEST_SIZE = 16
+_SQL_VARIABLES = 500
+
+serde_time = metrics.histogram("checkpoint_serde_ms", "Time spent encoding and decoding checkpoint data")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_last_access ON threads (last_access);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS payloads (
+    thread_id TEXT NOT NULL,
+    digest BLOB NOT NULL,
+    type TEXT,
+    data BLOB,
+    PRIMARY KEY (thread_id, digest)
+) WITHOUT ROWID;
+"""
+
+
+class Codec:
+    """Compresses blobs of at least COMPRESS_MIN_BYTES and tags their type with the codec used."""
+
+    def __init__(self, name: str = CHECKPOINTER_COMPRESSION):
+        if name == "zstd" and zstandard is None:
+            raise ImportError("CHECKPOINTER_COMPRESSION=zstd requires the zstandard package")
+        if name not in ("zstd", "zlib", "none"):
+            raise ValueError(f"Unknown CHECKPOINTER_COMPRESSION '{name}'")
+        self.name = name
+        # zstd contexts are not thread-safe, so each thread gets its own
+        self._local = threading.local()
+
+    def _zstd(self, kind: str):
+        context = getattr(self._local, kind, None)
+        if context is None:
+            context = zstandard.ZstdCompressor(level=3) if kind == "compressor" else zstandard.ZstdDecompressor()
+            setattr(self._local, kind, context)
+        return context
+
+    def encode(self, type_: str, data: Optional[bytes]) -> Tuple[str, Optional[bytes]]:
+        if self.name == "none" or not data or len(data) < COMPRESS_MIN_BYTES:
+            return type_, data
+        if self.name == "zstd":
+            compressed, suffix = self._zstd("compressor").compress(data), "+zstd"
+        else:
+            compressed, suffix = zlib.compress(data), "+zlib"
+        return (type_ + suffix, compressed) if len(compressed) < len(data) else (type_, data)
+
+    def decode(self, type_: str, data: bytes) -> Tuple[str, bytes]:
+        # Blobs written under another setting stay readable
+        if type_.endswith("+zstd"):
+            if zstandard is None:
+                raise ImportError("Reading zstd-compressed checkpoints requires the zstandard package")
+            return type_[:-5], self._zstd("decompressor").decompress(data)
+        if type_.endswith("+zlib"):
+            return type_[:-5], zlib.decompress(data)
+        return type_, data
+
+
+class ThreadedAsyncCheckpointMixin:
+    """Implements the async checkpointer API by running the sync methods on the default executor."""
+
+    async def _run(self, func, *args, **kwargs):
+        # Carry the caller's context so telemetry spans nest under the request
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(None, partial(context.run, func, *args, **kwargs))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._run(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await self._run(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await self._run(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        return await self._run(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await self._run(self.delete_thread, thread_id)
+
+
+class SqliteCheckpointSaver(ThreadedAsyncCheckpointMixin, BaseCheckpointSaver[str]):
+    """LangGraph checkpointer backed by a single SQLite file, safe to share across threads."""
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, *, serde: Optional[SerializerProtocol] = None,
+                 thread_ttl: float = DEFAULT_THREAD_TTL, compression: str = CHECKPOINTER_COMPRESSION,
+                 dedup: bool = CHECKPOINTER_DEDUP):
+        super().__init__(serde=serde)
+        self.path = path
+        self.thread_ttl = thread_ttl
+        self.codec = Codec(compression)
+        self.dedup = dedup
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._last_eviction = time.time()
+
+    # -- encoding -----------------------------------------------------------
+
+    def _dump(self, value: Any) -> Tuple[str, bytes]:
+        return self.codec.encode(*self.serde.dumps_typed(value))
+
+    def _load(self, type_: str, data: bytes) -> Any:
+        return self.serde.loads_typed(self.codec.decode(type_, data))
+
+    def _dump_value(self, value: Any, payloads: Dict[bytes, Tuple[str, bytes]]) -> Tuple[str, Optional[bytes]]:
+        """
+        Encode a channel value or pending write. With dedup on, a list of messages is
+        stored as the concatenated digests of its messages, which are added to `payloads`.
+        """
+        if not (self.dedup and isinstance(value, list) and value
+                and all(isinstance(item, BaseMessage) for item in value)):
+            return self._dump(value)
+        refs = []
+        for message in value:
+            message_id = message.id
+            type_, data = self.serde.dumps_typed(message.model_copy(update={"id": None}))
+            digest = hashlib.blake2b(type_.encode() + b"\0" + data, digest_size=_DIGEST_SIZE).digest()
+            payloads.setdefault(digest, (type_, data))
+            refs.append(digest + (message_id or "").encode() + b"\0")
+        return _REFS_TYPE, b"".join(refs)
+
+    def _load_value(self, type_: str, data: bytes, payloads: Dict[bytes, Tuple[str, bytes]]) -> Any:
+        if type_ not in (_REFS_TYPE, _LEGACY_REFS_TYPE):
+            return self._load(type_, data)
+        messages = []
+        for digest, message_id in _split_refs(type_, data):
+            message = self.serde.loads_typed(payloads[digest])
+            if message_id is not None:
+                message.id = message_id
+            messages.append(message)
+        return messages
+
+    def _store_payloads(self, thread_id: str, payloads: Dict[bytes, Tuple[str, bytes]]) -> int:
+        """Insert the payloads the thread does not hold yet (inside the caller's transaction); returns bytes written."""
+        digests = list(payloads)
+        stored = set()
+        for i in range(0, len(digests), _SQL_VARIABLES):
+            chunk = digests[i:i + _SQL_VARIABLES]
+            stored.update(row[0] for row in self._conn.execute(
+                f"SELECT digest FROM payloads WHERE thread_id = ? AND digest IN ({', '.join('?' * len(chunk))})",
+                (thread_id, *chunk),
+            ))
+        with _timed("dump"):
+            rows = [(thread_id, digest, *self.codec.encode(*payloads[digest]))
+                    for digest in digests if digest not in stored]
+        self._conn.executemany("INSERT OR IGNORE INTO payloads VALUES (?, ?, ?, ?)", rows)
+        return sum(len(row[3] or b"") for row in rows)
+
+    def _fetch_payloads(self, thread_id: str, refs: Sequence[Tuple[str, bytes]]) -> Dict[bytes, Tuple[str, bytes]]:
+        """Decompressed payloads for every digest listed in the (type, data) refs values `refs`."""
+        digests = list({digest for type_, data in refs for digest, _ in _split_refs(type_, data)})
+        rows = []
+        for i in range(0, len(digests), _SQL_VARIABLES):
+            chunk = digests[i:i + _SQL_VARIABLES]
+            rows.extend(self._conn.execute(
+                f"SELECT digest, type, data FROM payloads WHERE thread_id = ? AND digest IN ({', '.join('?' * len(chunk))})",
+                (thread_id, *chunk),
+            ))
+        if len(rows) != len(digests):
+            raise ValueError(f"Checkpoint data for thread '{thread_id}' references missing messages")
+        with _timed("load"):
+            return {digest: self.codec.decode(type_, data) for digest, type_, data in rows}
+
+    # -- reads --------------------------------------------------------------
+
+    def _tuple_from_row(self, thread_id: str, checkpoint_ns: str, row: Sequence[Any],
+                        metadata: Optional[CheckpointMetadata] = None) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_blob, metadata_type, metadata_blob = row
+        with _timed("load"):
+            checkpoint: Checkpoint = self._load(type_, checkpoint_blob)
+        blobs: Dict[str, Tuple[str, bytes]] = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            blob = self._conn.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if blob is not None and blob[0] != "empty":
+                blobs[channel] = blob
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        refs = [(t, data) for t, data in blobs.values() if t in (_REFS_TYPE, _LEGACY_REFS_TYPE)]
+        refs += [(w[2], w[3]) for w in writes if w[2] in (_REFS_TYPE, _LEGACY_REFS_TYPE)]
+        payloads = self._fetch_payloads(thread_id, refs) if refs else {}
+        with _timed("load"):
+            channel_values = {channel: self._load_value(t, data, payloads) for channel, (t, data) in blobs.items()}
+            pending_writes = [(task_id, channel, self._load_value(t, v, payloads)) for task_id, channel, t, v in writes]
+            if metadata is None:
+                metadata = self._load(metadata_type, metadata_blob)
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=metadata,
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                  "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id else None
+            ),
+            pending_writes=pending_writes,
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            self._touch([thread_id])
+            return self._tuple_from_row(thread_id, checkpoint_ns, row)
+
+    def latest_checkpoint_id(self, thread_id: str, checkpoint_ns: str = "") -> Optional[str]:
+        """The thread's newest checkpoint id, without loading the checkpoint (for cheap change checks)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT max(checkpoint_id) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+                (thread_id, checkpoint_ns),
+            ).fetchone()
+        return row[0] if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                 "metadata_type, metadata FROM checkpoints")
+        clauses: List[str] = []
+        params: List[Any] = []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            results = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                metadata = self._load(row[4], row[5])
+                if filter and not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+                results.append(self._tuple_from_row(thread_id, checkpoint_ns, row, metadata))
+        yield from results
+
+    # -- writes -------------------------------------------------------------
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")
+        blob_rows = []
+        payloads: Dict[bytes, Tuple[str, bytes]] = {}
+        with _timed("dump"):
+            for channel, version in new_versions.items():
+                type_, blob = self._dump_value(values[channel], payloads) if channel in values else ("empty", None)
+                blob_rows.append((thread_id, checkpoint_ns, channel, str(version), type_, blob))
+            type_, checkpoint_blob = self._dump(c)
+            metadata_type, metadata_blob = self._dump(get_checkpoint_metadata(config, metadata))
+        written = len(checkpoint_blob) + len(metadata_blob) + sum(len(r[5] or b"") for r in blob_rows)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                written += self._store_payloads(thread_id, payloads)
+                self._conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                     type_, checkpoint_blob, metadata_type, metadata_blob),
+                )
+                self._touch([thread_id])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        _annotate_span(bytes=written, channels=len(blob_rows))
+        self._maybe_evict()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special channels (errors, interrupts...) overwrite; regular writes are insert-once
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        rows = []
+        payloads: Dict[bytes, Tuple[str, bytes]] = {}
+        with _timed("dump"):
+            for idx, (channel, value) in enumerate(writes):
+                type_, blob = self._dump_value(value, payloads)
+                rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                             channel, type_, blob, task_path))
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        written = sum(len(r[7] or b"") for r in rows)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                written += self._store_payloads(thread_id, payloads)
+                self._conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        _annotate_span(bytes=written, writes=len(rows))
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._delete_threads([thread_id])
+
+    # -- eviction -----------------------------------------------------------
+
+    def _touch(self, thread_ids: Sequence[str]):
+        now = time.time()
+        self._conn.executemany(
+            "INSERT INTO threads VALUES (?, ?) ON CONFLICT(thread_id) DO UPDATE SET last_access = excluded.last_access",
+            [(thread_id, now) for thread_id in thread_ids],
+        )
+
+    def _delete_threads(self, thread_ids: Sequence[str]):
+        params = [(thread_id,) for thread_id in thread_ids]
+        self._conn.execute("BEGIN")
+        try:
+            for table in ("checkpoints", "blobs", "writes", "payloads", "threads"):
+                self._conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", params)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def evict_idle(self, ttl: Optional[float] = None) -> int:
+        """Delete threads not read or written for `ttl` seconds; returns how many were evicted."""
+        cutoff = time.time() - (self.thread_ttl if ttl is None else ttl)
+        with self._lock:
+            idle = [row[0] for row in self._conn.execute(
+                "SELECT thread_id FROM threads WHERE last_access < ?", (cutoff,)).fetchall()]
+            if idle:
+                self._delete_threads(idle)
+        if idle:
+            logger.info("Evicted %d idle threads from %s", len(idle), self.path)
+        return len(idle)
+
+    def _maybe_evict(self):
+        if self.thread_ttl <= 0 or time.time() - self._last_eviction < EVICTION_INTERVAL:
+            return
+        self._last_eviction = time.time()
+        try:
+            self.evict_idle()
+        except sqlite3.Error:
+            logger.exception("Idle thread eviction failed")
+
+    def stored_bytes(self, thread_id: Optional[str] = None) -> int:
+        """Encoded checkpoint data held for one thread or all of them, without SQLite's page overhead."""
+        columns = {"checkpoints": "length(checkpoint) + length(metadata)", "blobs": "length(blob)",
+                   "writes": "length(value)", "payloads": "length(data)"}
+        where, params = ("WHERE thread_id = ?", (thread_id,)) if thread_id else ("", ())
+        with self._lock:
+            return sum(self._conn.execute(f"SELECT coalesce(sum({column}), 0) FROM {table} {where}", params)
+                       .fetchone()[0] for table, column in columns.items())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+@contextmanager
+def _timed(op: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        serde_time.observe((time.perf_counter() - start) * 1000, op=op)
+
+
+CHECKPOINT_SPANS = {
+    "get_tuple": "checkpoint.read", "aget_tuple": "checkpoint.read",
+    "put": "checkpoint.write", "aput": "checkpoint.write",
+    "put_writes": "checkpoint.write_pending", "aput_writes": "checkpoint.write_pending",
+}
+
+
+def _split_refs(type_: str, data: bytes) -> List[Tuple[bytes, Optional[str]]]:
+    """(digest, message id) pairs of a refs value; legacy refs keep the id in the payload (None here)."""
+    if type_ == _LEGACY_REFS_TYPE:
+        return [(data[i:i + _DIGEST_SIZE], None) for i in range(0, len(data), _DIGEST_SIZE)]
+    refs, i = [], 0
+    while i < len(data):
+        end = data.index(b"\0", i + _DIGEST_SIZE)
+        refs.append((data[i:i + _DIGEST_SIZE], data[i + _DIGEST_SIZE:end].decode() or None))
+        i = end + 1
+    return refs
+
+
+def _annotate_span(**attributes):
+    current = current_span()
+    if current is not None and current.name.startswith("checkpoint."):
+        current.set_attributes(attributes)
+
+
+def trace_checkpointer(saver: BaseCheckpointSaver) -> BaseCheckpointSaver:
+    """
+    Wrap a saver's read and write methods in checkpoint.* telemetry spans.
+
+    Async methods that delegate to the sync ones (as the threaded mixin and MemorySaver do)
+    produce one span per call, not two.
+    """
+    def in_checkpoint_span() -> bool:
+        current = current_span()
+        return current is not None and current.name.startswith("checkpoint.")
+
+    for method_name, span_name in CHECKPOINT_SPANS.items():
+        method = getattr(saver, method_name)
+        if asyncio.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def traced(*args, _method=method, _span_name=span_name, **kwargs):
+                if in_checkpoint_span():
+                    return await _method(*args, **kwargs)
+                with span(_span_name, name=type(saver).__name__):
+                    return await _method(*args, **kwargs)
+        else:
+            @functools.wraps(method)
+            def traced(*args, _method=method, _span_name=span_name, **kwargs):
+                if in_checkpoint_span():
+                    return _method(*args, **kwargs)
+                with span(_span_name, name=type(saver).__name__):
+                    return _method(*args, **kwargs)
+        setattr(saver, method_name, traced)
+    return saver
+
+
+def create_checkpointer(backend: Optional[str] = None) -> BaseCheckpointSaver:
+    """
+    Build the checkpointer selected by CHECKPOINTER_BACKEND.
+
+    - "sqlite" (default): SqliteCheckpointSaver at CHECKPOINTER_SQLITE_PATH
+    - "memory": in-process MemorySaver (history is lost on restart)
+    - "postgres": langgraph-checkpoint-postgres PostgresSaver at CHECKPOINTER_POSTGRES_URL,
+      shared by every instance of the app
+
+    Reads and writes are traced with trace_checkpointer().
+    """
+    backend = (backend or os.getenv("CHECKPOINTER_BACKEND", "sqlite")).lower()
+    if backend == "memory":
+        from langgraph.checkpoint.memory import MemorySaver
+        return trace_checkpointer(MemorySaver())
+    if backend == "sqlite":
+        return trace_checkpointer(SqliteCheckpointSaver(os.getenv("CHECKPOINTER_SQLITE_PATH", DEFAULT_SQLITE_PATH)))
+    if backend == "postgres":
+        try:
+            from langgraph.checkpoint.postgres import PostgresSaver
+            from psycopg.rows import dict_row
+            from psycopg_pool import ConnectionPool
+        except ImportError as e:
+            raise ImportError("CHECKPOINTER_BACKEND=postgres requires langgraph-checkpoint-postgres "
+                              "and psycopg-pool") from e
+
+        class ThreadedPostgresSaver(ThreadedAsyncCheckpointMixin, PostgresSaver):
+            pass
+
+        pool = ConnectionPool(
+            os.environ["CHECKPOINTER_POSTGRES_URL"],
+            max_size=int(os.getenv("CHECKPOINTER_POSTGRES_POOL_SIZE", "10")),
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        )
+        saver = ThreadedPostgresSaver(pool)
+        saver.setup()
+        return trace_checkpointer(saver)
+    raise ValueError(f"Unknown CHECKPOINTER_BACKEND '{backend}'")
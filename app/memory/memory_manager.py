@@ -1,12 +1,122 @@
+import hashlib
+import os
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langgraph.graph.state import CompiledStateGraph
+
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "100"))
+
+
+def is_tool_traffic(message: BaseMessage) -> bool:
+    """Tool results, and AI turns that only call tools (no text for the user)."""
+    if isinstance(message, ToolMessage):
+        return True
+    return isinstance(message, AIMessage) and bool(message.tool_calls) and not message.content
+
+
+def message_to_dict(message: BaseMessage) -> Dict[str, Any]:
+    data: Dict[str, Any] = {"id": message.id, "type": message.type, "content": message.content}
+    if isinstance(message, AIMessage) and message.tool_calls:
+        data["tool_calls"] = [{"id": call["id"], "name": call["name"], "args": call["args"]}
+                              for call in message.tool_calls]
+    if isinstance(message, ToolMessage):
+        data.update(name=message.name, tool_call_id=message.tool_call_id)
+    return data
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag` (weak comparison, as RFC 9110 asks for)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+class HistoryPage:
+    """One page of a thread's messages, newest first, and the cursor for the older ones."""
+
+    def __init__(self, thread_id: str, messages: List[BaseMessage], next_cursor: Optional[str], etag: str):
+        self.thread_id = thread_id
+        self.messages = messages
+        self.next_cursor = next_cursor
+        self.etag = etag
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"thread_id": self.thread_id, "messages": [message_to_dict(m) for m in self.messages],
+                "next_cursor": self.next_cursor}
 
-from langgraph.checkpoint.memory import MemorySaver
 
 class ChatMemoryManager:
-    def __init__(self, thread_id: str):
-        self.memory = MemorySaver({"configurable": {"thread_id": thread_id}})
+    """
+    Read and write one thread's conversation through the agent graph's checkpointer.
+
+    Going through the compiled graph (rather than the checkpointer directly) keeps the
+    messages reducer and channel versions consistent with what the agent itself writes.
+    """
+
+    def __init__(self, thread_id: str, agent_executor: CompiledStateGraph):
+        self.thread_id = thread_id
+        self.agent_executor = agent_executor
+        self.config = {"configurable": {"thread_id": thread_id}}
 
     def save_message(self, message: str, role: str = "user"):
-        self.memory.save({"role": role, "content": message})
+        self.agent_executor.update_state(self.config, {"messages": [{"role": role, "content": message}]},
+                                         as_node="agent")
+
+    def get_history(self) -> List[Any]:
+        state = self.agent_executor.get_state(self.config)
+        return list(state.values.get("messages", [])) if state else []
+
+    def clear(self):
+        self.agent_executor.checkpointer.delete_thread(self.thread_id)
+
+    # -- paged reads ----------------------------------------------------------
+
+    def checkpoint_id(self) -> Optional[str]:
+        """The thread's newest checkpoint id; the SQLite checkpointer answers without decoding any state."""
+        latest = getattr(self.agent_executor.checkpointer, "latest_checkpoint_id", None)
+        if latest is not None:
+            return latest(self.thread_id)
+        checkpoint = self.agent_executor.checkpointer.get_tuple(self.config)
+        return checkpoint.config["configurable"].get("checkpoint_id") if checkpoint else None
+
+    def page_etag(self, checkpoint_id: Optional[str], limit: int, cursor: Optional[str], include_tools: bool) -> str:
+        # A new checkpoint is written whenever the thread changes, so its id versions the whole history
+        key = f"{self.thread_id}\0{checkpoint_id}\0{limit}\0{cursor}\0{include_tools}".encode()
+        return f'W/"{hashlib.blake2b(key, digest_size=12).hexdigest()}"'
+
+    def get_page(self, limit: int = HISTORY_PAGE_SIZE, cursor: Optional[str] = None,
+                 include_tools: bool = True) -> HistoryPage:
+        """
+        Up to `limit` messages older than the message id `cursor` (newest first when
+        no cursor is given). Raises ValueError for a cursor not in the thread.
+        """
+        return self._page(self.agent_executor.get_state(self.config), limit, cursor, include_tools)
+
+    async def aget_page(self, limit: int = HISTORY_PAGE_SIZE, cursor: Optional[str] = None,
+                        include_tools: bool = True) -> HistoryPage:
+        return self._page(await self.agent_executor.aget_state(self.config), limit, cursor, include_tools)
 
-    def get_history(self):
-        return self.memory.load()
+    def _page(self, state, limit: int, cursor: Optional[str], include_tools: bool) -> HistoryPage:
+        limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+        messages = list(state.values.get("messages", [])) if state else []
+        checkpoint_id = state.config["configurable"].get("checkpoint_id") if state and state.config else None
+        end = len(messages)
+        if cursor is not None:
+            end = next((i for i, message in enumerate(messages) if message.id == cursor), -1)
+            if end < 0:
+                raise ValueError(f"Unknown cursor '{cursor}'")
+        page: List[BaseMessage] = []
+        index = end - 1
+        while index >= 0 and len(page) < limit:
+            if include_tools or not is_tool_traffic(messages[index]):
+                page.append(messages[index])
+            index -= 1
+        older = any(include_tools or not is_tool_traffic(message) for message in messages[:index + 1])
+        next_cursor = page[-1].id if page and older else None
+        return HistoryPage(self.thread_id, page, next_cursor,
+                           self.page_etag(checkpoint_id, limit, cursor, include_tools))
@@ -1,9 +1,27 @@
-
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from langchain.chat_models import init_chat_model
+_chat_model = None
+_lock = threading.Lock()
+
+
+def get_chat_model():
+    """Build the chat model on first use; importing langchain and the provider SDK costs ~1s of cold start."""
+    global _chat_model
+    if _chat_model is None:
+        with _lock:
+            if _chat_model is None:
+                # Routes across providers when more than one is configured (see model/router.py)
+                from model.router import create_chat_model
+                _chat_model = create_chat_model()
+    return _chat_model
+
 
-chat_model = init_chat_model("deepseek-chat", model_provider="deepseek")
\ No newline at end of file
+def __getattr__(name):
+    # Keep `from model.chat_model import chat_model` working
+    if name == "chat_model":
+        return get_chat_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.utils.admission import AdmissionController, AdmissionRejected, RateLimiter, rate_limit_key
+
+
+def test_token_bucket_allows_burst_then_refills():
+    limiter = RateLimiter(rate_per_minute=60, burst=2)
+    assert limiter.try_acquire("u", now=0.0) == (True, 0.0)
+    assert limiter.try_acquire("u", now=0.0) == (True, 0.0)
+    allowed, retry_after = limiter.try_acquire("u", now=0.0)
+    assert not allowed and retry_after == pytest.approx(1.0)
+    assert limiter.try_acquire("other", now=0.0)[0]
+    assert limiter.try_acquire("u", now=1.0)[0]
+
+
+def test_rate_limiter_disabled_and_bounded():
+    assert RateLimiter(rate_per_minute=0, burst=0).try_acquire("u") == (True, 0.0)
+    limiter = RateLimiter(rate_per_minute=60, burst=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        limiter.try_acquire(key, now=0.0)
+    assert list(limiter._buckets) == ["b", "c"]
+
+
+def test_rate_limit_key_prefers_user_then_thread():
+    assert rate_limit_key({"X-MS-CLIENT-PRINCIPAL-ID": "abc"}, "t1", "1.2.3.4") == "user:abc"
+    assert rate_limit_key({}, "t1", "1.2.3.4") == "thread:t1"
+    assert rate_limit_key({}, None, "1.2.3.4") == "client:1.2.3.4"
+
+
+def test_rejection_payload():
+    e = AdmissionRejected("queue_full", 2.2)
+    assert e.retry_after_header == "3"
+    assert e.to_dict()["retry_after"] == 3 and e.to_dict()["error"] == "queue_full"
+
+
+def test_concurrency_cap_serves_queue_in_order():
+    async def main():
+        controller = AdmissionController(max_concurrent=2, max_queue=10, queue_timeout=5,
+                                         rate_limiter=RateLimiter(rate_per_minute=0))
+        order, peak = [], []
+
+        async def run(i):
+            async with controller.admit():
+                order.append(i)
+                peak.append(controller.running)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(run(i) for i in range(6)))
+        return controller, order, peak
+
+    controller, order, peak = asyncio.run(main())
+    assert order == list(range(6))
+    assert max(peak) == 2
+    assert controller.running == 0 and controller.waiting == 0
+
+
+def test_queue_full_and_timeout_reject():
+    async def main():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05,
+                                         rate_limiter=RateLimiter(rate_per_minute=0))
+        held = await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.acquire()
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await waiter
+        held.release()
+        return controller, full.value, timed_out.value
+
+    controller, full, timed_out = asyncio.run(main())
+    assert full.reason == "queue_full"
+    assert timed_out.reason == "queue_timeout"
+    assert controller.running == 0 and controller.waiting == 0
+
+
+def test_rate_limited_before_queueing():
+    async def main():
+        controller = AdmissionController(max_concurrent=4, rate_limiter=RateLimiter(rate_per_minute=60, burst=1))
+        (await controller.acquire("user:a")).release()
+        with pytest.raises(AdmissionRejected) as e:
+            await controller.acquire("user:a")
+        return e.value
+
+    assert asyncio.run(main()).reason == "rate_limited"
+
+
+def test_cancelled_waiter_passes_slot_on():
+    async def main():
+        controller = AdmissionController(max_concurrent=1, max_queue=5, queue_timeout=5,
+                                         rate_limiter=RateLimiter(rate_per_minute=0))
+        held = await controller.acquire()
+        gone = asyncio.create_task(controller.acquire())
+        next_in_line = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        gone.cancel()
+        held.release()
+        admitted = await asyncio.wait_for(next_in_line, 1)
+        assert controller.running == 1
+        admitted.release()
+        return controller
+
+    controller = asyncio.run(main())
+    assert controller.running == 0
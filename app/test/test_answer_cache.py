@@ -0,0 +1,73 @@
+import asyncio
+
+from langgraph.checkpoint.memory import MemorySaver
+
+import app.agents.agent as agent_module
+from app.agents.answer_cache import AnswerCache
+from app.bench.fake_model import ScriptedChatModel
+
+
+def test_exact_match_after_normalization():
+    cache = AnswerCache()
+    cache.store("What breeds are in the Herding group?", "Collies and more")
+    assert cache.lookup("what breeds are in the herding group") == ("Collies and more", "exact")
+
+
+def test_near_match_on_content_words():
+    cache = AnswerCache(similarity=0.9)
+    cache.store("What breeds are in the herding group?", "Collies and more")
+    assert cache.lookup("Which breed is in herding group") == ("Collies and more", "near")
+    assert cache.lookup("What breeds are in the toy group?") is None
+
+
+def test_near_match_respects_word_order():
+    cache = AnswerCache(similarity=0.9)
+    cache.store("is a beagle bigger than a poodle", "Yes, beagle is bigger.")
+    assert cache.lookup("is a poodle bigger than a beagle") is None
+    assert cache.lookup("is the beagle bigger than the poodle") == ("Yes, beagle is bigger.", "near")
+
+
+def test_numbers_must_match():
+    cache = AnswerCache()
+    cache.store("list 3 dog groups", "three groups")
+    assert cache.lookup("list 5 dog groups") is None
+
+
+def test_ttl_lru_and_hit_rate():
+    cache = AnswerCache(max_entries=1)
+    cache.store("tell me about beagles", "beagle answer")
+    cache.store("tell me about boxers", "boxer answer")
+    assert cache.lookup("tell me about beagles") is None
+
+    expired = AnswerCache(ttl=-1)
+    expired.store("tell me about boxers", "boxer answer")
+    assert expired.lookup("tell me about boxers") is None
+    assert cache.stats()["hit_rate"] == 0.0
+
+
+def test_non_deterministic_tools_are_not_cacheable():
+    assert AnswerCache.is_cacheable(["find_dog_breed"])
+    assert not AnswerCache.is_cacheable(["find_dog_breed", "list_dog_facts"])
+
+
+def test_streaming_turns_fill_and_hit_the_cache(monkeypatch):
+    monkeypatch.setattr(agent_module, "get_chat_model", lambda: ScriptedChatModel())
+    cache = AnswerCache()
+    agent = agent_module.DogChatAgent(checkpointer=MemorySaver(), answer_cache=cache, tools="list_dog_facts",
+                                      intent_router=False)
+    answer = agent.stream("Thanks, that's all!", "t1")
+    assert cache.lookup("thanks that's all") == (answer, "exact")
+
+    async def stream(thread_id):
+        return [event async for event in agent.astream_events("Thanks, that's all!", thread_id)]
+
+    events = asyncio.run(stream("t2"))
+    assert [e["event"] for e in events] == ["token", "done"] and events[-1]["data"]["content"] == answer
+    history = agent.agent_executor.get_state({"configurable": {"thread_id": "t2"}}).values["messages"]
+    assert history[-1].response_metadata == {"answer_cache": "exact"}
+    assert agent.chat("Thanks, that's all!", "t3") == answer
+    assert cache.stats()["exact_hits"] == 3
+
+    cache = agent.answer_cache = AnswerCache()
+    asyncio.run(stream("t4"))
+    assert cache.lookup("Thanks, that's all!") == (answer, "exact")
@@ -0,0 +1,51 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from app.utils.async_webclient import AsyncWebClient, close_async_clients
+from app.utils.response_cache import ResponseCache
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_GET(self):
+        type(self).calls += 1
+        status = 429 if type(self).calls == 1 else 200
+        body = json.dumps({"calls": type(self).calls}).encode()
+        self.send_response(status)
+        self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    _FlakyHandler.calls = 0
+    server = HTTPServer(("127.0.0.1", 0), _FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_async_client_retries_and_caches(stub_server):
+    async def run():
+        client = AsyncWebClient(stub_server, backoff_factor=0, cache=ResponseCache(ttls={"breeds": 60}))
+        try:
+            first = await client.get_json("breeds")
+            second = await client.get_json("breeds")
+        finally:
+            await close_async_clients()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == {"calls": 2}
+    assert _FlakyHandler.calls == 2
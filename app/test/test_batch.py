@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+import app.agents.agent as agent_module
+from app.agents.batch import BatchJournal, batch_waves, normalize_items
+from app.bench.fake_model import ScriptedChatModel
+
+
+class FlakyModel(ScriptedChatModel):
+    """Fails on prompts containing 'fail' until `healed` is set."""
+
+    healed: bool = False
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if not self.healed and "fail" in messages[-1].content:
+            raise RuntimeError("model unavailable")
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._generate(messages, stop, run_manager, **kwargs)
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    model = FlakyModel()
+    monkeypatch.setattr(agent_module, "get_chat_model", lambda: model)
+    monkeypatch.setattr(agent_module.DogChatAgent, "warm_up", lambda self: None)
+    monkeypatch.setattr(agent_module, "get_dog_index", lambda: type("Index", (), {
+        "prefetch": lambda self: None, "ensure_loaded": lambda self: None})())
+    dog_agent = agent_module.DogChatAgent(checkpointer=MemorySaver())
+    dog_agent.model_under_test = model
+    return dog_agent
+
+
+def test_normalize_items_and_waves():
+    items = normalize_items(["hi", ("again", "t1"), {"id": "x", "content": "more", "thread_id": "t1"}])
+    assert [item["id"] for item in items] == ["0", "1", "x"]
+    waves = batch_waves(items)
+    assert [[item["id"] for item in wave] for wave in waves] == [["0", "1"], ["x"]]
+    with pytest.raises(ValueError):
+        normalize_items([{"id": "a", "content": "1"}, {"id": "a", "content": "2"}])
+
+
+def test_journal_keeps_latest_success(tmp_path):
+    journal = BatchJournal("run-1", directory=str(tmp_path))
+    journal.append({"id": "a", "content": None, "error": "boom"})
+    journal.append({"id": "b", "content": "ok", "error": None})
+    journal.append({"id": "a", "content": "fixed", "error": None})
+    assert {key: result["content"] for key, result in journal.completed().items()} == {"a": "fixed", "b": "ok"}
+    with pytest.raises(ValueError):
+        BatchJournal("../escape")
+
+
+def test_batch_runs_in_order_and_resumes(agent, tmp_path, monkeypatch):
+    monkeypatch.setattr(agent_module, "BatchJournal", lambda batch_id: BatchJournal(batch_id, str(tmp_path)))
+    items = [("hello", "t1"), ("please fail", None), ("second turn", "t1")]
+    results = agent.batch(items, max_concurrency=2, batch_id="nightly")
+    assert [r["id"] for r in results] == ["0", "1", "2"]
+    assert results[0]["error"] is None and results[2]["error"] is None
+    assert "RuntimeError" in results[1]["error"]
+    history = agent.agent_executor.get_state({"configurable": {"thread_id": "t1"}}).values["messages"]
+    assert [m.content for m in history if m.type == "human"] == ["hello", "second turn"]
+
+    agent.model_under_test.healed = True
+    resumed = agent.batch(items, max_concurrency=2, batch_id="nightly")
+    assert [r.get("resumed", False) for r in resumed] == [True, False, True]
+    assert all(r["error"] is None for r in resumed)
+
+
+def test_abatch_streams_results(agent):
+    async def collect():
+        return [r async for r in agent.abatch_as_completed(["one", "two", "three"], max_concurrency=2)]
+
+    results = asyncio.run(collect())
+    assert sorted(r["id"] for r in results) == ["0", "1", "2"]
+    assert all(r["content"] and r["error"] is None for r in results)
+
+
+def test_stream_and_batch_wait_for_the_threads_turn(agent):
+    released = threading.Event()
+
+    def hold_turn():
+        with agent.coordinator.lock("t1"):
+            time.sleep(0.2)
+            released.set()
+
+    for run in (lambda: agent.stream("hello", thread_id="t1"), lambda: agent.batch([("hello", "t1")])):
+        holder = threading.Thread(target=hold_turn)
+        holder.start()
+        time.sleep(0.02)
+        run()
+        assert released.is_set(), "ran while another turn held the thread"
+        holder.join()
+        released.clear()
+
+    async def abatch_behind_astream():
+        async def held_turn():
+            async with agent.coordinator.alock("t2"):
+                await asyncio.sleep(0.1)
+                order.append("turn")
+
+        order = []
+        holder = asyncio.ensure_future(held_turn())
+        await asyncio.sleep(0)
+        async for _ in agent.abatch_as_completed([("hello", "t2")]):
+            order.append("batch")
+        async for _ in agent.astream("again", thread_id="t2"):
+            pass
+        await holder
+        return order
+
+    assert asyncio.run(abatch_behind_astream()) == ["turn", "batch"]
+
+
+def test_batch_limit_is_not_an_items_tool_concurrency(agent, monkeypatch):
+    def no_index():
+        raise AssertionError("batch loaded the breed index for an agent without breed tools")
+
+    monkeypatch.setattr(agent_module, "get_dog_index", no_index)
+    agent._uses_dog_index = False
+    seen = []
+    run_item = agent._batch_item
+    agent._batch_item = lambda item_input, config: seen.append(config["max_concurrency"]) or run_item(item_input, config)
+    results = agent.batch(["one", "two", "three"], max_concurrency=1)
+    assert all(r["error"] is None for r in results)
+    assert seen == [agent_module.TOOL_MAX_CONCURRENCY] * 3
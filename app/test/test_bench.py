@@ -0,0 +1,43 @@
+import requests
+from langchain_core.messages import HumanMessage, ToolMessage
+
+from app.bench.fake_model import ScriptedChatModel
+from app.bench.run import percentile
+from app.bench.stub_dogapi import StubDogApi, fixture_key
+
+
+def test_fixture_key_strips_prefix_and_sorts_query():
+    assert fixture_key("/api/v2/breeds", "page%5Bnumber%5D=2") == "breeds?page[number]=2"
+    assert fixture_key("/api/v2/facts", "limit=3&a=1") == "facts?a=1&limit=3"
+    assert fixture_key("/api/v2/groups") == "groups"
+
+
+def test_stub_replays_fixtures_and_counts_requests():
+    fixtures = {"breeds?page[number]=1": {"data": [{"id": "b1"}]}}
+    with StubDogApi(fixtures=fixtures) as stub:
+        ok = requests.get(f"{stub.base_url}/breeds", params={"page[number]": 1}, timeout=5)
+        missing = requests.get(f"{stub.base_url}/breeds/unknown", timeout=5)
+    assert ok.json() == {"data": [{"id": "b1"}]}
+    assert missing.status_code == 404
+    assert stub.requests == 2
+
+
+def test_scripted_model_calls_tools_then_answers():
+    model = ScriptedChatModel(script=[("Compare A and B", [
+        {"name": "find_dog_breed", "args": {"name": "a"}},
+        {"name": "find_dog_breed", "args": {"name": "b"}},
+    ])])
+    first = model.invoke([HumanMessage("Compare A and B")])
+    assert [call["args"]["name"] for call in first.tool_calls] == ["a", "b"]
+    assert len({call["id"] for call in first.tool_calls}) == 2
+    results = [ToolMessage("{}", tool_call_id=call["id"], name=call["name"]) for call in first.tool_calls]
+    final = model.invoke([HumanMessage("Compare A and B"), first, *results])
+    assert not final.tool_calls and "Compare A and B" in final.content
+    assert final.usage_metadata["input_tokens"] > 0
+
+
+def test_percentile_uses_nearest_rank():
+    values = [0.1 * i for i in range(1, 101)]
+    assert percentile(values, 50) == values[49]
+    assert percentile(values, 99) == values[98]
+    assert percentile([], 95) == 0.0
@@ -0,0 +1,160 @@
+import asyncio
+import zlib
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langgraph.prebuilt import create_react_agent
+
+import pytest
+
+from app.memory.checkpointer import Codec, SqliteCheckpointSaver
+from app.memory.memory_manager import ChatMemoryManager, etag_matches
+
+
+class EchoToolModel(BaseChatModel):
+    """Calls the echo tool once per user turn, then answers with its result."""
+
+    @property
+    def _llm_type(self):
+        return "echo-tool"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        last = messages[-1]
+        if last.type == "human":
+            message = AIMessage(content="", tool_calls=[{"name": "echo", "args": {"text": last.content}, "id": "c1"}])
+        else:
+            message = AIMessage(content=f"you said {last.content}")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+@tool
+def echo(text: str):
+    """Echo the text back."""
+    return text * 100
+
+
+def _graph(saver):
+    return create_react_agent(EchoToolModel(), [echo], checkpointer=saver)
+
+
+def test_history_survives_a_new_saver_instance(tmp_path):
+    path = str(tmp_path / "threads.sqlite")
+    config = {"configurable": {"thread_id": "t1"}}
+    _graph(SqliteCheckpointSaver(path)).invoke({"messages": [{"role": "user", "content": "hi"}]}, config)
+
+    restarted = _graph(SqliteCheckpointSaver(path))
+    result = restarted.invoke({"messages": [{"role": "user", "content": "again"}]}, config)
+    assert [m.type for m in result["messages"]] == ["human", "ai", "tool", "ai"] * 2
+    assert len(list(restarted.checkpointer.list(config))) > 1
+
+
+def test_async_path_and_memory_manager(tmp_path):
+    saver = SqliteCheckpointSaver(str(tmp_path / "threads.sqlite"))
+    graph = _graph(saver)
+    config = {"configurable": {"thread_id": "t2"}}
+    asyncio.run(graph.ainvoke({"messages": [{"role": "user", "content": "hey"}]}, config))
+
+    manager = ChatMemoryManager("t2", graph)
+    manager.save_message("a note", role="assistant")
+    history = manager.get_history()
+    assert history[0].content == "hey" and history[-1].content == "a note"
+
+    manager.clear()
+    assert manager.get_history() == []
+
+
+def test_history_pages_newest_first_with_cursor_and_etag(tmp_path):
+    saver = SqliteCheckpointSaver(str(tmp_path / "threads.sqlite"))
+    graph = _graph(saver)
+    config = {"configurable": {"thread_id": "t3"}}
+    for text in ("one", "two", "three"):
+        graph.invoke({"messages": [{"role": "user", "content": text}]}, config)
+    manager = ChatMemoryManager("t3", graph)
+
+    first = manager.get_page(limit=3)
+    assert [m["type"] for m in first.to_dict()["messages"]] == ["ai", "tool", "ai"]
+    second = manager.get_page(limit=3, cursor=first.next_cursor)
+    assert second.messages[0].content == "three" and second.next_cursor
+    chat_only = manager.get_page(limit=4, include_tools=False)
+    assert [m.content for m in chat_only.messages][1::2] == ["three", "two"]
+    rest = manager.get_page(limit=4, cursor=chat_only.next_cursor, include_tools=False)
+    assert [m.type for m in rest.messages] == ["ai", "human"] and rest.next_cursor is None
+    with pytest.raises(ValueError):
+        manager.get_page(cursor="missing")
+
+    etag = manager.page_etag(manager.checkpoint_id(), 3, None, True)
+    assert etag == first.etag and etag_matches(f'"x", {etag}', etag)
+    graph.invoke({"messages": [{"role": "user", "content": "four"}]}, config)
+    assert not etag_matches(first.etag, manager.get_page(limit=3).etag)
+
+
+def test_idle_threads_are_evicted(tmp_path):
+    saver = SqliteCheckpointSaver(str(tmp_path / "threads.sqlite"))
+    graph = _graph(saver)
+    for thread_id in ("old", "new"):
+        graph.invoke({"messages": [{"role": "user", "content": "x"}]}, {"configurable": {"thread_id": thread_id}})
+    saver._conn.execute("UPDATE threads SET last_access = 0 WHERE thread_id = 'old'")
+
+    assert saver.evict_idle(ttl=60) == 1
+    assert saver.get_tuple({"configurable": {"thread_id": "old"}}) is None
+    assert saver.get_tuple({"configurable": {"thread_id": "new"}}) is not None
+
+
+def test_failed_delete_rolls_back(tmp_path):
+    saver = SqliteCheckpointSaver(str(tmp_path / "threads.sqlite"))
+    graph = _graph(saver)
+    graph.invoke({"messages": [{"role": "user", "content": "x"}]}, {"configurable": {"thread_id": "t1"}})
+    saver._conn.execute("ALTER TABLE threads RENAME TO threads_moved")
+    with pytest.raises(Exception):
+        saver.delete_thread("t1")
+    saver._conn.execute("ALTER TABLE threads_moved RENAME TO threads")
+    # The partial delete was undone and the connection isn't left inside a transaction
+    assert saver.get_tuple({"configurable": {"thread_id": "t1"}}) is not None
+    saver.delete_thread("t1")
+    assert saver.get_tuple({"configurable": {"thread_id": "t1"}}) is None
+
+
+def test_messages_are_stored_once_per_thread(tmp_path):
+    saver = SqliteCheckpointSaver(str(tmp_path / "threads.sqlite"))
+    graph = _graph(saver)
+    config = {"configurable": {"thread_id": "t3"}}
+    for text in ("one", "two"):
+        graph.invoke({"messages": [{"role": "user", "content": text}]}, config)
+
+    # human, tool call, tool result, answer per turn
+    assert saver._conn.execute("SELECT count(*) FROM payloads WHERE thread_id = 't3'").fetchone()[0] == 8
+    types = {row[0] for row in saver._conn.execute("SELECT type FROM blobs WHERE channel = 'messages'")}
+    assert types <= {"msgrefs", "empty"}
+    messages = graph.get_state(config).values["messages"]
+    assert [m.content for m in messages if m.type == "tool"] == ["one" * 100, "two" * 100]
+
+    full = SqliteCheckpointSaver(str(tmp_path / "full.sqlite"), dedup=False)
+    full_graph = _graph(full)
+    for text in ("one", "two"):
+        full_graph.invoke({"messages": [{"role": "user", "content": text}]}, config)
+    assert saver.stored_bytes("t3") < full.stored_bytes("t3")
+
+    # Identical messages share a payload but keep their own ids
+    graph.update_state(config, {"messages": [{"role": "user", "content": "one"}]}, as_node="agent")
+    humans = [m for m in graph.get_state(config).values["messages"] if m.type == "human"]
+    assert humans[0].content == humans[2].content and humans[0].id != humans[2].id
+    assert saver._conn.execute("SELECT count(*) FROM payloads WHERE thread_id = 't3'").fetchone()[0] == 8
+
+    saver.delete_thread("t3")
+    assert saver.stored_bytes() == 0
+
+
+def test_codec_reads_other_compressions():
+    data = b"woof " * 200
+    zstd_type, zstd_data = Codec("zstd").encode("msgpack", data)
+    assert zstd_type == "msgpack+zstd" and len(zstd_data) < len(data)
+    assert Codec("zlib").decode(zstd_type, zstd_data) == ("msgpack", data)
+    assert Codec("zstd").decode("msgpack+zlib", zlib.compress(data)) == ("msgpack", data)
+    assert Codec("none").encode("msgpack", data) == ("msgpack", data)
+    with pytest.raises(ValueError):
+        Codec("lz4")
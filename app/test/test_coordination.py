@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.agents.coordination import ThreadCoordinator, TurnInterrupted, idempotency_key, resolve_thread_id
+
+
+def test_duplicate_async_requests_share_one_turn():
+    async def main():
+        coordinator = ThreadCoordinator()
+        calls = []
+
+        async def turn():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return {"answer": len(calls)}
+
+        results = await asyncio.gather(*(coordinator.arun("t1", "k1", turn) for _ in range(3)))
+        replay = await coordinator.arun("t1", "k1", turn)
+        other_thread = await coordinator.arun("t2", "k1", turn)
+        return calls, results, replay, other_thread
+
+    calls, results, replay, other_thread = asyncio.run(main())
+    assert results == [{"answer": 1}] * 3
+    assert replay == {"answer": 1}
+    assert other_thread == {"answer": 2}
+    assert len(calls) == 2
+
+
+def test_turns_on_a_thread_run_in_order():
+    async def main():
+        coordinator = ThreadCoordinator()
+        active, log = [], []
+
+        async def turn(i):
+            active.append(i)
+            assert len(active) == 1, "two turns overlapped on one thread"
+            log.append(i)
+            await asyncio.sleep(0.005)
+            active.remove(i)
+
+        await asyncio.gather(*(coordinator.arun("t1", None, lambda i=i: turn(i)) for i in range(5)))
+        return coordinator, log
+
+    coordinator, log = asyncio.run(main())
+    assert log == list(range(5))
+    assert coordinator._async_locks == {}
+
+
+def test_sync_duplicates_and_failures():
+    coordinator = ThreadCoordinator()
+    calls = []
+
+    def turn():
+        calls.append(1)
+        time.sleep(0.05)
+        return len(calls)
+
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(coordinator.run("t1", "k", turn))) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert results == [1, 1, 1]
+
+    def failing():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        coordinator.run("t1", "bad", failing)
+    assert coordinator.run("t1", "bad", turn) == 2  # failures aren't replayed
+
+
+def test_cancelled_owner_keeps_turn_running_for_duplicates():
+    async def main():
+        coordinator = ThreadCoordinator()
+
+        async def turn():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        owner = asyncio.create_task(coordinator.arun("t1", "k", turn))
+        await asyncio.sleep(0)
+        duplicate = asyncio.create_task(coordinator.arun("t1", "k", turn))
+        await asyncio.sleep(0)
+        owner.cancel()
+        return await duplicate
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_interrupted_turn_fails_attached_requests():
+    coordinator = ThreadCoordinator()
+    future, owner = coordinator.begin("t1", "k")
+    assert owner
+    assert coordinator.begin("t1", "k") == (future, False)
+    coordinator.finish("t1", "k", future, error=GeneratorExit())
+    with pytest.raises(TurnInterrupted):
+        future.result()
+    assert coordinator.begin("t1", "k")[1]
+
+
+def test_header_and_thread_resolution():
+    assert idempotency_key({"Idempotency-Key": " abc "}) == "abc"
+    assert idempotency_key({"idempotency-key": "x" * 500}) is None
+    assert idempotency_key({}) is None
+    assert resolve_thread_id("t1", "abc") == "t1"
+    assert resolve_thread_id(None, "abc") == resolve_thread_id(None, "abc")
+    assert resolve_thread_id(None, None) != resolve_thread_id(None, None)
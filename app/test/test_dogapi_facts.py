@@ -0,0 +1,67 @@
+import time
+
+from app.apis.dogapi_facts import DogFactPool
+
+
+def fact(fact_id, body):
+    return {"id": fact_id, "type": "fact", "attributes": {"body": body}}
+
+
+class FakeFactClient:
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.limits = []
+
+    def list_facts(self, limit=None):
+        self.limits.append(limit)
+        return {"data": self.batches.pop(0) if self.batches else []}
+
+
+def bodies(facts):
+    return [f["attributes"]["body"] for f in facts]
+
+
+def test_pool_dedups_batches_and_does_not_repeat_within_a_thread():
+    client = FakeFactClient([[fact("1", "Dogs sweat through their paws."), fact("2", "Dogs have three eyelids."),
+                              fact("2", "Dogs have three eyelids."), fact("3", "dogs have THREE eyelids!"),
+                              fact("4", "Basenjis don't bark.")]])
+    pool = DogFactPool(client, batch_size=50, low_water=0)
+    first = bodies(pool.sample(2, "t1"))
+    second = bodies(pool.sample(1, "t1"))
+    assert client.limits == [50] and len(pool.facts) == 3
+    assert len(set(first + second)) == 3
+    # Another thread draws from the whole pool again; an exhausted thread starts over
+    assert len(pool.sample(3, "t2")) == 3
+    assert len(set(bodies(pool.sample(2, "t1")))) == 2
+    assert client.limits == [50]
+
+
+def test_pool_refills_in_background_below_low_water_and_pauses_when_exhausted():
+    client = FakeFactClient([[fact("1", "a"), fact("2", "b")], [fact("3", "c"), fact("1", "a")]])
+    pool = DogFactPool(client, batch_size=10, low_water=2)
+    pool.sample(1, "t1")
+    for _ in range(100):
+        if len(pool.facts) == 3 and not pool._refilling.is_set():
+            break
+        time.sleep(0.01)
+    assert sorted(pool.facts) == ["1", "2", "3"] and len(client.limits) == 2
+    pool.sample(2, "t1")
+    for _ in range(100):
+        if pool.exhausted_at is not None and not pool._refilling.is_set():
+            break
+        time.sleep(0.01)
+    # The third batch added nothing, so the pool stops asking until refresh_interval passes
+    assert pool.exhausted_at is not None and len(client.limits) == 3
+    pool.sample(3, "t1")
+    assert len(client.limits) == 3
+
+
+def test_fact_tool_serves_from_the_pool_per_thread(monkeypatch):
+    from app.tools import dogapi_tools
+    pool = DogFactPool(FakeFactClient([[fact(str(i), f"fact {i}") for i in range(5)]]), low_water=0)
+    monkeypatch.setattr(dogapi_tools, "get_dog_fact_pool", lambda: pool)
+    monkeypatch.setattr(dogapi_tools, "DOG_FACT_POOL_ENABLED", True)
+    config = {"configurable": {"thread_id": "t1"}}
+    seen = [item for _ in range(5) for item in dogapi_tools.list_dog_facts.invoke({"limit": 1}, config)["items"]]
+    assert sorted(seen) == [f"fact {i}" for i in range(5)]
+    assert pool._served["t1"] == set(pool.facts)
@@ -0,0 +1,67 @@
+from app.apis.dogapi_index import DogBreedIndex
+
+
+class FakeDogApiClient:
+    groups = [
+        {"id": "g1", "type": "group", "attributes": {"name": "Herding Group"},
+         "relationships": {"breeds": {"data": [{"id": "b1", "type": "breed"}]}}},
+        {"id": "g2", "type": "group", "attributes": {"name": "Hound Group"},
+         "relationships": {"breeds": {"data": []}}},
+    ]
+    breeds = [
+        {"id": "b1", "type": "breed", "attributes": {"name": "German Shepherd Dog"},
+         "relationships": {"group": {"data": {"id": "g1", "type": "group"}}}},
+        {"id": "b2", "type": "breed", "attributes": {"name": "Beagle"},
+         "relationships": {"group": {"data": {"id": "g2", "type": "group"}}}},
+        {"id": "b3", "type": "breed", "attributes": {"name": "Basset Hound"},
+         "relationships": {"group": {"data": {"id": "g2", "type": "group"}}}},
+    ]
+
+    def __init__(self):
+        self.calls = []
+
+    def _page(self, resources, page):
+        self.calls.append(page)
+        start = (page - 1) * 2
+        last = (len(resources) + 1) // 2
+        return {
+            "data": resources[start:start + 2],
+            "meta": {"pagination": {"current": page, "next": page + 1 if page < last else None, "last": last}},
+        }
+
+    def list_groups(self, page=None):
+        return self._page(self.groups, page)
+
+    def list_breeds(self, page=None):
+        return self._page(self.breeds, page)
+
+
+def test_index_walks_every_page():
+    client = FakeDogApiClient()
+    index = DogBreedIndex(client)
+    index.refresh()
+    assert len(index.breeds) == 3 and len(index.groups) == 2
+    assert client.calls == [1, 1, 2]
+
+
+def test_find_breeds_by_exact_alias_and_fuzzy_name():
+    index = DogBreedIndex(FakeDogApiClient())
+    assert index.find_breeds("beagle")[0]["id"] == "b2"
+    assert index.find_breeds("the German Shepherd")[0]["group"] == "Herding Group"
+    assert index.find_breeds("Basset Hund")[0]["id"] == "b3"
+    assert index.find_breeds("poodle") == []
+
+
+def test_breeds_in_group_uses_both_relationship_directions():
+    index = DogBreedIndex(FakeDogApiClient())
+    group = index.breeds_in_group("hound")
+    assert group["name"] == "Hound Group"
+    assert [breed["name"] for breed in group["breeds"]] == ["Beagle", "Basset Hound"]
+
+
+def test_find_dog_breed_returns_items_with_or_without_a_match(monkeypatch):
+    from app.tools import dogapi_tools
+    index = DogBreedIndex(FakeDogApiClient())
+    monkeypatch.setattr(dogapi_tools, "get_dog_index", lambda: index)
+    assert dogapi_tools.find_dog_breed.invoke({"name": "beagle"})["items"][0]["name"] == "Beagle"
+    assert dogapi_tools.find_dog_breed.invoke({"name": "poodle"}) == {"items": [], "hint": "No breed matching 'poodle'."}
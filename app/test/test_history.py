@@ -0,0 +1,78 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from app.agents.history import HistoryWindow
+
+
+def _turn(n, payload="x" * 2000):
+    return [
+        HumanMessage(f"question {n}"),
+        AIMessage("", tool_calls=[{"name": "lookup", "args": {}, "id": f"c{n}"}]),
+        ToolMessage(payload, tool_call_id=f"c{n}"),
+        AIMessage(f"answer {n}"),
+    ]
+
+
+def _config(**configurable):
+    return {"configurable": {"thread_id": "t", **configurable}}
+
+
+def test_short_history_is_sent_unchanged():
+    messages = _turn(1)[:1]
+    result = HistoryWindow(max_tokens=1000)({"messages": messages}, _config())
+    assert result == {"llm_input_messages": messages}
+
+
+def test_old_tool_messages_are_truncated_before_anything_is_dropped():
+    messages = _turn(1) + _turn(2)[:1]
+    result = HistoryWindow(max_tokens=10_000)({"messages": messages}, _config())
+    old_tool = result["llm_input_messages"][2]
+    assert old_tool.content.endswith("[truncated]") and len(old_tool.content) < 400
+    assert messages[2].content == "x" * 2000
+
+
+def test_older_turns_fold_into_running_summary():
+    summarizer = FakeListChatModel(responses=["user asked questions 1-3"])
+    window = HistoryWindow(summarizer=summarizer, max_tokens=120)
+    messages = _turn(1) + _turn(2) + _turn(3) + [HumanMessage("question 4")]
+
+    result = window({"messages": messages}, _config())
+    sent = result["llm_input_messages"]
+    assert isinstance(sent[0], SystemMessage) and "questions 1-3" in sent[0].content
+    assert sent[-1].content == "question 4"
+    assert result["summarized_until"] == 12
+    assert window.stats.snapshot()["summaries"] == 1
+
+
+def test_per_thread_override_disables_summarization():
+    summarizer = FakeListChatModel(responses=["unused"])
+    window = HistoryWindow(summarizer=summarizer, max_tokens=100)
+    messages = _turn(1) + [HumanMessage("question 2")]
+    result = window({"messages": messages}, _config(history_summarize=False))
+    assert "summary" not in result
+    assert [m.content for m in result["llm_input_messages"]] == ["question 2"]
+
+
+def test_append_only_window_keeps_prefix_stable():
+    window = HistoryWindow(max_tokens=1500, summarize=False, append_only=True)
+    messages = _turn(1) + [HumanMessage("question 2")]
+    first = window({"messages": messages}, _config())["llm_input_messages"]
+    assert first[2].content == "x" * 2000  # old tool results are not rewritten
+
+    messages = messages + _turn(2)[1:]
+    second = window({"messages": messages}, _config())["llm_input_messages"]
+    assert second[:len(first)] == first
+    assert window.stats.snapshot()["prefix_reuse"] > 0.3
+
+
+def test_append_only_window_moves_only_when_over_budget():
+    window = HistoryWindow(max_tokens=1200, summarize=False, append_only=True)
+    messages = _turn(1) + _turn(2) + _turn(3) + [HumanMessage("question 4")]
+    result = window({"messages": messages}, _config())
+    assert result["summarized_until"] == 8  # sticky even without a summary
+
+    state = {"messages": messages + [AIMessage("answer 4"), HumanMessage("question 5")],
+             "summarized_until": result["summarized_until"]}
+    result = window(state, _config())
+    assert "summarized_until" not in result
+    assert result["llm_input_messages"][0].content == "question 3"
@@ -0,0 +1,40 @@
+from app.utils.import_profile import parse_importtime, summarize, profile_imports
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 | site
+import time:       300 |        300 |     pkg.inner
+import time:       200 |        500 |   pkg
+import time:      1000 |       1000 |   slowdep
+import time:        50 |       1550 | target
+some log line printed during import
+"""
+
+
+def test_parse_importtime_reads_depth_and_millis():
+    rows = parse_importtime(SAMPLE)
+    assert [r["module"] for r in rows] == ["site", "pkg.inner", "pkg", "slowdep", "target"]
+    assert [r["depth"] for r in rows] == [0, 2, 1, 1, 0]
+    assert rows[-1]["cumulative_ms"] == 1.55
+
+
+def test_summarize_covers_only_the_target_subtree():
+    report = summarize(parse_importtime(SAMPLE), "target")
+    assert report["total_ms"] == 1.6
+    assert [r["module"] for r in report["direct_imports"]] == ["slowdep", "pkg"]
+    assert {r["package"]: r["self_ms"] for r in report["packages"]} == {"slowdep": 1.0, "pkg": 0.5, "target": 0.1}
+
+
+def test_profile_imports_runs_a_fresh_interpreter():
+    report = profile_imports("json", repeat=2)
+    assert report["module"] == "json"
+    assert report["total_ms"] > 0
+    assert len(report["runs_total_ms"]) == 2
+
+
+def test_dog_tools_build_clients_lazily():
+    from app.tools import dogapi_tools
+    dogapi_tools._clients.clear()
+    assert not dogapi_tools._clients
+    index = dogapi_tools.dog_index
+    assert index is dogapi_tools.get_dog_index()
+    assert dogapi_tools.get_async_dogapi_client().cache is dogapi_tools.get_dogapi_client().cache
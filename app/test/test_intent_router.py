@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import MemorySaver
+
+import app.agents.agent as agent_module
+from app.agents.intent_router import IntentRouter, routed_turns
+from app.agents.tool_execution import timed_tools
+from app.bench.fake_model import ScriptedChatModel
+
+
+@tool
+def list_dog_facts(limit: int = 1):
+    """List dog facts."""
+    return {"items": [f"fact {i}" for i in range(1, limit + 1)]}
+
+
+@tool
+def find_dog_breed(name: str):
+    """Find dog breeds by name."""
+    return {"items": [{"name": "Beagle", "group": "Hound Group", "life_years": "12-15",
+                       "description": "A merry little hound."}]}
+
+
+def _routed(outcome):
+    return sum(s["value"] for s in routed_turns.snapshot() if s["labels"]["outcome"] == outcome)
+
+
+def test_matches_simple_requests_only():
+    router = IntentRouter([list_dog_facts, find_dog_breed])
+    assert router.match("Give me 3 dog facts!")[1] == {"limit": 3}
+    assert router.match("please tell me a dog fact")[1] == {"limit": 1}
+    assert router.match("Tell me about the Beagle")[1] == {"name": "beagle"}
+    assert router.match("give me 500 dog facts") is None
+    assert router.match("Compare the Pug and the Chihuahua") is None
+    assert router.match("list dog groups") is None  # list_dog_groups is not among the tools
+
+
+def test_routes_confident_answers_and_falls_through_otherwise():
+    router = IntentRouter([list_dog_facts, find_dog_breed])
+    routed, fallthrough = _routed("routed"), _routed("fallthrough")
+    human, call, result, answer = router.route("Tell me about the beagle")
+    assert call.tool_calls[0]["name"] == "find_dog_breed" and result.tool_call_id == call.tool_calls[0]["id"]
+    assert answer.content.startswith("**Beagle** (Hound Group)") and "12-15 years" in answer.content
+    assert router.route("tell me about the bagel") is None  # only a near match
+    assert router.route("what should I feed my puppy?") is None
+    assert (_routed("routed") - routed, _routed("fallthrough") - fallthrough) == (1, 2)
+
+
+@tool("list_dog_facts")
+def hung_dog_facts(limit: int = 1):
+    """List dog facts, slowly."""
+    time.sleep(1)
+    return {"items": ["late fact"]}
+
+
+def test_timed_out_tool_falls_through_to_the_agent():
+    router = IntentRouter(timed_tools([hung_dog_facts], default_timeout=0.05))
+    fallthrough = _routed("fallthrough")
+    start = time.time()
+    assert router.route("give me 2 dog facts") is None
+    assert asyncio.run(router.aroute("give me 2 dog facts")) is None
+    assert time.time() - start < 0.5
+    assert _routed("fallthrough") - fallthrough == 2
+
+
+def test_agent_records_routed_turns_in_the_thread(monkeypatch):
+    model = ScriptedChatModel()
+    monkeypatch.setattr(agent_module, "get_chat_model", lambda: model)
+    agent = agent_module.DogChatAgent(checkpointer=MemorySaver(), tools="list_dog_facts", intent_router=True)
+    agent.intent_router = IntentRouter([list_dog_facts])
+
+    response = agent.invoke("give me 2 dog facts", "t1")
+    assert response["messages"][-1].content == "Here are 2 dog facts:\n\n1. fact 1\n2. fact 2"
+
+    async def stream():
+        return [event async for event in agent.astream_events("Thanks, that's all!", "t1")]
+
+    events = asyncio.run(stream())
+    assert events[-1]["event"] == "done"
+    history = agent.agent_executor.get_state({"configurable": {"thread_id": "t1"}}).values["messages"]
+    assert [m.type for m in history] == ["human", "ai", "tool", "ai", "human", "ai"]
+
+
+def test_streamed_routed_turn_emits_tool_and_token_events(monkeypatch):
+    monkeypatch.setattr(agent_module, "get_chat_model", lambda: ScriptedChatModel())
+    agent = agent_module.DogChatAgent(checkpointer=MemorySaver(), tools="list_dog_facts", intent_router=True)
+    agent.intent_router = IntentRouter([list_dog_facts])
+
+    async def stream():
+        return [event async for event in agent.astream_events("a dog fact please", "t2")]
+
+    events = asyncio.run(stream())
+    assert [e["event"] for e in events] == ["tool_start", "tool_end", "token", "done"]
+    assert events[-1]["data"]["content"] == "Here's a dog fact: fact 1"
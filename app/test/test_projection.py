@@ -0,0 +1,49 @@
+from app.tools.projection import (
+    compact_breed, compact_output, fit_budget, flatten_resource, project_page, projection_stats,
+    compact_breed_summary,
+)
+
+BREED = {
+    "id": "b1",
+    "type": "breed",
+    "attributes": {
+        "name": "Beagle",
+        "description": "A small scent hound. " * 40,
+        "life": {"min": 12, "max": 15},
+        "male_weight": {"min": 10, "max": 11},
+        "female_weight": {"min": 9, "max": 10},
+        "hypoallergenic": False,
+    },
+    "relationships": {"group": {"data": {"id": "g2", "type": "group"}}},
+}
+
+
+def test_flatten_and_compact_breed():
+    breed = compact_breed(flatten_resource(BREED))
+    assert breed["life_years"] == "12-15"
+    assert breed["group_id"] == "g2"
+    assert breed["description"].endswith("...") and len(breed["description"]) < 410
+    assert "relationships" not in breed
+
+
+def test_project_page_flattens_envelope():
+    payload = {
+        "data": [BREED, {**BREED, "id": "b2"}],
+        "meta": {"pagination": {"current": 1, "next": 2, "last": 5, "records": 50}},
+        "links": {"self": "https://dogapi.dog/api/v2/breeds"},
+    }
+    page = project_page(payload, compact_breed_summary)
+    assert page == {"items": [{"id": "b1", "name": "Beagle"}, {"id": "b2", "name": "Beagle"}],
+                    "page": 1, "next_page": 2, "total": 50}
+
+
+def test_fit_budget_truncates_with_hint():
+    result = fit_budget({"items": ["x" * 50] * 10, "next_page": 3}, max_bytes=200)
+    assert len(result["items"]) < 10
+    assert "page 3" in result["more_available"]
+
+
+def test_compact_output_records_saved_bytes():
+    compact_output("test_tool", {"data": BREED}, lambda payload: {"name": "Beagle"})
+    stats = projection_stats.snapshot()["test_tool"]
+    assert stats["calls"] == 1 and stats["saved_bytes"] > 0
@@ -0,0 +1,39 @@
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+import app.agents.agent as agent_module
+from app.bench.fake_model import ScriptedChatModel
+from app.tools.registry import ToolRegistry
+
+
+def test_discovers_toolsets_from_tool_modules():
+    registry = ToolRegistry()
+    toolsets = registry.toolsets()
+    assert {"dogapi", "catfacts"} <= set(toolsets)
+    assert [tool.name for tool in toolsets["dogapi"]][:2] == ["find_dog_breed", "list_breeds_in_group"]
+    assert registry.toolsets() is toolsets
+
+
+def test_select_by_toolset_and_tool_name():
+    registry = ToolRegistry()
+    names = [tool.name for tool in registry.select("find_dog_breed, catfacts,find_dog_breed")]
+    assert names == ["find_dog_breed", "get_random_cat_facts", "get_cat_fact_by_id"]
+    assert len(registry.select("all")) == len(registry.tools())
+    with pytest.raises(ValueError, match="Unknown tool"):
+        registry.select("dogapi,weather")
+
+
+def test_catfacts_client_is_built_on_first_use():
+    from app.tools import catfacts_tools
+    catfacts_tools._catfacts_client = None
+    assert catfacts_tools.catfacts_client is catfacts_tools.get_catfacts_client()
+
+
+def test_agent_caches_one_graph_per_tool_set(monkeypatch):
+    monkeypatch.setattr(agent_module, "get_chat_model", lambda: ScriptedChatModel())
+    agent = agent_module.DogChatAgent(checkpointer=MemorySaver(), tools="list_dog_facts")
+    assert [tool.name for tool in agent.tools] == ["list_dog_facts"]
+    assert agent.graph_for(agent.tools) is agent.agent_executor
+    assert agent.graph_for("list_dog_facts") is agent.agent_executor
+    assert agent.graph_for("dogapi") is not agent.agent_executor
+    assert len(agent._graphs) == 2
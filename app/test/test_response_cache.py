@@ -0,0 +1,78 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from app.utils.response_cache import ResponseCache
+from app.utils.webclient import WebClient, close_sessions
+
+
+class _ETagHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        type(self).requests_seen.append((self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    _ETagHandler.requests_seen = []
+    server = HTTPServer(("127.0.0.1", 0), _ETagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    close_sessions()
+
+
+def test_fresh_entries_are_served_without_network(stub_server):
+    client = WebClient(stub_server, cache=ResponseCache(ttls={"breeds": 60}))
+    assert client.get_json("breeds", {"page[number]": 1}) == client.get_json("breeds", {"page[number]": 1})
+    assert len(_ETagHandler.requests_seen) == 1
+    assert client.cache.stats()["hits"] == 1
+
+
+def test_zero_ttl_endpoints_bypass_cache(stub_server):
+    client = WebClient(stub_server, cache=ResponseCache(ttls={"breeds": 60, "facts": 0}))
+    client.get_json("facts")
+    client.get_json("facts")
+    assert len(_ETagHandler.requests_seen) == 2
+    assert client.cache.stats()["entries"] == 0
+
+
+def test_stale_entries_are_revalidated_with_etag(stub_server):
+    cache = ResponseCache(ttls={"breeds": 60})
+    client = WebClient(stub_server, cache=cache)
+    first = client.get_json("breeds/abc")
+    key = cache.make_key("breeds/abc")
+    cache._entries[key].expires_at = 0
+    assert client.get_json("breeds/abc") == first
+    assert _ETagHandler.requests_seen[-1] == ("/breeds/abc", '"v1"')
+    assert cache.stats()["revalidations"] == 1
+
+
+def test_lru_eviction_and_persistence(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(ttls={"breeds": 60}, max_entries=2, persist_path=path)
+    for name in ("a", "b", "c"):
+        cache.store(cache.make_key(f"breeds/{name}"), f"breeds/{name}", {"id": name})
+    assert cache.stats()["evictions"] == 1
+
+    warm = ResponseCache(ttls={"breeds": 60}, max_entries=2, persist_path=path)
+    entry, fresh = warm.lookup(warm.make_key("breeds/c"))
+    assert fresh and entry.value == {"id": "c"}
+    assert warm.lookup(warm.make_key("breeds/a")) == (None, False)
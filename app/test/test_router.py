@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.bench.fake_model import ScriptedChatModel
+from app.model.router import ProviderPool, RoutedChatModel, default_route, is_failover_error, model_specs
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class BadRequestError(Exception):
+    status_code = 400
+
+
+class FakeProvider(ScriptedChatModel):
+    """Answers with its own name after `latency` seconds, or raises `error`."""
+
+    name: str = "fake"
+    error: object = None
+    calls: int = 0
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return super()._generate(messages[-1:], stop, run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return super()._generate(messages[-1:], stop, run_manager, **kwargs)
+
+
+def router(**providers):
+    names = list(providers)
+    return RoutedChatModel(providers=providers, routes={"fast": names, "after_tools": names[::-1]},
+                           timeout=1.0, hedge_after=0.0)
+
+
+def test_default_route_after_tools():
+    assert default_route([HumanMessage("hi")]) == "fast"
+    turn = [HumanMessage("beagle?"), AIMessage("", tool_calls=[{"name": "t", "args": {}, "id": "1"}]),
+            ToolMessage("data", tool_call_id="1")]
+    assert default_route(turn) == "after_tools"
+    assert default_route(turn + [AIMessage("done"), HumanMessage("thanks")]) == "fast"
+
+
+def test_failover_error_classification():
+    assert is_failover_error(RateLimitError())
+    assert is_failover_error(asyncio.TimeoutError())
+    assert not is_failover_error(BadRequestError())
+    assert not is_failover_error(ValueError("bad"))
+
+
+def test_routes_and_fails_over():
+    primary, secondary = FakeProvider(error=RateLimitError()), FakeProvider()
+    model = router(primary=primary, secondary=secondary)
+    result = model.invoke([HumanMessage("hi")])
+    assert result.response_metadata["provider"] == "secondary"
+    assert (primary.calls, secondary.calls) == (1, 1)
+
+    after_tools = [HumanMessage("hi"), ToolMessage("x", tool_call_id="1")]
+    assert model.invoke(after_tools).response_metadata["provider"] == "secondary"
+    assert primary.calls == 1  # after_tools prefers secondary
+
+
+def test_non_retryable_errors_do_not_fail_over():
+    primary, secondary = FakeProvider(error=BadRequestError()), FakeProvider()
+    with pytest.raises(BadRequestError):
+        router(primary=primary, secondary=secondary).invoke([HumanMessage("hi")])
+    assert secondary.calls == 0
+
+
+def test_async_timeout_fails_over_and_trips_circuit():
+    slow, backup = FakeProvider(latency=0.5), FakeProvider()
+    model = router(slow=slow, backup=backup).model_copy(update={"timeout": 0.05})
+    model.pool = ProviderPool(["slow", "backup"], failure_threshold=2, cooldown=60)
+
+    async def run():
+        return [(await model.ainvoke([HumanMessage("hi")])).response_metadata["provider"] for _ in range(3)]
+
+    assert asyncio.run(run()) == ["backup"] * 3
+    assert slow.calls == 2  # skipped once its circuit opened
+    stats = model.stats()
+    assert stats["slow"]["healthy"] is False and stats["backup"]["calls"] == 3
+
+
+def test_hedges_slow_requests():
+    slow, fast = FakeProvider(latency=0.5), FakeProvider(latency=0.01)
+    model = router(slow=slow, fast=fast).model_copy(update={"hedge_after": 0.05})
+
+    async def run():
+        start = time.perf_counter()
+        result = await model.ainvoke([HumanMessage("hi")])
+        return result.response_metadata["provider"], time.perf_counter() - start
+
+    provider, elapsed = asyncio.run(run())
+    assert provider == "fast" and elapsed < 0.3
+
+
+def test_stream_fails_over_before_first_chunk():
+    model = router(down=FakeProvider(error=RateLimitError()), up=FakeProvider())
+
+    async def run():
+        return [chunk.content async for chunk in model.astream([HumanMessage("hi")])]
+
+    assert "".join(asyncio.run(run())).startswith("Happy to help")
+
+
+def test_model_specs(monkeypatch):
+    monkeypatch.delenv("AZURE_OPENAI_ENDPOINT", raising=False)
+    assert model_specs("a=deepseek:deepseek-chat") == {"a": ("deepseek", "deepseek-chat")}
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com")
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4o")
+    assert model_specs("a=deepseek:deepseek-chat")["azure"] == ("azure_openai", "gpt-4o")
+    with pytest.raises(ValueError):
+        model_specs("nonsense")
@@ -0,0 +1,87 @@
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+from app.utils.admission import AdmissionRejected
+from app.utils.structured_logging import JsonFormatter, NonBlockingQueueHandler, RequestLog, request_log
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def captured():
+    logger = logging.getLogger("test.structured_logging")
+    handler = ListHandler()
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    yield logger, handler.records
+    logger.removeHandler(handler)
+
+
+def test_request_log_writes_one_json_record_with_timings(captured):
+    logger, records = captured
+    with request_log("chat", logger, request_id="r1") as log:
+        with log.timed("agent"):
+            pass
+        log.set(thread_id="t1")
+        log.finish(200)
+    assert len(records) == 1
+    entry = json.loads(JsonFormatter().format(records[0]))
+    assert entry["message"] == "chat" and entry["level"] == "INFO"
+    assert entry["request_id"] == "r1" and entry["thread_id"] == "t1" and entry["status"] == 200
+    assert entry["agent_ms"] >= 0 and entry["duration_ms"] >= entry["agent_ms"]
+    assert "event=chat request_id=r1" in records[0].getMessage()
+
+
+def test_sampling_drops_successes_but_keeps_warnings_and_errors(captured):
+    logger, records = captured
+    assert not RequestLog("chat", logger, sample_rate=0.0).finish(200)
+    assert RequestLog("chat", logger, sample_rate=0.0).finish(429)
+    with pytest.raises(RuntimeError):
+        with request_log("chat", logger, sample_rate=0.0):
+            raise RuntimeError("boom")
+    with pytest.raises(AdmissionRejected):
+        with request_log("chat", logger, sample_rate=0.0):
+            raise AdmissionRejected("queue_full", 1)
+    assert [(r.levelname, r.fields.get("status")) for r in records] == [
+        ("WARNING", 429), ("ERROR", None), ("WARNING", 429)]
+    assert records[1].fields["error"] == "RuntimeError: boom" and records[1].exc_info
+    assert records[2].fields["reason"] == "queue_full"
+
+
+def test_queue_handler_defers_formatting_and_drops_when_full():
+    records = queue.Queue(maxsize=1)
+    handler = NonBlockingQueueHandler(records)
+    logger = logging.getLogger("test.structured_logging.queue")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        class Lazy:
+            formatted = 0
+
+            def __str__(self):
+                Lazy.formatted += 1
+                return "lazy"
+
+        logger.warning("value %s", Lazy())
+        logger.warning("dropped")
+    finally:
+        logger.removeHandler(handler)
+    record = records.get_nowait()
+    assert Lazy.formatted == 0 and records.empty()
+    output = io.StringIO()
+    stream = logging.StreamHandler(output)
+    stream.setFormatter(JsonFormatter())
+    stream.handle(record)
+    assert json.loads(output.getvalue())["message"] == "value lazy"
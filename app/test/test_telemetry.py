@@ -0,0 +1,131 @@
+import asyncio
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.prebuilt import create_react_agent
+
+from app.agents.tracing import AgentTracingHandler
+from app.memory.checkpointer import trace_checkpointer
+# The app modules import telemetry as top-level `utils.telemetry`; use that module so spans share exporters
+from utils.telemetry import (
+    Histogram, InMemorySpanExporter, MetricsRegistry, add_span_exporter, remove_span_exporter, span,
+)
+
+
+class EchoToolModel(BaseChatModel):
+    @property
+    def _llm_type(self):
+        return "echo-tool"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        last = messages[-1]
+        if last.type == "human":
+            message = AIMessage(content="", tool_calls=[{"name": "echo", "args": {"text": last.content}, "id": "c1"}])
+        else:
+            message = AIMessage(content=f"you said {last.content}")
+        message.usage_metadata = {"input_tokens": 10, "output_tokens": 3, "total_tokens": 13}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+@tool
+def echo(text: str) -> str:
+    """Echo the text back."""
+    with span("http.request", name="echo.test"):
+        return text
+
+
+def _collect():
+    exporter = InMemorySpanExporter()
+    add_span_exporter(exporter)
+    return exporter
+
+
+def test_histogram_quantiles_and_prometheus_text():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_ms", "Latency", buckets=(10, 100, 1000))
+    for value in [5] * 90 + [500] * 10:
+        histogram.observe(value, stage="llm")
+    registry.counter("calls_total", "Calls").inc(3, stage="llm")
+    [series] = histogram.snapshot()
+    assert series["count"] == 100 and series["p50"] <= 10 and 100 < series["p99"] <= 1000
+    text = registry.render_prometheus()
+    assert 'latency_ms_bucket{stage="llm",le="10"} 90' in text
+    assert 'latency_ms_bucket{stage="llm",le="+Inf"} 100' in text
+    assert 'calls_total{stage="llm"} 3' in text
+
+
+def test_histogram_overflow_bucket():
+    histogram = Histogram("h", "h", buckets=(1, 2))
+    histogram.observe(50)
+    assert histogram.snapshot()[0]["p50"] == 2
+
+
+def test_spans_nest_across_threads_and_tasks():
+    exporter = _collect()
+    try:
+        async def run():
+            with span("outer") as outer:
+                await asyncio.gather(
+                    asyncio.to_thread(lambda: span("in_thread").__enter__().end()),
+                    asyncio.create_task(asyncio.sleep(0)),
+                )
+                with span("inner"):
+                    pass
+            return outer
+        outer = asyncio.run(run())
+        inner = exporter.by_name("inner")[0]
+        assert inner.parent_id == outer.span_id and inner.trace_id == outer.trace_id
+    finally:
+        remove_span_exporter(exporter)
+
+
+def test_tracing_handler_builds_the_react_span_tree():
+    exporter = _collect()
+    handler = AgentTracingHandler()
+    agent = create_react_agent(EchoToolModel(), [echo], checkpointer=trace_checkpointer(MemorySaver()))
+    try:
+        with span("agent.request") as request:
+            agent.invoke({"messages": [{"role": "user", "content": "hi"}]},
+                         {"configurable": {"thread_id": "t"}, "callbacks": [handler]})
+    finally:
+        remove_span_exporter(exporter)
+    by_id = {s.span_id: s for s in exporter.spans}
+    steps = exporter.by_name("react.step")
+    assert [s.attributes["node"] for s in sorted(steps, key=lambda s: s.start_time)] == ["agent", "tools", "agent"]
+    assert all(s.parent_id == request.span_id for s in steps)
+    llm_calls = exporter.by_name("llm.call")
+    assert len(llm_calls) == 2 and all(by_id[s.parent_id].attributes["node"] == "agent" for s in llm_calls)
+    assert llm_calls[0].attributes["input_tokens"] == 10
+    [tool_call] = exporter.by_name("tool.call")
+    assert tool_call.attributes["name"] == "echo" and tool_call.attributes["output_bytes"] > 0
+    [upstream] = exporter.by_name("http.request")
+    assert upstream.parent_id == tool_call.span_id
+    assert exporter.by_name("checkpoint.write") and exporter.by_name("checkpoint.read")
+    assert not handler._spans and not handler._parents and not handler._tokens
+
+
+def test_trace_checkpointer_records_one_span_per_async_call():
+    exporter = _collect()
+    saver = trace_checkpointer(MemorySaver())
+    try:
+        asyncio.run(saver.aget_tuple({"configurable": {"thread_id": "t"}}))
+    finally:
+        remove_span_exporter(exporter)
+    assert len(exporter.by_name("checkpoint.read")) == 1
+
+
+def test_cache_read_tokens_from_provider_usage():
+    from app.agents.prompt_cache import cache_read_tokens
+
+    openai_style = AIMessage("hi", usage_metadata={"input_tokens": 10, "output_tokens": 1, "total_tokens": 11,
+                                                   "input_token_details": {"cache_read": 8}})
+    deepseek_style = AIMessage("hi", response_metadata={"token_usage": {"prompt_cache_hit_tokens": 64}})
+    assert cache_read_tokens(openai_style) == 8
+    assert cache_read_tokens(deepseek_style) == 64
+    assert cache_read_tokens(AIMessage("hi")) is None
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.prebuilt import create_react_agent
+
+from app.agents import tool_execution
+from app.agents.tool_execution import build_tool_node, parse_tool_timeouts, with_timeout
+
+
+class ScriptedModel(BaseChatModel):
+    """Calls slow_lookup for three keys in one step, then answers."""
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if messages[-1].type == "human":
+            calls = [{"name": "slow_lookup", "args": {"key": key}, "id": f"call-{key}"} for key in ("a", "b", "c")]
+            message = AIMessage(content="", tool_calls=calls)
+        else:
+            message = AIMessage(content="done")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+@tool
+def slow_lookup(key: str):
+    """Look up a key slowly."""
+    time.sleep({"a": 0.3, "b": 0.1, "c": 0.2}[key])
+    return key.upper()
+
+
+def _run(tool_node, max_concurrency=4):
+    graph = create_react_agent(ScriptedModel(), tool_node, checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "t"}, "max_concurrency": max_concurrency}
+    start = time.time()
+    messages = graph.invoke({"messages": [{"role": "user", "content": "compare"}]}, config)["messages"]
+    return [m for m in messages if m.type == "tool"], time.time() - start
+
+
+def test_tool_calls_run_concurrently_in_call_order():
+    results, elapsed = _run(build_tool_node([slow_lookup]))
+    assert [m.content for m in results] == ["A", "B", "C"]
+    assert [m.tool_call_id for m in results] == ["call-a", "call-b", "call-c"]
+    assert elapsed < 0.55
+
+
+def test_slow_tool_times_out_as_error_message():
+    results, _ = _run(build_tool_node([slow_lookup], timeouts={"slow_lookup": 0.15}))
+    assert [m.status for m in results] == ["error", "success", "error"]
+    assert "timed out" in results[0].content
+
+
+def test_parse_tool_timeouts():
+    assert parse_tool_timeouts("a=5, b=0.5,,bad") == {"a": 5.0, "b": 0.5}
+
+
+@tool
+def half_second(key: str):
+    """Take half a second."""
+    time.sleep(0.5)
+    return key
+
+
+def test_concurrent_sync_calls_do_not_queue_into_their_timeout():
+    timed = with_timeout(half_second, 0.8)
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(lambda i: timed.invoke({"key": str(i)}), range(20)))
+    assert results == [str(i) for i in range(20)]
+
+    async def run_all():
+        return await asyncio.gather(*(timed.ainvoke({"key": str(i)}) for i in range(20)))
+
+    start = time.time()
+    assert asyncio.run(run_all()) == [str(i) for i in range(20)]
+    assert time.time() - start < 0.8
+
+
+def test_timed_out_calls_do_not_grow_the_thread_count(monkeypatch):
+    monkeypatch.setattr(tool_execution, "TOOL_THREADS", 4)
+    monkeypatch.setattr(tool_execution, "_executor", None)
+    timed = with_timeout(half_second, 0.02)
+    baseline = threading.active_count()
+    results = []
+    for i in range(30):
+        try:
+            results.append(timed.invoke({"key": str(i)}))
+        except Exception as e:
+            results.append(e)
+    assert all("timed out" in str(result) for result in results)
+    assert threading.active_count() - baseline <= 4
+    tool_execution._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,56 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+from app.utils.webclient import WebClient, close_sessions
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_GET(self):
+        type(self).calls += 1
+        status = 503 if type(self).calls == 1 else 200
+        body = json.dumps({"calls": type(self).calls}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    _FlakyHandler.calls = 0
+    server = HTTPServer(("127.0.0.1", 0), _FlakyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    close_sessions()
+
+
+def test_clients_share_session_per_base_url(stub_server):
+    first = WebClient(stub_server)
+    second = WebClient(stub_server + "/")
+    assert first.session is second.session
+    assert WebClient(stub_server, backoff_factor=0).session is not first.session
+    assert WebClient(stub_server, backoff_jitter=0).session is not first.session
+    assert WebClient(stub_server, backoff_jitter=0).session.get_adapter(stub_server).max_retries.backoff_jitter == 0
+
+
+def test_retries_on_5xx(stub_server):
+    client = WebClient(stub_server, max_retries=2, backoff_factor=0)
+    assert client.request("anything").json() == {"calls": 2}
+
+
+def test_no_retries_surfaces_error(stub_server):
+    client = WebClient(stub_server, max_retries=0)
+    with pytest.raises(requests.HTTPError):
+        client.request("anything")
@@ -1,14 +1,38 @@
+import threading
 from langchain_core.tools import tool
-from app.apis.catfacts_client import CatFactsClient
+from apis.catfacts_client import CatFactsClient
+
+# Built on first use, like the Dog API clients, so importing the tools stays cheap
+_catfacts_client = None
+_client_lock = threading.Lock()
+
+
+def get_catfacts_client() -> CatFactsClient:
+    global _catfacts_client
+    if _catfacts_client is None:
+        with _client_lock:
+            if _catfacts_client is None:
+                _catfacts_client = CatFactsClient()
+    return _catfacts_client
+
+
+def __getattr__(name):
+    # Keep `from tools.catfacts_tools import catfacts_client` working
+    if name == "catfacts_client":
+        return get_catfacts_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-catfacts_client = CatFactsClient()
 
 @tool
 def get_random_cat_facts(animal_type: str = "cat", amount: int = 1):
     """Retrieve one or more random cat facts."""
-    return catfacts_client.get_random_facts(animal_type=animal_type, amount=amount)
+    return get_catfacts_client().get_random_facts(animal_type=animal_type, amount=amount)
 
 @tool
 def get_cat_fact_by_id(fact_id: str, animal_type: str = "cat"):
     """Retrieve a cat fact by its ID."""
-    return catfacts_client.get_fact_by_id(fact_id, animal_type)
\ No newline at end of file
+    return get_catfacts_client().get_fact_by_id(fact_id, animal_type)
+
+
+# Discovered by tools.registry as the "catfacts" toolset (not enabled by default)
+TOOLS = [get_random_cat_facts, get_cat_fact_by_id]
@@ -1,29 +1,168 @@
-from langchain_core.tools import tool
-from apis.dogapi_client import DogApiClient
+import asyncio
+import threading
+from typing import Optional
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, tool
+from apis.dogapi_client import DogApiClient, AsyncDogApiClient
+from apis.dogapi_facts import DOG_FACT_POOL_ENABLED, DogFactPool
+from apis.dogapi_index import DogBreedIndex
+from tools.projection import (
+    compact_output, project_page, project_resource,
+    compact_breed, compact_breed_summary, compact_group, compact_group_summary, compact_fact,
+)
+
+# Clients are built on first use rather than at import so loading the tools stays cheap on cold start
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _client(name: str):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            if not _clients:
+                sync_client = DogApiClient()
+                _clients.update(
+                    dogapi_client=sync_client,
+                    async_dogapi_client=AsyncDogApiClient(cache=sync_client.cache),
+                    dog_index=DogBreedIndex(sync_client),
+                    dog_fact_pool=DogFactPool(sync_client),
+                )
+            client = _clients[name]
+    return client
+
+
+def get_dogapi_client() -> DogApiClient:
+    return _client("dogapi_client")
+
+
+def get_async_dogapi_client() -> AsyncDogApiClient:
+    return _client("async_dogapi_client")
+
+
+def get_dog_index() -> DogBreedIndex:
+    return _client("dog_index")
+
+
+def get_dog_fact_pool() -> DogFactPool:
+    return _client("dog_fact_pool")
+
+
+def __getattr__(name):
+    # Keep `from tools.dogapi_tools import dog_index` (and the clients) working
+    if name in ("dogapi_client", "async_dogapi_client", "dog_index", "dog_fact_pool"):
+        return _client(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _async_variant(sync_tool: BaseTool):
+    """Attach a native coroutine to a tool so ainvoke doesn't fall back to a worker thread."""
+    def register(coroutine):
+        sync_tool.coroutine = coroutine
+        return coroutine
+    return register
+
+
+def _breed_page(payload):
+    return project_page(payload, compact_breed_summary)
+
+
+def _breed(payload):
+    return project_resource(payload, compact_breed)
+
+
+def _fact_page(payload):
+    return project_page(payload, compact_fact)
+
+
+def _thread_id(config: Optional[RunnableConfig]) -> Optional[str]:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+def _group_page(payload):
+    return project_page(payload, compact_group_summary)
+
+
+def _group(payload):
+    return project_resource(payload, compact_group)
 
-dogapi_client = DogApiClient()
 
 @tool
 def list_dog_breeds(page: int = 1):
-    """List dog breeds with optional pagination."""
-    return dogapi_client.list_breeds(page=page)
+    """List dog breed names and IDs with optional pagination."""
+    return compact_output("list_dog_breeds", get_dogapi_client().list_breeds(page=page), _breed_page)
+
+@_async_variant(list_dog_breeds)
+async def alist_dog_breeds(page: int = 1):
+    return compact_output("list_dog_breeds", await get_async_dogapi_client().list_breeds(page=page), _breed_page)
 
 @tool
 def get_dog_breed(breed_id: str):
     """Get details for a specific dog breed by ID."""
-    return dogapi_client.get_breed(breed_id)
+    return compact_output("get_dog_breed", get_dogapi_client().get_breed(breed_id), _breed)
+
+@_async_variant(get_dog_breed)
+async def aget_dog_breed(breed_id: str):
+    return compact_output("get_dog_breed", await get_async_dogapi_client().get_breed(breed_id), _breed)
 
 @tool
-def list_dog_facts(limit: int = 1):
+def list_dog_facts(limit: int = 1, config: RunnableConfig = None):
     """List dog facts with optional limit."""
-    return dogapi_client.list_facts(limit=limit)
+    if not DOG_FACT_POOL_ENABLED:
+        return compact_output("list_dog_facts", get_dogapi_client().list_facts(limit=limit), _fact_page)
+    facts = get_dog_fact_pool().sample(limit, _thread_id(config))
+    return compact_output("list_dog_facts", {"data": facts}, _fact_page)
+
+@_async_variant(list_dog_facts)
+async def alist_dog_facts(limit: int = 1, config: RunnableConfig = None):
+    if not DOG_FACT_POOL_ENABLED:
+        return compact_output("list_dog_facts", await get_async_dogapi_client().list_facts(limit=limit), _fact_page)
+    pool = get_dog_fact_pool()
+    if len(pool.facts) < limit:
+        # Only a cold (or too small) pool fetches in the request, and off the event loop
+        await asyncio.to_thread(pool.ensure_loaded, limit)
+    return compact_output("list_dog_facts", {"data": pool.sample(limit, _thread_id(config))}, _fact_page)
 
 @tool
 def list_dog_groups(page: int = 1):
     """List dog groups with optional pagination."""
-    return dogapi_client.list_groups(page=page)
+    return compact_output("list_dog_groups", get_dogapi_client().list_groups(page=page), _group_page)
+
+@_async_variant(list_dog_groups)
+async def alist_dog_groups(page: int = 1):
+    return compact_output("list_dog_groups", await get_async_dogapi_client().list_groups(page=page), _group_page)
 
 @tool
 def get_dog_group(group_id: str):
     """Get details for a specific dog group by ID."""
-    return dogapi_client.get_group(group_id)
+    return compact_output("get_dog_group", get_dogapi_client().get_group(group_id), _group)
+
+@_async_variant(get_dog_group)
+async def aget_dog_group(group_id: str):
+    return compact_output("get_dog_group", await get_async_dogapi_client().get_group(group_id), _group)
+
+@tool
+def find_dog_breed(name: str):
+    """Find dog breeds by name (approximate names and misspellings are fine) and return their full details and group. Prefer this over paging through list_dog_breeds."""
+    matches = get_dog_index().find_breeds(name)
+    if not matches:
+        return {"items": [], "hint": f"No breed matching '{name}'."}
+    return compact_output("find_dog_breed", matches, lambda breeds: {"items": [compact_breed(b) for b in breeds]})
+
+@tool
+def list_breeds_in_group(group_name: str):
+    """List the breeds that belong to a dog group, looked up by group name (e.g. 'herding' or 'Toy Group')."""
+    group = get_dog_index().breeds_in_group(group_name)
+    if group is None:
+        return {"group": None, "hint": f"No group matching '{group_name}'."}
+    return compact_output(
+        "list_breeds_in_group", group,
+        lambda g: {"group": g["name"], "group_id": g["id"], "items": [b["name"] for b in g["breeds"]]},
+    )
+
+
+# Discovered by tools.registry as the "dogapi" toolset; name lookups first so the model reaches for them
+TOOLS = [
+    find_dog_breed, list_breeds_in_group,
+    list_dog_breeds, get_dog_breed, list_dog_facts, list_dog_groups, get_dog_group,
+]
@@ -0,0 +1,238 @@
+"""
+Admission control for chat requests.
+
+Caps how many agent runs execute at once per process, queues a bounded number of
+callers (FIFO) for at most ADMISSION_QUEUE_TIMEOUT seconds, and rate limits each
+user with a token bucket. Anything over those limits is rejected immediately with
+AdmissionRejected, which the endpoints turn into 429 + Retry-After, so a burst
+degrades into fast rejections instead of slowing every in-flight request.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Deque, Dict, Mapping, Optional, Tuple
+
+from utils.telemetry import metrics
+
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+# Per-user limit; 0 disables rate limiting
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "20"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_MAX_KEYS = 10000
+# Header set by App Service authentication (Easy Auth) for signed-in users
+PRINCIPAL_HEADER = "x-ms-client-principal-id"
+
+queue_wait = metrics.histogram("admission_queue_wait_ms", "Time admitted requests waited for a slot")
+rejections = metrics.counter("admission_rejections_total", "Requests rejected by admission control")
+
+
+class AdmissionRejected(Exception):
+    """The request was not admitted; retry after `retry_after` seconds."""
+
+    status_code = 429
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Request rejected ({reason}); retry after {retry_after:.0f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+    def to_dict(self) -> Dict[str, object]:
+        messages = {
+            "rate_limited": "Too many messages, please slow down.",
+            "queue_full": "The assistant is busy, please try again shortly.",
+            "queue_timeout": "The assistant is busy, please try again shortly.",
+        }
+        return {"error": self.reason, "message": messages.get(self.reason, str(self)),
+                "retry_after": int(self.retry_after_header)}
+
+
+def rate_limit_key(headers: Mapping[str, str], thread_id: Optional[str] = None,
+                   client_host: Optional[str] = None) -> str:
+    """Key requests by signed-in user, else by conversation thread, else by client address."""
+    principal = next((v for k, v in headers.items() if k.lower() == PRINCIPAL_HEADER), None)
+    if principal:
+        return f"user:{principal}"
+    if thread_id:
+        return f"thread:{thread_id}"
+    return f"client:{client_host or 'anonymous'}"
+
+
+class RateLimiter:
+    """Token bucket per key: `rate_per_minute` sustained, up to `burst` at once. Keys are LRU-bounded."""
+
+    def __init__(self, rate_per_minute: float = RATE_LIMIT_PER_MINUTE, burst: int = RATE_LIMIT_BURST,
+                 max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key: str, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Take a token for `key`; returns (allowed, seconds until a token is available)."""
+        if self.rate <= 0:
+            return True, 0.0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / self.rate
+
+
+class Admission:
+    """A granted slot; release it when the agent run (or stream) finishes."""
+
+    def __init__(self, controller: "AdmissionController", waited: float):
+        self.controller = controller
+        self.waited = waited
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._release(time.monotonic() - self._started)
+
+
+class AdmissionController:
+    """
+    Concurrency cap with a bounded FIFO wait queue and per-key rate limiting.
+
+    Slots are handed directly from a finishing request to the oldest waiter, so
+    queued callers are served in order and a burst can't starve them. Safe to share
+    across event loops and threads.
+    """
+
+    def __init__(self, max_concurrent: int = ADMISSION_MAX_CONCURRENT, max_queue: int = ADMISSION_MAX_QUEUE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT, rate_limiter: Optional[RateLimiter] = None):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self._lock = threading.Lock()
+        self._running = 0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        # Moving average of how long an admitted request holds its slot, for Retry-After estimates
+        self._service_time = 1.0
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _reject(self, reason: str, retry_after: float):
+        rejections.inc(reason=reason)
+        raise AdmissionRejected(reason, retry_after)
+
+    async def acquire(self, key: Optional[str] = None) -> Admission:
+        """Wait for a slot, or raise AdmissionRejected if rate limited, the queue is full, or the wait times out."""
+        if key is not None:
+            allowed, retry_after = self.rate_limiter.try_acquire(key)
+            if not allowed:
+                self._reject("rate_limited", retry_after)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._running < self.max_concurrent and not self._waiters:
+                self._running += 1
+                queue_wait.observe(0.0)
+                return Admission(self, 0.0)
+            if len(self._waiters) >= self.max_queue:
+                retry_after = self._service_time * (len(self._waiters) + 1) / max(self.max_concurrent, 1)
+                self._reject("queue_full", retry_after)
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter[1], timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    queued = True
+                except ValueError:
+                    queued = False
+            if not queued and waiter[1].done() and not waiter[1].cancelled():
+                self._hand_over()  # granted just as we gave up; pass the slot on
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject("queue_timeout", self._service_time)
+        waited = time.monotonic() - start
+        queue_wait.observe(waited * 1000)
+        return Admission(self, waited)
+
+    def admit(self, key: Optional[str] = None) -> "_AdmitContext":
+        """`async with controller.admit(key):` around one agent run."""
+        return _AdmitContext(self, key)
+
+    def _release(self, held_for: float):
+        with self._lock:
+            self._service_time = 0.8 * self._service_time + 0.2 * held_for
+        self._hand_over()
+
+    def _hand_over(self):
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                if not future.done():
+                    break
+            else:
+                self._running -= 1
+                return
+        try:
+            loop.call_soon_threadsafe(self._grant, future)
+        except RuntimeError:  # the waiter's loop is closed
+            self._hand_over()
+
+    def _grant(self, future: asyncio.Future):
+        if future.done():
+            self._hand_over()  # the waiter gave up; the slot goes to the next one
+        else:
+            future.set_result(True)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"running": self._running, "waiting": len(self._waiters),
+                    "avg_service_time_s": round(self._service_time, 3)}
+
+
+class _AdmitContext:
+    def __init__(self, controller: AdmissionController, key: Optional[str]):
+        self.controller = controller
+        self.key = key
+        self.admission: Optional[Admission] = None
+
+    async def __aenter__(self) -> Admission:
+        self.admission = await self.controller.acquire(self.key)
+        return self.admission
+
+    async def __aexit__(self, *exc):
+        self.admission.release()
+
+
+async def release_after(admission: Admission, stream: AsyncIterator) -> AsyncIterator:
+    """Pass a response stream through, holding the slot until it finishes or the client disconnects."""
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        admission.release()
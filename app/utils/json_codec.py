@@ -0,0 +1,26 @@
+"""
+Compact JSON for API responses, SSE frames and JSONL streams.
+
+Uses orjson when it is installed (several times faster than the json module and
+emits no whitespace); falls back to json with the same output otherwise.
+Unknown types are encoded with str() in both cases.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    """UTF-8 encoded compact JSON."""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, default=str, separators=(",", ":")).encode()
+
+
+def dumps_text(value: Any) -> str:
+    return dumps(value).decode()
@@ -0,0 +1,21 @@
+import logging
+from typing import Any, AsyncIterator, Dict
+
+from utils.json_codec import dumps_text
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one Server-Sent Event frame with a JSON payload."""
+    return f"event: {event}\ndata: {dumps_text(data)}\n\n"
+
+
+async def sse_stream(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Turn agent event dicts into SSE frames, reporting failures as a final 'error' event."""
+    try:
+        async for event in events:
+            yield format_sse(event["event"], event["data"])
+    except Exception as e:
+        logger.exception("Streaming chat failed")
+        yield format_sse("error", {"message": str(e)})
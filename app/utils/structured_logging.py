@@ -0,0 +1,207 @@
+"""
+Non-blocking JSON logging and one consolidated log record per request.
+
+configure_logging() puts a QueueHandler on the root logger: the request path only
+enqueues the record, and a background QueueListener formats it (message, JSON,
+tracebacks) and writes it out. If the queue is full the record is dropped and
+counted in `log_records_dropped_total` rather than blocking the request. When the
+root logger already has handlers (the Azure Functions host installs its own, which
+must run on the invocation's thread) they are left as they are.
+
+Handlers log a request through request_log(): fields and stage timings are
+collected as the request runs and written as a single record when it ends. Records
+for successful requests are kept with probability LOG_SAMPLE_RATE; warnings and
+errors (status >= 400 or an exception) are always kept.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from utils.telemetry import metrics
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# LogRecord attributes that are not user fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "fields"}
+
+dropped_records = metrics.counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, `fields` and any `extra` attributes."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            # Request records carry their data as fields; their message would only repeat it
+            "message": fields["event"] if "event" in fields else record.getMessage(),
+        }
+        entry.update(fields)
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without formatting them; the listener thread does that.
+    Only the traceback is rendered here, since the frames it refers to may change.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if record.stack_info:
+            record.stack_info = str(record.stack_info)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records.inc()
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None) -> bool:
+    """
+    Route the root logger through a queue to a `fmt` ("json" or "text") stream handler.
+    Does nothing (and returns False) if logging is already configured.
+    """
+    global _listener
+    root = logging.getLogger()
+    with _configure_lock:
+        if _listener is not None or root.handlers:
+            return False
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+        records: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        root.addHandler(NonBlockingQueueHandler(records))
+        root.setLevel(level)
+        _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+    return True
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _configure_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in list(logging.getLogger().handlers):
+            if isinstance(handler, NonBlockingQueueHandler):
+                logging.getLogger().removeHandler(handler)
+
+
+class RequestLog:
+    """Fields and stage timings of one request, written as a single record by finish()."""
+
+    def __init__(self, event: str, logger: logging.Logger, sample_rate: float = LOG_SAMPLE_RATE, **fields):
+        self.event = event
+        self.logger = logger
+        self.sample_rate = sample_rate
+        self.fields: Dict[str, Any] = dict(fields)
+        self.level = logging.INFO
+        self.exc_info = None
+        self.start = time.perf_counter()
+        self.finished = False
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        """Record how long the block took as `<stage>_ms`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fields[f"{stage}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    def warning(self, reason: str, **fields):
+        self.level = max(self.level, logging.WARNING)
+        self.fields.update(fields, reason=reason)
+
+    def error(self, error: BaseException, **fields):
+        self.level = logging.ERROR
+        self.exc_info = (type(error), error, error.__traceback__)
+        self.fields.update(fields, error=f"{type(error).__name__}: {error}")
+
+    def finish(self, status: Optional[int] = None) -> bool:
+        """Write the record (unless sampled out); returns whether it was written."""
+        if self.finished:
+            return False
+        self.finished = True
+        if status is not None:
+            self.fields["status"] = status
+            if status >= 500:
+                self.level = max(self.level, logging.ERROR)
+            elif status >= 400:
+                self.level = max(self.level, logging.WARNING)
+        self.fields["duration_ms"] = round((time.perf_counter() - self.start) * 1000, 1)
+        if self.level == logging.INFO and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        if not self.logger.isEnabledFor(self.level):
+            return False
+        fields = {"event": self.event, **self.fields}
+        self.logger.log(self.level, "%s", _Fields(fields), exc_info=self.exc_info, extra={"fields": fields})
+        return True
+
+
+class _Fields:
+    """Renders as key=value pairs only when a text handler formats the message."""
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return " ".join(f"{key}={value}" for key, value in self.fields.items())
+
+
+@contextmanager
+def request_log(event: str, logger: logging.Logger, **fields) -> Iterator[RequestLog]:
+    """
+    Collect one request's log fields; the record is written when the block exits.
+    An escaping exception is logged as an error, or as a warning if it carries a
+    `status_code` below 500 (e.g. AdmissionRejected, HTTPException).
+    """
+    log = RequestLog(event, logger, **fields)
+    try:
+        yield log
+    except BaseException as e:
+        status = getattr(e, "status_code", None)
+        if isinstance(status, int) and status < 500:
+            log.warning(getattr(e, "reason", None) or type(e).__name__)
+            log.finish(status)
+        else:
+            log.error(e)
+        raise
+    finally:
+        log.finish()
@@ -1,23 +1,116 @@
+import os
+import threading
 import requests
-from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+from utils.response_cache import ResponseCache
+from utils.telemetry import span, http_requests, http_response_bytes
+
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("WEBCLIENT_CONNECT_TIMEOUT", "3.05"))
+DEFAULT_READ_TIMEOUT = float(os.getenv("WEBCLIENT_READ_TIMEOUT", "10"))
+DEFAULT_POOL_SIZE = int(os.getenv("WEBCLIENT_POOL_SIZE", "10"))
+DEFAULT_MAX_RETRIES = int(os.getenv("WEBCLIENT_MAX_RETRIES", "3"))
+DEFAULT_BACKOFF_FACTOR = float(os.getenv("WEBCLIENT_BACKOFF_FACTOR", "0.3"))
+DEFAULT_BACKOFF_JITTER = float(os.getenv("WEBCLIENT_BACKOFF_JITTER", "0.2"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# One pooled session per (base_url, pool_size, retry policy) shared by every client in the process
+_sessions: Dict[Tuple[str, int, int, float, float], requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(base_url: str, pool_size: int = DEFAULT_POOL_SIZE, max_retries: int = DEFAULT_MAX_RETRIES,
+                backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+                backoff_jitter: float = DEFAULT_BACKOFF_JITTER) -> requests.Session:
+    """Return the shared keep-alive session for a base URL, creating it on first use."""
+    key = (base_url, pool_size, max_retries, backoff_factor, backoff_jitter)
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            retry = Retry(
+                total=max_retries,
+                backoff_factor=backoff_factor,
+                backoff_jitter=backoff_jitter,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+    return session
+
+
+def close_sessions():
+    """Close every pooled session (used on shutdown and in tests)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
 
 class WebClient:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT, pool_size: int = DEFAULT_POOL_SIZE,
+                 max_retries: int = DEFAULT_MAX_RETRIES, backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+                 backoff_jitter: float = DEFAULT_BACKOFF_JITTER, cache: Optional[ResponseCache] = None):
         self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = get_session(self.base_url, pool_size=pool_size, max_retries=max_retries,
+                                   backoff_factor=backoff_factor, backoff_jitter=backoff_jitter)
 
     def request(self, endpoint: str, method: str = 'GET', params: Optional[Dict[str, Any]] = None,
                 body: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> requests.Response:
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        response = requests.request(
-            method=method.upper(),
-            url=url,
-            params=params,
-            json=body,
-            headers=headers
-        )
-        response.raise_for_status()
+        host = urlsplit(self.base_url).netloc
+        with span("http.request", name=host, method=method.upper(), url=url) as request_span:
+            try:
+                response = self.session.request(
+                    method=method.upper(),
+                    url=url,
+                    params=params,
+                    json=body,
+                    headers=headers,
+                    timeout=self.timeout
+                )
+            except requests.RequestException:
+                http_requests.inc(host=host, status="error")
+                raise
+            size = len(response.content)
+            request_span.set_attributes({"status": response.status_code, "bytes": size})
+            http_requests.inc(host=host, status=response.status_code)
+            http_response_bytes.observe(size, host=host)
+            response.raise_for_status()
         return response
 
+    def get_json(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET an endpoint and decode the JSON body, serving from and revalidating the cache when configured."""
+        if self.cache is None or self.cache.ttl_for(endpoint) <= 0:
+            return self.request(endpoint, method="GET", params=params).json()
+        key = self.cache.make_key(endpoint, params)
+        entry, fresh = self.cache.lookup(key)
+        if fresh:
+            return entry.value
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+        response = self.request(endpoint, method="GET", params=params, headers=headers)
+        if response.status_code == 304:
+            value = self.cache.refresh(key, endpoint)
+            if value is not None:
+                return value
+            response = self.request(endpoint, method="GET", params=params)
+        value = response.json()
+        self.cache.store(key, endpoint, value, etag=response.headers.get("ETag"))
+        return value
+
 # Example usage:
 # class MyAPIClient(WebClient):
 #     def get_data(self, resource_id):
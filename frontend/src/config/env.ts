@@ -1,6 +1,7 @@
 interface ImportMetaEnv {
   readonly VITE_API_URL?: string
   readonly VITE_GOOGLE_CLIENT_ID?: string
+  readonly VITE_CHAT_STREAMING?: string
   // add new env vars here as needed
 }
 interface ImportMeta { env: ImportMetaEnv }
@@ -10,6 +11,7 @@ const viteEnv: ImportMetaEnv = (import.meta as ImportMeta).env || {}
 export const env = {
   API_URL: viteEnv.VITE_API_URL ?? 'http://127.0.0.1:8000',
   GOOGLE_CLIENT_ID: viteEnv.VITE_GOOGLE_CLIENT_ID,
+  CHAT_STREAMING: viteEnv.VITE_CHAT_STREAMING === 'true',
 } as const
 
 export function assertEnv() {
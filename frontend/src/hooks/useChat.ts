@@ -1,6 +1,7 @@
 import { useEffect, useRef, useState } from 'react'
 import type { AssistantMessage, Message, UserMessage } from '../models/message'
 import { chatService } from '../services/api'
+import { env } from '../config/env'
 
 export function useChat() {
   const STORAGE_KEY = 'chat.messages.v1'
@@ -45,12 +46,26 @@ export function useChat() {
       const thinkingMsg: AssistantMessage = { role: 'assistant', content: 'Thinking…', thread_id: threadId ?? undefined, error: null }
       setMessages((prev) => [...prev, thinkingMsg])
     try {
-      const response = await chatService.sendMessage(userMsg.content, threadId)
+      const response = env.CHAT_STREAMING
+        ? await chatService.streamMessage(userMsg.content, threadId, (evt) => {
+            if (evt.event !== 'token') return
+            // Grow the placeholder in place as tokens arrive
+            setMessages((prev) => {
+              const copy = [...prev]
+              const last = copy[copy.length - 1]
+              if (last?.role === 'assistant') {
+                const content = last.content === 'Thinking…' ? evt.data.content : last.content + evt.data.content
+                copy[copy.length - 1] = { ...last, content }
+              }
+              return copy
+            })
+          })
+        : await chatService.sendMessage(userMsg.content, threadId)
       if (!response.error && response.thread_id) setThreadId(response.thread_id)
         setMessages((prev) => {
           const copy = [...prev]
           for (let i = copy.length - 1; i >= 0; i--) {
-            if (copy[i].role === 'assistant' && copy[i].content === 'Thinking…') { copy[i] = response as AssistantMessage; break }
+            if (copy[i].role === 'assistant' && (env.CHAT_STREAMING || copy[i].content === 'Thinking…')) { copy[i] = response as AssistantMessage; break }
           }
           return copy
         })
@@ -65,7 +80,7 @@ export function useChat() {
         setMessages((prev) => {
           const copy = [...prev]
           for (let i = copy.length - 1; i >= 0; i--) {
-            if (copy[i].role === 'assistant' && copy[i].content === 'Thinking…') { copy[i] = errorMsg; break }
+            if (copy[i].role === 'assistant' && (env.CHAT_STREAMING || copy[i].content === 'Thinking…')) { copy[i] = errorMsg; break }
           }
           return copy
         })
@@ -1,17 +1,49 @@
 import type { AssistantMessage } from '../models/message'
 import { env } from '../config/env'
-import { http, HttpError } from '../utils/http'
+import { http, HttpError, getAzureAuthToken } from '../utils/http'
 
 type ChatResponse = { content: string; thread_id: string }
 
+export type ChatStreamEvent =
+  | { event: 'token'; data: { content: string } }
+  | { event: 'tool_start'; data: { id: string; name: string; input: unknown } }
+  | { event: 'tool_end'; data: { id: string; name: string; output: string } }
+  | { event: 'done'; data: ChatResponse }
+  | { event: 'error'; data: { message: string } }
+
+function parseSseFrame(frame: string): ChatStreamEvent | null {
+  let event = 'message'
+  const data: string[] = []
+  for (const line of frame.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim()
+    else if (line.startsWith('data:')) data.push(line.slice(5).trimStart())
+  }
+  if (data.length === 0) return null
+  return { event, data: JSON.parse(data.join('\n')) } as ChatStreamEvent
+}
+
 export const chatService = {
-  async sendMessage(content: string, threadId: string | null): Promise<AssistantMessage> {
-    try {
-      const data = await http<ChatResponse>(`${env.API_URL}/api/chat`, {
+  /**
+   * Sends a message to /api/chat. The Idempotency-Key identifies this message, so the
+   * one retry after a network failure (or a double submit) reuses the running turn
+   * on the server instead of starting a second one.
+   */
+  async sendMessage(
+    content: string,
+    threadId: string | null,
+    idempotencyKey: string = crypto.randomUUID(),
+  ): Promise<AssistantMessage> {
+    const request = () =>
+      http<ChatResponse>(`${env.API_URL}/api/chat`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey },
         body: JSON.stringify({ content, thread_id: threadId }),
       })
+    try {
+      const data = await request().catch((error) => {
+        if (error instanceof HttpError) throw error
+        return request()
+      })
 
       return {
         role: 'assistant',
@@ -35,4 +67,64 @@ export const chatService = {
       }
     }
   },
+
+  /**
+   * Streams a reply from /api/chat/stream, calling onEvent for every token and tool event.
+   * Resolves with the final assistant message once the 'done' (or 'error') event arrives.
+   */
+  async streamMessage(
+    content: string,
+    threadId: string | null,
+    onEvent: (event: ChatStreamEvent) => void,
+    idempotencyKey: string = crypto.randomUUID(),
+  ): Promise<AssistantMessage> {
+    const headers = new Headers({
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+      'Idempotency-Key': idempotencyKey,
+    })
+    const token = getAzureAuthToken()
+    if (token) headers.set('X-ZUMO-AUTH', token)
+
+    let partial = ''
+    try {
+      const res = await fetch(`${env.API_URL}/api/chat/stream`, {
+        method: 'POST',
+        headers,
+        body: JSON.stringify({ content, thread_id: threadId }),
+      })
+      if (!res.ok || !res.body) throw new HttpError(res.status, res.statusText || 'Request failed')
+
+      const reader = res.body.pipeThrough(new TextDecoderStream()).getReader()
+      let buffer = ''
+      for (;;) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += value
+        let boundary = buffer.indexOf('\n\n')
+        while (boundary !== -1) {
+          const evt = parseSseFrame(buffer.slice(0, boundary))
+          buffer = buffer.slice(boundary + 2)
+          boundary = buffer.indexOf('\n\n')
+          if (!evt) continue
+          onEvent(evt)
+          if (evt.event === 'token') partial += evt.data.content
+          if (evt.event === 'done') {
+            return { role: 'assistant', content: evt.data.content || partial, thread_id: evt.data.thread_id, error: null }
+          }
+          if (evt.event === 'error') {
+            return { role: 'assistant', content: partial || evt.data.message, error: { message: evt.data.message, code: 'STREAM_ERROR' } }
+          }
+        }
+      }
+      return { role: 'assistant', content: partial, error: { message: 'Stream ended unexpectedly', code: 'STREAM_ERROR' } }
+    } catch (error) {
+      const err = error as { message?: string; status?: number }
+      return {
+        role: 'assistant',
+        content: partial || err?.message || 'A network error occurred',
+        error: { message: err?.message || 'A network error occurred', code: err?.status ?? 'NETWORK_ERROR' },
+      }
+    }
+  },
 }
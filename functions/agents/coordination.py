@@ -0,0 +1,194 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+from uuid import NAMESPACE_URL, uuid4, uuid5
+
+from utils.telemetry import metrics
+
+# How long a finished turn's result is replayed for a retried idempotency key
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "300"))
+IDEMPOTENCY_MAX_RESULTS = int(os.getenv("IDEMPOTENCY_MAX_RESULTS", "1000"))
+IDEMPOTENCY_HEADER = "idempotency-key"
+IDEMPOTENCY_KEY_MAX_LENGTH = 128
+
+coalesced_requests = metrics.counter("agent_coalesced_requests_total",
+                                     "Requests answered from an in-flight or recent turn with the same idempotency key")
+thread_lock_wait = metrics.histogram("thread_lock_wait_ms", "Time a turn waited for an earlier turn on its thread")
+
+
+def idempotency_key(headers: Mapping[str, str]) -> Optional[str]:
+    """The request's Idempotency-Key header, if present and sane."""
+    key = next((v for k, v in headers.items() if k.lower() == IDEMPOTENCY_HEADER), None)
+    key = key.strip() if key else None
+    return key if key and len(key) <= IDEMPOTENCY_KEY_MAX_LENGTH else None
+
+
+def resolve_thread_id(thread_id: Optional[str], key: Optional[str]) -> str:
+    """
+    Thread for a request. A new conversation's thread id is derived from the
+    idempotency key, so a retried first message lands on the same thread.
+    """
+    if thread_id:
+        return thread_id
+    return str(uuid5(NAMESPACE_URL, f"idempotency:{key}")) if key else str(uuid4())
+
+
+class TurnInterrupted(RuntimeError):
+    """The turn a duplicate request attached to was cancelled before it finished."""
+
+
+class ThreadCoordinator:
+    """
+    Serializes turns per thread and coalesces duplicate requests.
+
+    Turns on the same thread_id run one at a time in arrival order, so a double
+    submit can't interleave checkpoint writes. A request carrying the idempotency
+    key of a turn that is running, or finished within IDEMPOTENCY_TTL seconds,
+    gets that turn's result instead of starting another LLM loop. Failed turns
+    are not remembered, so retrying them runs again.
+
+    Async callers are ordered with asyncio locks and sync callers with thread
+    locks; an app should drive a given thread through one or the other.
+    """
+
+    def __init__(self, result_ttl: float = IDEMPOTENCY_TTL, max_results: int = IDEMPOTENCY_MAX_RESULTS):
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._async_locks: Dict[str, List[Any]] = {}  # thread_id -> [asyncio.Lock, users]
+        self._sync_locks: Dict[str, List[Any]] = {}  # thread_id -> [threading.Lock, users]
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._results: "OrderedDict[Tuple[str, str], Tuple[float, Future]]" = OrderedDict()
+
+    # -- per-thread ordering -------------------------------------------------
+
+    def _checkout(self, locks: Dict[str, List[Any]], thread_id: str, factory) -> List[Any]:
+        with self._lock:
+            entry = locks.get(thread_id)
+            if entry is None:
+                entry = locks[thread_id] = [factory(), 0]
+            entry[1] += 1
+            return entry
+
+    def _checkin(self, locks: Dict[str, List[Any]], thread_id: str, entry: List[Any]):
+        with self._lock:
+            entry[1] -= 1
+            if entry[1] == 0 and locks.get(thread_id) is entry:
+                del locks[thread_id]
+
+    @asynccontextmanager
+    async def alock(self, thread_id: str):
+        """Hold `thread_id` exclusively for one async turn."""
+        entry = self._checkout(self._async_locks, thread_id, asyncio.Lock)
+        try:
+            start = time.perf_counter()
+            async with entry[0]:
+                thread_lock_wait.observe((time.perf_counter() - start) * 1000)
+                yield
+        finally:
+            self._checkin(self._async_locks, thread_id, entry)
+
+    @contextmanager
+    def lock(self, thread_id: str):
+        """Hold `thread_id` exclusively for one sync turn."""
+        entry = self._checkout(self._sync_locks, thread_id, threading.Lock)
+        try:
+            start = time.perf_counter()
+            with entry[0]:
+                thread_lock_wait.observe((time.perf_counter() - start) * 1000)
+                yield
+        finally:
+            self._checkin(self._sync_locks, thread_id, entry)
+
+    # -- idempotency ---------------------------------------------------------
+
+    def begin(self, thread_id: str, key: str) -> Tuple[Future, bool]:
+        """
+        Claim `key` on `thread_id`. Returns (future, owner): the owner runs the turn
+        and must call finish(); anyone else waits on the future for its result.
+        """
+        scoped = (thread_id, key)
+        now = time.monotonic()
+        with self._lock:
+            while self._results and next(iter(self._results.values()))[0] <= now:
+                self._results.popitem(last=False)
+            existing = self._inflight.get(scoped)
+            if existing is None and scoped in self._results:
+                existing = self._results[scoped][1]
+            if existing is not None:
+                coalesced_requests.inc()
+                return existing, False
+            future: Future = Future()
+            future.set_running_or_notify_cancel()
+            self._inflight[scoped] = future
+            return future, True
+
+    def finish(self, thread_id: str, key: str, future: Future, result: Any = None,
+               error: Optional[BaseException] = None):
+        """Publish the owner's outcome to attached requests; successful results are kept for replay."""
+        scoped = (thread_id, key)
+        with self._lock:
+            if self._inflight.get(scoped) is future:
+                del self._inflight[scoped]
+            if error is None:
+                self._results[scoped] = (time.monotonic() + self.result_ttl, future)
+                while len(self._results) > self.max_results:
+                    self._results.popitem(last=False)
+        if error is None:
+            future.set_result(result)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            future.set_exception(TurnInterrupted("The original request was cancelled"))
+
+    # -- running turns -------------------------------------------------------
+
+    def run(self, thread_id: str, key: Optional[str], turn: Callable[[], Any]) -> Any:
+        """Run `turn` in order on its thread, or return the result of the turn already running for `key`."""
+        if key is None:
+            with self.lock(thread_id):
+                return turn()
+        future, owner = self.begin(thread_id, key)
+        if not owner:
+            return future.result()
+        try:
+            with self.lock(thread_id):
+                result = turn()
+        except BaseException as e:
+            self.finish(thread_id, key, future, error=e)
+            raise
+        self.finish(thread_id, key, future, result)
+        return result
+
+    async def arun(self, thread_id: str, key: Optional[str], turn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async run(). With a key, the turn runs as its own task, so the caller that
+        started it disconnecting doesn't cancel the turn other requests attached to.
+        """
+        if key is None:
+            async with self.alock(thread_id):
+                return await turn()
+        future, owner = self.begin(thread_id, key)
+        if not owner:
+            return await asyncio.wrap_future(future)
+
+        async def locked_turn():
+            async with self.alock(thread_id):
+                return await turn()
+
+        task = asyncio.ensure_future(locked_turn())
+        task.add_done_callback(lambda done: self._finish_task(thread_id, key, future, done))
+        return await asyncio.shield(task)
+
+    def _finish_task(self, thread_id: str, key: str, future: Future, task: asyncio.Future):
+        if task.cancelled():
+            self.finish(thread_id, key, future, error=asyncio.CancelledError())
+        elif task.exception() is not None:
+            self.finish(thread_id, key, future, error=task.exception())
+        else:
+            self.finish(thread_id, key, future, task.result())
@@ -0,0 +1,235 @@
+"""
+Deterministic fast path for requests that map straight onto one tool call.
+
+"give me 3 dog facts", "list dog groups", "tell me about the Beagle" and "which
+breeds are in the herding group" are matched by pattern, answered by calling the
+tool directly and rendered from a template, without an LLM call. The exchange is
+written to the thread as the tool call, tool result and answer the agent would
+have produced, so later turns see it. Anything that does not match, or whose
+tool result is not a confident answer (e.g. no breed with exactly that name),
+falls through to the agent.
+
+Enable with INTENT_ROUTER_ENABLED=true; routed and fallthrough turns are counted
+in `agent_intent_router_turns_total`.
+"""
+
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, ToolException
+
+from apis.dogapi_index import normalize_name
+from utils.telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "false").lower() == "true"
+INTENT_MAX_FACTS = int(os.getenv("INTENT_MAX_FACTS", "10"))
+INTENT_MAX_LISTED = 25
+
+routed_turns = metrics.counter("agent_intent_router_turns_total",
+                               "Turns answered by the intent router (routed) or passed to the agent (fallthrough)")
+
+_NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+                 "eight": 8, "nine": 9, "ten": 10, "some": 3, "a few": 3, "few": 3}
+_POLITE = r"(?:(?:hi|hey|hello|ok|okay)\s+)?(?:please\s+)?(?:can you\s+|could you\s+)?"
+
+
+def normalize_request(text: str) -> str:
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"[!?.,;:]+", " ", text)
+    text = re.sub(r"\s+please$", "", " ".join(text.split()))
+    return text
+
+
+def routing_counts() -> Dict[str, float]:
+    """Routed and fallthrough turns so far, across all intents."""
+    counts = {"routed": 0, "fallthrough": 0}
+    for series in routed_turns.snapshot():
+        counts[series["labels"]["outcome"]] += series["value"]
+    return counts
+
+
+class Intent:
+    """One request pattern, the tool call it maps to and the template that renders the answer."""
+
+    def __init__(self, name: str, pattern: str, tool: str, args: Callable[[re.Match], Optional[Dict[str, Any]]],
+                 render: Callable[[Any, Dict[str, Any]], Optional[str]]):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.tool = tool
+        self.args = args
+        self.render = render
+
+
+def _fact_args(match: re.Match) -> Optional[Dict[str, Any]]:
+    count = match.group("count")
+    limit = 1 if count is None and not match.group("plural") else 3 if count is None else (
+        int(count) if count.isdigit() else _NUMBER_WORDS.get(count))
+    if not limit or limit > INTENT_MAX_FACTS:
+        return None
+    return {"limit": limit}
+
+
+def _render_facts(result: Any, args: Dict[str, Any]) -> Optional[str]:
+    facts = [fact for fact in (result or {}).get("items", []) if fact]
+    if not facts:
+        return None
+    if len(facts) == 1:
+        return f"Here's a dog fact: {facts[0]}"
+    return f"Here are {len(facts)} dog facts:\n\n" + "\n".join(f"{i}. {fact}" for i, fact in enumerate(facts, 1))
+
+
+def _render_groups(result: Any, args: Dict[str, Any]) -> Optional[str]:
+    groups = (result or {}).get("items") or []
+    if not groups:
+        return None
+    lines = [f"- {group['name']} ({group['breed_count']} breeds)" if group.get("breed_count") else f"- {group['name']}"
+             for group in groups]
+    answer = "Here are the dog groups:\n\n" + "\n".join(lines)
+    if result.get("next_page"):
+        answer += "\n\nThere are more groups; ask for the next page to see them."
+    return answer
+
+
+def _render_breed(result: Any, args: Dict[str, Any]) -> Optional[str]:
+    breeds = (result or {}).get("items") or []
+    # Only an exact name match is confident; near matches ("Beagle" for "bagel") go to the agent
+    if not breeds or normalize_name(breeds[0].get("name", "")) != normalize_name(args["name"]):
+        return None
+    breed = breeds[0]
+    title = f"**{breed['name']}**" + (f" ({breed['group']})" if breed.get("group") else "")
+    details = [
+        (f"Life expectancy: {breed['life_years']} years", "life_years"),
+        (f"Male weight: {breed.get('male_weight_kg')} kg", "male_weight_kg"),
+        (f"Female weight: {breed.get('female_weight_kg')} kg", "female_weight_kg"),
+        (f"Hypoallergenic: {'yes' if breed.get('hypoallergenic') else 'no'}", "hypoallergenic"),
+    ]
+    lines = [title]
+    if breed.get("description"):
+        lines += ["", breed["description"]]
+    facts = [text for text, key in details if breed.get(key) is not None]
+    if facts:
+        lines += [""] + [f"- {text}" for text in facts]
+    return "\n".join(lines)
+
+
+def _render_group_breeds(result: Any, args: Dict[str, Any]) -> Optional[str]:
+    group, breeds = (result or {}).get("group"), (result or {}).get("items") or []
+    query = normalize_name(args["group_name"])
+    if not group or not breeds or query not in normalize_name(group):
+        return None
+    shown = ", ".join(breeds[:INTENT_MAX_LISTED])
+    more = f", and {len(breeds) - INTENT_MAX_LISTED} more" if len(breeds) > INTENT_MAX_LISTED else ""
+    return f"The {group} has {len(breeds)} breeds: {shown}{more}."
+
+
+_NAME = r"(?P<name>[a-z][a-z' -]{1,40}?)"
+
+INTENTS: List[Intent] = [
+    Intent(
+        "dog_facts",
+        rf"^{_POLITE}(?:(?:give|tell|show|send|share)(?: me| us)? )?(?:(?P<count>\d+|a few|an?|one|two|three|four|five"
+        r"|six|seven|eight|nine|ten|some|few) )?(?:more )?(?:random |fun |interesting )?dog fact(?P<plural>s)?$",
+        "list_dog_facts", _fact_args, _render_facts,
+    ),
+    Intent(
+        "dog_groups",
+        rf"^{_POLITE}(?:list|show(?: me)?|what are)(?: all| some)?(?: of)?(?: the)? (?:dog|breed) groups$",
+        "list_dog_groups", lambda match: {"page": 1}, _render_groups,
+    ),
+    Intent(
+        "breed_info",
+        rf"^{_POLITE}(?:tell me about|what is|what's|describe|info on|information about)(?: the| a| an)? {_NAME}"
+        r"(?: breed| dogs?)?$",
+        "find_dog_breed", lambda match: {"name": match.group("name").strip()}, _render_breed,
+    ),
+    Intent(
+        "group_breeds",
+        rf"^{_POLITE}(?:which|what|list|show(?: me)?)(?: the)?(?: dog)? breeds (?:are )?in(?: the)? "
+        r"(?P<group>[a-z][a-z' -]{1,40}?) group$",
+        "list_breeds_in_group", lambda match: {"group_name": match.group("group").strip()}, _render_group_breeds,
+    ),
+]
+
+
+class IntentRouter:
+    """
+    Matches INTENTS whose tool is among `tools` and answers them without the agent.
+    Pass tools wrapped by timed_tools(), so a hung call falls through once its timeout passes.
+    """
+
+    def __init__(self, tools: Sequence[BaseTool], intents: Sequence[Intent] = INTENTS):
+        self.tools = {tool.name: tool for tool in tools}
+        self.intents = [intent for intent in intents if intent.tool in self.tools]
+
+    def match(self, text: str) -> Optional[Tuple[Intent, Dict[str, Any]]]:
+        normalized = normalize_request(text)
+        for intent in self.intents:
+            found = intent.pattern.match(normalized)
+            if found:
+                args = intent.args(found)
+                if args is not None:
+                    return intent, args
+        return None
+
+    def route(self, text: str, config: Optional[RunnableConfig] = None) -> Optional[List[BaseMessage]]:
+        """
+        The exchange to record for `text` ([human, tool call, tool result, answer]), or None to use the agent.
+        `config` is the turn's run config, passed on to the tool (e.g. so facts aren't repeated on a thread).
+        """
+        matched = self.match(text)
+        if matched is None:
+            return self._fallthrough("no_match")
+        intent, args = matched
+        try:
+            result = self.tools[intent.tool].invoke(args, config)
+        except ToolException as e:
+            # e.g. a timeout from with_timeout(); the agent can still answer, or explain the failure
+            logger.warning("Intent %s tool call failed (%s); falling through to the agent", intent.name, e)
+            return self._fallthrough("tool_error", intent)
+        except Exception:
+            logger.warning("Intent %s tool call failed; falling through to the agent", intent.name, exc_info=True)
+            return self._fallthrough("tool_error", intent)
+        return self._exchange(text, intent, args, result)
+
+    async def aroute(self, text: str, config: Optional[RunnableConfig] = None) -> Optional[List[BaseMessage]]:
+        matched = self.match(text)
+        if matched is None:
+            return self._fallthrough("no_match")
+        intent, args = matched
+        try:
+            result = await self.tools[intent.tool].ainvoke(args, config)
+        except ToolException as e:
+            # e.g. a timeout from with_timeout(); the agent can still answer, or explain the failure
+            logger.warning("Intent %s tool call failed (%s); falling through to the agent", intent.name, e)
+            return self._fallthrough("tool_error", intent)
+        except Exception:
+            logger.warning("Intent %s tool call failed; falling through to the agent", intent.name, exc_info=True)
+            return self._fallthrough("tool_error", intent)
+        return self._exchange(text, intent, args, result)
+
+    def _exchange(self, text: str, intent: Intent, args: Dict[str, Any], result: Any) -> Optional[List[BaseMessage]]:
+        answer = intent.render(result, args)
+        if answer is None:
+            return self._fallthrough("low_confidence", intent)
+        routed_turns.inc(outcome="routed", intent=intent.name)
+        call_id = f"route_{uuid4().hex[:12]}"
+        content = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+        return [
+            HumanMessage(text),
+            AIMessage("", tool_calls=[{"name": intent.tool, "args": args, "id": call_id}]),
+            ToolMessage(content, tool_call_id=call_id, name=intent.tool),
+            AIMessage(answer, response_metadata={"intent_router": intent.name}),
+        ]
+
+    @staticmethod
+    def _fallthrough(reason: str, intent: Optional[Intent] = None) -> None:
+        routed_turns.inc(outcome="fallthrough", intent=intent.name if intent else "none", reason=reason)
+        return None
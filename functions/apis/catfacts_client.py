@@ -1,19 +1,27 @@
-from app.utils.webclient import WebClient
+import os
+from utils.webclient import WebClient
+from utils.response_cache import ResponseCache
 from typing import Any, Dict, Optional, Union
 
+# Random facts must vary per call; individual facts are immutable
+CATFACTS_CACHE_TTLS = {
+    "facts/random": 0,
+    "facts": float(os.getenv("CATFACTS_CACHE_TTL", "86400")),
+}
+
+
 class CatFactsClient(WebClient):
-    def __init__(self):
-        super().__init__(base_url="https://cat-fact.herokuapp.com")
+    def __init__(self, cache: Optional[ResponseCache] = None, **kwargs):
+        cache = cache or ResponseCache(ttls=CATFACTS_CACHE_TTLS, max_entries=int(os.getenv("CATFACTS_CACHE_SIZE", "256")))
+        super().__init__(base_url="https://cat-fact.herokuapp.com", cache=cache, **kwargs)
 
     def get_random_facts(self, animal_type: str = "cat", amount: int = 1) -> Union[Dict[str, Any], list]:
         params = {"animal_type": animal_type, "amount": amount}
-        response = self.request(endpoint="facts/random", method="GET", params=params)
-        return response.json()
+        return self.get_json(endpoint="facts/random", params=params)
 
     def get_fact_by_id(self, fact_id: str, animal_type: Optional[str] = None) -> Dict[str, Any]:
         params = {"animal_type": animal_type} if animal_type else None
-        response = self.request(endpoint=f"facts/{fact_id}", method="GET", params=params)
-        return response.json()
+        return self.get_json(endpoint=f"facts/{fact_id}", params=params)
 
 # Example usage:
 # client = CatFactsClient()
@@ -1,32 +1,72 @@
+import os
 from utils.webclient import WebClient
+from utils.async_webclient import AsyncWebClient
+from utils.response_cache import ResponseCache
 from typing import Any, Dict, Optional, Union
 
+# Overridable so tests and benchmarks can point the clients at a local stub server
+DOGAPI_BASE_URL = os.getenv("DOGAPI_BASE_URL", "https://dogapi.dog/api/v2")
+
+# Breed and group data barely changes; facts are random per call and never cached
+DOGAPI_CACHE_TTLS = {
+    "breeds": float(os.getenv("DOGAPI_CACHE_TTL", "86400")),
+    "groups": float(os.getenv("DOGAPI_CACHE_TTL", "86400")),
+    "facts": 0,
+}
+
+
+def default_dogapi_cache() -> ResponseCache:
+    return ResponseCache(
+        ttls=DOGAPI_CACHE_TTLS,
+        max_entries=int(os.getenv("DOGAPI_CACHE_SIZE", "256")),
+        persist_path=os.getenv("DOGAPI_CACHE_PATH"),
+    )
+
+
 class DogApiClient(WebClient):
-    def __init__(self):
-        super().__init__(base_url="https://dogapi.dog/api/v2")
+    def __init__(self, cache: Optional[ResponseCache] = None, **kwargs):
+        super().__init__(base_url=DOGAPI_BASE_URL, cache=cache or default_dogapi_cache(), **kwargs)
 
     def list_breeds(self, page: Optional[int] = None) -> Dict[str, Any]:
         params = {"page[number]": page} if page else None
-        response = self.request(endpoint="breeds", method="GET", params=params)
-        return response.json()
+        return self.get_json(endpoint="breeds", params=params)
 
     def get_breed(self, breed_id: str) -> Dict[str, Any]:
-        response = self.request(endpoint=f"breeds/{breed_id}", method="GET")
-        return response.json()
+        return self.get_json(endpoint=f"breeds/{breed_id}")
 
     def list_facts(self, limit: Optional[int] = None) -> Dict[str, Any]:
         params = {"limit": limit} if limit else None
-        response = self.request(endpoint="facts", method="GET", params=params)
-        return response.json()
+        return self.get_json(endpoint="facts", params=params)
 
     def list_groups(self, page: Optional[int] = None) -> Dict[str, Any]:
         params = {"page[number]": page} if page else None
-        response = self.request(endpoint="groups", method="GET", params=params)
-        return response.json()
+        return self.get_json(endpoint="groups", params=params)
 
     def get_group(self, group_id: str) -> Dict[str, Any]:
-        response = self.request(endpoint=f"groups/{group_id}", method="GET")
-        return response.json()
+        return self.get_json(endpoint=f"groups/{group_id}")
+
+
+class AsyncDogApiClient(AsyncWebClient):
+    def __init__(self, cache: Optional[ResponseCache] = None, **kwargs):
+        super().__init__(base_url=DOGAPI_BASE_URL, cache=cache or default_dogapi_cache(), **kwargs)
+
+    async def list_breeds(self, page: Optional[int] = None) -> Dict[str, Any]:
+        params = {"page[number]": page} if page else None
+        return await self.get_json(endpoint="breeds", params=params)
+
+    async def get_breed(self, breed_id: str) -> Dict[str, Any]:
+        return await self.get_json(endpoint=f"breeds/{breed_id}")
+
+    async def list_facts(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        params = {"limit": limit} if limit else None
+        return await self.get_json(endpoint="facts", params=params)
+
+    async def list_groups(self, page: Optional[int] = None) -> Dict[str, Any]:
+        params = {"page[number]": page} if page else None
+        return await self.get_json(endpoint="groups", params=params)
+
+    async def get_group(self, group_id: str) -> Dict[str, Any]:
+        return await self.get_json(endpoint=f"groups/{group_id}")
 
 # Example usage:
 # client = DogApiClient()
@@ -35,3 +75,4 @@ class DogApiClient(WebClient):
 # print(client.list_facts(limit=5))
 # print(client.list_groups())
 # print(client.get_group("02124eb6-1baa-410c-90ea-6b8629fb0837"))
+# print(client.cache.stats())
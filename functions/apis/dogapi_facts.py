@@ -0,0 +1,154 @@
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from apis.dogapi_client import DogApiClient
+
+logger = logging.getLogger(__name__)
+
+DOG_FACT_POOL_ENABLED = os.getenv("DOG_FACT_POOL_ENABLED", "true").lower() == "true"
+DOG_FACT_BATCH_SIZE = int(os.getenv("DOG_FACT_BATCH_SIZE", "50"))
+DOG_FACT_LOW_WATER = int(os.getenv("DOG_FACT_LOW_WATER", "10"))
+DOG_FACT_POOL_MAX = int(os.getenv("DOG_FACT_POOL_MAX", "1000"))
+DOG_FACT_REFRESH_INTERVAL = float(os.getenv("DOG_FACT_REFRESH_INTERVAL", "21600"))
+# Threads whose served facts are remembered, least recently served dropped first
+DOG_FACT_MAX_THREADS = 10000
+
+
+def _fact_key(body: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", body.lower()).split())
+
+
+class DogFactPool:
+    """
+    In-process pool of dog facts, so fact lookups don't wait on dogapi.dog.
+
+    Facts are fetched batch_size at a time and de-duplicated by id and wording.
+    sample() draws random facts a thread hasn't been served yet; when fewer than
+    low_water unseen facts are left, another batch is fetched in the background.
+    A batch that adds nothing new means the pool holds the whole upstream set,
+    so fetching pauses for refresh_interval seconds. A thread that has seen every
+    fact starts over.
+    """
+
+    def __init__(self, client: DogApiClient, batch_size: int = DOG_FACT_BATCH_SIZE,
+                 low_water: int = DOG_FACT_LOW_WATER, max_facts: int = DOG_FACT_POOL_MAX,
+                 refresh_interval: float = DOG_FACT_REFRESH_INTERVAL, max_threads: int = DOG_FACT_MAX_THREADS):
+        self.client = client
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.max_facts = max_facts
+        self.refresh_interval = refresh_interval
+        self.max_threads = max_threads
+        self.facts: Dict[str, str] = {}
+        self._ids: List[str] = []
+        self._keys: Set[str] = set()
+        self._served: "OrderedDict[str, Set[str]]" = OrderedDict()
+        self.exhausted_at: Optional[float] = None
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refilling = threading.Event()
+
+    def _add(self, payload: Dict[str, Any]) -> int:
+        added = 0
+        with self._lock:
+            for resource in payload.get("data", []):
+                body = (resource.get("attributes") or {}).get("body")
+                key = _fact_key(body or "")
+                if not key or resource.get("id") in self.facts or key in self._keys:
+                    continue
+                if len(self._ids) >= self.max_facts:
+                    break
+                self.facts[resource["id"]] = body
+                self._ids.append(resource["id"])
+                self._keys.add(key)
+                added += 1
+        return added
+
+    def refill(self) -> int:
+        """Fetch one batch from the API; returns how many new facts it added."""
+        start = time.time()
+        payload = self.client.list_facts(limit=self.batch_size)
+        self.fetches += 1
+        added = self._add(payload)
+        if added == 0 and self.facts:
+            self.exhausted_at = time.time()
+        logger.info("Dog fact pool refilled: %d new, %d total in %.2fs", added, len(self._ids), time.time() - start)
+        return added
+
+    def _can_grow(self) -> bool:
+        if len(self._ids) >= self.max_facts:
+            return False
+        return self.exhausted_at is None or time.time() - self.exhausted_at >= self.refresh_interval
+
+    def _refill_in_background(self):
+        if self._refilling.is_set():
+            return
+        self._refilling.set()
+
+        def run():
+            try:
+                with self._load_lock:
+                    self.refill()
+            except Exception:
+                logger.exception("Dog fact pool refill failed")
+            finally:
+                self._refilling.clear()
+
+        threading.Thread(target=run, name="dog-fact-refill", daemon=True).start()
+
+    def prefetch(self):
+        """Start loading the first batch without blocking the caller."""
+        if not self._ids:
+            self._refill_in_background()
+
+    def ensure_loaded(self, count: int = 1):
+        """Fetch synchronously until the pool holds `count` facts or the API has no more to give."""
+        if len(self._ids) >= count:
+            return
+        with self._load_lock:
+            while len(self._ids) < count and self._can_grow():
+                if not self.refill():
+                    break
+
+    def sample(self, limit: int = 1, thread_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Up to `limit` random facts as Dog API fact resources, not repeating any already served to `thread_id`."""
+        limit = max(1, limit)
+        self.ensure_loaded(limit)
+        with self._lock:
+            served = self._served_to(thread_id)
+            unseen = [fact_id for fact_id in self._ids if fact_id not in served]
+            picks = random.sample(unseen, min(limit, len(unseen)))
+            if len(picks) < limit:
+                # Every fact has been served on this thread; start over with the ones not just picked
+                served.clear()
+                rest = [fact_id for fact_id in self._ids if fact_id not in picks]
+                picks += random.sample(rest, min(limit - len(picks), len(rest)))
+            served.update(picks)
+            unseen_left = len(self._ids) - len(served)
+            facts = [{"id": fact_id, "type": "fact", "attributes": {"body": self.facts[fact_id]}} for fact_id in picks]
+        if unseen_left < self.low_water and self._can_grow():
+            self._refill_in_background()
+        return facts
+
+    def _served_to(self, thread_id: Optional[str]) -> Set[str]:
+        if thread_id is None:
+            return set()
+        served = self._served.get(thread_id)
+        if served is None:
+            served = self._served[thread_id] = set()
+            if len(self._served) > self.max_threads:
+                self._served.popitem(last=False)
+        else:
+            self._served.move_to_end(thread_id)
+        return served
+
+    def forget(self, thread_id: str):
+        with self._lock:
+            self._served.pop(thread_id, None)
@@ -0,0 +1,163 @@
+import difflib
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from apis.dogapi_client import DogApiClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = float(os.getenv("DOG_INDEX_REFRESH_INTERVAL", "21600"))
+_FILLER_WORDS = {"dog", "dogs", "breed", "group", "the"}
+
+
+def normalize_name(name: str) -> str:
+    name = re.sub(r"[^a-z0-9 ]+", " ", name.lower())
+    return " ".join(name.split())
+
+
+def name_aliases(name: str) -> List[str]:
+    """Lookup keys for a breed or group name: the normalized name plus the name without filler words."""
+    normalized = normalize_name(name)
+    aliases = [normalized]
+    short = " ".join(word for word in normalized.split() if word not in _FILLER_WORDS)
+    if short and short != normalized:
+        aliases.append(short)
+    return aliases
+
+
+class DogBreedIndex:
+    """
+    In-process index of every breed and group from dogapi.dog.
+
+    The index is built by walking the paginated list endpoints once and is
+    refreshed in the background after refresh_interval seconds; lookups keep
+    serving the previous snapshot while a refresh runs.
+    """
+
+    def __init__(self, client: DogApiClient, refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+                 max_pages: int = 100):
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.max_pages = max_pages
+        self.breeds: Dict[str, Dict[str, Any]] = {}
+        self.groups: Dict[str, Dict[str, Any]] = {}
+        self._breed_aliases: Dict[str, List[str]] = {}
+        self._group_aliases: Dict[str, List[str]] = {}
+        self.loaded_at: Optional[float] = None
+        self._load_lock = threading.Lock()
+        self._refreshing = threading.Event()
+
+    def _fetch_all(self, list_page: Callable[[int], Dict[str, Any]]) -> List[Dict[str, Any]]:
+        resources = []
+        for page in range(1, self.max_pages + 1):
+            payload = list_page(page)
+            resources.extend(payload.get("data", []))
+            pagination = payload.get("meta", {}).get("pagination", {})
+            if not payload.get("data") or not pagination.get("next") or page >= pagination.get("last", page):
+                break
+        return resources
+
+    def refresh(self):
+        """Rebuild the index from the API and swap it in atomically."""
+        start = time.time()
+        breeds, groups = {}, {}
+        breed_aliases: Dict[str, List[str]] = {}
+        group_aliases: Dict[str, List[str]] = {}
+        for resource in self._fetch_all(self.client.list_groups):
+            attributes = resource.get("attributes", {})
+            breed_refs = resource.get("relationships", {}).get("breeds", {}).get("data", [])
+            groups[resource["id"]] = {
+                "id": resource["id"],
+                "name": attributes.get("name"),
+                "breed_ids": [ref["id"] for ref in breed_refs],
+            }
+            for alias in name_aliases(attributes.get("name") or ""):
+                group_aliases.setdefault(alias, []).append(resource["id"])
+        for resource in self._fetch_all(self.client.list_breeds):
+            attributes = resource.get("attributes", {})
+            group_ref = resource.get("relationships", {}).get("group", {}).get("data") or {}
+            breeds[resource["id"]] = {"id": resource["id"], **attributes, "group_id": group_ref.get("id")}
+            for alias in name_aliases(attributes.get("name") or ""):
+                breed_aliases.setdefault(alias, []).append(resource["id"])
+            group = groups.get(group_ref.get("id"))
+            if group is not None and resource["id"] not in group["breed_ids"]:
+                group["breed_ids"].append(resource["id"])
+        self.breeds, self.groups = breeds, groups
+        self._breed_aliases, self._group_aliases = breed_aliases, group_aliases
+        self.loaded_at = time.time()
+        logger.info("Dog index refreshed: %d breeds, %d groups in %.2fs", len(breeds), len(groups),
+                    self.loaded_at - start)
+
+    def _refresh_in_background(self):
+        if self._refreshing.is_set():
+            return
+        self._refreshing.set()
+
+        def run():
+            try:
+                with self._load_lock:
+                    self.refresh()
+            except Exception:
+                logger.exception("Dog index refresh failed")
+            finally:
+                self._refreshing.clear()
+
+        threading.Thread(target=run, name="dog-index-refresh", daemon=True).start()
+
+    def prefetch(self):
+        """Start loading the index without blocking the caller."""
+        if self.loaded_at is None:
+            self._refresh_in_background()
+
+    def ensure_loaded(self):
+        if self.loaded_at is None:
+            with self._load_lock:
+                if self.loaded_at is None:
+                    self.refresh()
+        elif time.time() - self.loaded_at > self.refresh_interval:
+            self._refresh_in_background()
+
+    def _match(self, query: str, aliases: Dict[str, List[str]], limit: int) -> List[str]:
+        query = normalize_name(query)
+        ids: List[str] = []
+        candidates = [query] + name_aliases(query)[1:]
+        for candidate in candidates:
+            ids.extend(aliases.get(candidate, []))
+        if not ids:
+            ids.extend(i for alias, matched in aliases.items() if query and query in alias for i in matched)
+        if not ids:
+            for alias in difflib.get_close_matches(query, list(aliases), n=limit, cutoff=0.6):
+                ids.extend(aliases[alias])
+        return list(dict.fromkeys(ids))[:limit]
+
+    def find_breeds(self, name: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """Return breeds whose name matches exactly, by alias, by substring or fuzzily, best first."""
+        self.ensure_loaded()
+        results = []
+        for breed_id in self._match(name, self._breed_aliases, limit):
+            breed = dict(self.breeds[breed_id])
+            group = self.groups.get(breed.get("group_id"))
+            breed["group"] = group["name"] if group else None
+            results.append(breed)
+        return results
+
+    def find_group(self, name: str) -> Optional[Dict[str, Any]]:
+        self.ensure_loaded()
+        matches = self._match(name, self._group_aliases, 1)
+        return self.groups[matches[0]] if matches else None
+
+    def breeds_in_group(self, group_name: str) -> Optional[Dict[str, Any]]:
+        """Return a group and the names and IDs of its breeds."""
+        group = self.find_group(group_name)
+        if group is None:
+            return None
+        breeds = [self.breeds[breed_id] for breed_id in group["breed_ids"] if breed_id in self.breeds]
+        return {
+            "id": group["id"],
+            "name": group["name"],
+            "breeds": [{"id": breed["id"], "name": breed.get("name")} for breed in breeds],
+        }
@@ -1,94 +1,280 @@
 import azure.functions as func
+from azurefunctions.extensions.http.fastapi import Request, StreamingResponse
+import asyncio
 import logging
-import json
 import os
+import threading
 import time
 from uuid import uuid4
-from agents.agent import DogChatAgent
-from utils.secrets import get_secret
+from agents.batch import BATCH_MAX_CONCURRENCY, BATCH_MAX_ITEMS, BatchJournal, jsonl_stream, normalize_items
+from agents.coordination import idempotency_key, resolve_thread_id
+from memory.memory_manager import HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE, etag_matches
+from utils.admission import AdmissionController, AdmissionRejected, rate_limit_key, release_after
+from utils.json_codec import dumps
+from utils.secret_provider import get_secret_provider
+from utils.sse import sse_stream
+from utils.structured_logging import configure_logging, request_log
+from utils.telemetry import span
 
-# Configure logging for Azure Functions
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Queue-backed JSON logging for local runs; the Functions host keeps its own handler
+configure_logging()
 
 # Create a logger for this module
 logger = logging.getLogger(__name__)
 
 app = func.FunctionApp(http_auth_level=func.AuthLevel.ANONYMOUS)
 
-# Initialize the agent once
-logger.info("Initializing DogChatAgent...")
-try:
-    dog_agent = DogChatAgent()
-    logger.info("DogChatAgent initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize DogChatAgent: {str(e)}")
-    raise
+# "lazy" (default) builds the agent on the first request or warmup; "eager" builds it at import
+AGENT_INIT = os.getenv("AGENT_INIT", "lazy").lower()
+
+_dog_agent = None
+_dog_agent_lock = threading.Lock()
+
+
+def get_agent():
+    """Build the DogChatAgent once per worker. Importing it pulls in langchain/langgraph (~1.5s)."""
+    global _dog_agent
+    if _dog_agent is None:
+        with _dog_agent_lock:
+            if _dog_agent is None:
+                logger.info("Initializing DogChatAgent...")
+                start_time = time.perf_counter()
+                try:
+                    from agents.agent import DogChatAgent
+                    _dog_agent = DogChatAgent()
+                except Exception as e:
+                    logger.error("Failed to initialize DogChatAgent: %s", e)
+                    raise
+                logger.info("DogChatAgent initialized in %.0f ms", (time.perf_counter() - start_time) * 1000)
+    return _dog_agent
+
+
+async def aget_agent():
+    # Build off the event loop so a cold start doesn't block other requests on this worker
+    return _dog_agent if _dog_agent is not None else await asyncio.to_thread(get_agent)
+
+
+# Fetch Key Vault secrets concurrently in the background while the rest of the worker starts
+SECRET_PREFETCH_TIMEOUT = float(os.getenv("SECRET_PREFETCH_TIMEOUT", "5"))
+get_secret_provider().prefetch(timeout=0)
+
+if AGENT_INIT == "eager":
+    get_agent()
+
+admission = AdmissionController()
+
+
+@app.function_name(name="WarmUp")
+@app.warm_up_trigger("warmup")
+def warm_up(warmup: func.warmup.WarmUpContext) -> None:
+    """Runs when the platform adds an instance: build the graph and open API connections before traffic."""
+    start_time = time.perf_counter()
+    get_secret_provider().prefetch(timeout=SECRET_PREFETCH_TIMEOUT)
+    get_agent().warm_up()
+    logger.info("Warmup completed in %.0f ms", (time.perf_counter() - start_time) * 1000)
+
 
 @app.function_name(name="Chat")
 @app.route(route="chat")
-def chat(req: func.HttpRequest) -> func.HttpResponse:
-    start_time = time.time()
+async def chat(req: func.HttpRequest) -> func.HttpResponse:
     request_id = str(uuid4())[:8]  # Short request ID for tracking
-    
-    logger.info(f"[{request_id}] Chat endpoint triggered - Method: {req.method}, URL: {req.url}")
-    
-    try:
-        # Get the request body
-        req_body = req.get_json()
+    with request_log("chat", logger, request_id=request_id, method=req.method) as log:
+        try:
+            # Get the request body
+            req_body = req.get_json()
+        except ValueError:
+            req_body = None
         if not req_body:
-            logger.warning(f"[{request_id}] Request body is missing or invalid")
+            log.warning("missing_body")
+            log.finish(400)
             return func.HttpResponse(
-                json.dumps({"error": "Request body is required"}),
+                dumps({"error": "Request body is required"}),
                 mimetype="application/json",
                 status_code=400
             )
-        
+
         message = req_body.get('content', 'Hi')
-        thread_id = req_body.get('thread_id') or str(uuid4())
-        
-        logger.info(f"[{request_id}] Processing message - Thread: {thread_id}, Message length: {len(message)}")
-        
-        # Use the DogChatAgent to process the message
-        agent_start_time = time.time()
-        response = dog_agent.invoke(message, thread_id)
-        agent_duration = time.time() - agent_start_time
-        
-        logger.info(f"[{request_id}] Agent processing completed in {agent_duration:.2f}s")
-        
+        key = idempotency_key(req.headers)
+        thread_id = resolve_thread_id(req_body.get('thread_id'), key)
+        log.set(thread_id=thread_id, message_chars=len(message))
+
+        try:
+            # Use the DogChatAgent to process the message
+            with log.timed("agent"):
+                async with admission.admit(rate_limit_key(req.headers, req_body.get('thread_id'))):
+                    with span("chat.request", name="Chat", request_id=request_id, thread_id=thread_id):
+                        dog_agent = await aget_agent()
+                        response = await dog_agent.ainvoke(message, thread_id, idempotency_key=key)
+        except AdmissionRejected as e:
+            log.warning(e.reason)
+            log.finish(e.status_code)
+            return func.HttpResponse(
+                dumps(e.to_dict()),
+                mimetype="application/json",
+                status_code=e.status_code,
+                headers={"Retry-After": e.retry_after_header}
+            )
+        except Exception as e:
+            log.error(e)
+            log.finish(500)
+            return func.HttpResponse(
+                dumps({
+                    "error": "Internal server error",
+                    "request_id": request_id
+                }),
+                mimetype="application/json",
+                status_code=500
+            )
+
         # Extract the content from the response
         if response and "messages" in response and response["messages"]:
             content = response["messages"][-1].content
-            logger.info(f"[{request_id}] Response generated - Content length: {len(content)}")
         else:
             content = "I'm sorry, I couldn't process your request."
-            logger.warning(f"[{request_id}] No valid response from agent, using fallback message")
-        
+            log.warning("empty_response")
+        log.set(response_chars=len(content))
+        log.finish(200)
+
         response_data = {
             "content": content,
             "thread_id": thread_id
         }
-        
-        total_duration = time.time() - start_time
-        logger.info(f"[{request_id}] Request completed successfully in {total_duration:.2f}s")
-        
         return func.HttpResponse(
-            json.dumps(response_data),
+            dumps(response_data),
             mimetype="application/json",
             status_code=200
         )
-        
-    except Exception as e:
-        total_duration = time.time() - start_time
-        logger.error(f"[{request_id}] Error processing chat request after {total_duration:.2f}s: {str(e)}", exc_info=True)
-        
+
+
+@app.function_name(name="ThreadMessages")
+@app.route(route="threads/{thread_id}/messages", methods=[func.HttpMethod.GET])
+async def thread_messages(req: func.HttpRequest) -> func.HttpResponse:
+    """A thread's messages, newest first; ?limit=&cursor=&include_tools=false, with ETag / If-None-Match."""
+    thread_id = req.route_params.get('thread_id')
+    cursor = req.params.get('cursor') or None
+    include_tools = req.params.get('include_tools', 'true').lower() not in ('false', '0', 'no')
+    try:
+        limit = int(req.params.get('limit') or HISTORY_PAGE_SIZE)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= HISTORY_MAX_PAGE_SIZE:
         return func.HttpResponse(
-            json.dumps({
-                "error": "Internal server error",
-                "request_id": request_id
-            }),
+            dumps({"error": f"limit must be between 1 and {HISTORY_MAX_PAGE_SIZE}"}),
             mimetype="application/json",
-            status_code=500
-        )
\ No newline at end of file
+            status_code=400
+        )
+
+    manager = (await aget_agent()).memory_manager(thread_id)
+    headers = {"Cache-Control": "private, no-cache"}
+    if_none_match = req.headers.get('if-none-match')
+    if if_none_match:
+        etag = manager.page_etag(await asyncio.to_thread(manager.checkpoint_id), limit, cursor, include_tools)
+        if etag_matches(if_none_match, etag):
+            return func.HttpResponse(status_code=304, headers={**headers, "ETag": etag})
+    try:
+        page = await manager.aget_page(limit, cursor, include_tools)
+    except ValueError as e:
+        return func.HttpResponse(dumps({"error": str(e)}), mimetype="application/json", status_code=400)
+    return func.HttpResponse(
+        dumps(page.to_dict()),
+        mimetype="application/json",
+        status_code=200,
+        headers={**headers, "ETag": page.etag}
+    )
+
+
+@app.function_name(name="ChatStream")
+@app.route(route="chat/stream", methods=[func.HttpMethod.POST])
+async def chat_stream(req: Request) -> StreamingResponse:
+    request_id = str(uuid4())[:8]
+    # Logged once the stream is set up; the agent's span records how long it ran
+    with request_log("chat_stream", logger, request_id=request_id) as log:
+        try:
+            req_body = await req.json()
+        except ValueError:
+            req_body = None
+        if not req_body:
+            log.warning("missing_body")
+            log.finish(400)
+            return StreamingResponse(
+                iter([dumps({"error": "Request body is required"})]),
+                media_type="application/json",
+                status_code=400
+            )
+
+        message = req_body.get('content', 'Hi')
+        key = idempotency_key(req.headers)
+        thread_id = resolve_thread_id(req_body.get('thread_id'), key)
+        log.set(thread_id=thread_id, message_chars=len(message))
+
+        try:
+            ticket = await admission.acquire(rate_limit_key(req.headers, req_body.get('thread_id')))
+        except AdmissionRejected as e:
+            log.warning(e.reason)
+            log.finish(e.status_code)
+            return StreamingResponse(
+                iter([dumps(e.to_dict())]),
+                media_type="application/json",
+                status_code=e.status_code,
+                headers={"Retry-After": e.retry_after_header}
+            )
+
+        try:
+            dog_agent = await aget_agent()
+        except BaseException:
+            ticket.release()
+            raise
+        log.finish(200)
+    return StreamingResponse(
+        release_after(ticket, sse_stream(dog_agent.astream_events(message, thread_id, idempotency_key=key))),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+@app.function_name(name="ChatBatch")
+@app.route(route="chat/batch", methods=[func.HttpMethod.POST])
+async def chat_batch(req: Request) -> StreamingResponse:
+    """Bulk chat: streams one JSON line per item as it finishes; resend the same batch_id to resume."""
+    request_id = str(uuid4())[:8]
+    try:
+        req_body = await req.json()
+    except ValueError:
+        req_body = None
+    items = (req_body or {}).get('items')
+    error = None
+    if not isinstance(items, list) or not items:
+        error = "Request body must contain a non-empty 'items' list"
+    elif len(items) > BATCH_MAX_ITEMS:
+        error = f"A batch can have at most {BATCH_MAX_ITEMS} items"
+    else:
+        try:
+            normalize_items(items)
+            concurrency = max(1, min(int(req_body.get('max_concurrency') or BATCH_MAX_CONCURRENCY), BATCH_MAX_CONCURRENCY))
+            if req_body.get('batch_id'):
+                BatchJournal(req_body['batch_id'])
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            error = f"Invalid batch: {e}"
+    if error:
+        logger.warning("[%s] %s", request_id, error)
+        return StreamingResponse(iter([dumps({"error": error})]), media_type="application/json", status_code=400)
+
+    logger.info("[%s] Batch chat - Items: %d, Batch: %s", request_id, len(items), req_body.get('batch_id'))
+    try:
+        ticket = await admission.acquire(rate_limit_key(req.headers))
+    except AdmissionRejected as e:
+        logger.warning("[%s] Batch rejected by admission control: %s", request_id, e.reason)
+        return StreamingResponse(
+            iter([dumps(e.to_dict())]),
+            media_type="application/json",
+            status_code=e.status_code,
+            headers={"Retry-After": e.retry_after_header}
+        )
+
+    try:
+        dog_agent = await aget_agent()
+    except BaseException:
+        ticket.release()
+        raise
+    results = dog_agent.abatch_as_completed(items, max_concurrency=concurrency, batch_id=req_body.get('batch_id'))
+    return StreamingResponse(release_after(ticket, jsonl_stream(results)), media_type="application/x-ndjson")
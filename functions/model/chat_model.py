@@ -1,11 +1,32 @@
+import threading
+from utils.secret_provider import get_secret_provider
 
-import os
-from utils.secrets import get_secret
-from langchain.chat_models import init_chat_model
+_chat_model = None
+_lock = threading.Lock()
 
-deepseek_api_key = os.getenv("DEEPSEEK_API_KEY")
-if not deepseek_api_key:
-    raise ValueError("DEEPSEEK_API_KEY not found in Key Vault or environment variables")
-print("DEEPSEEK_API_KEY loaded from environment variables")
 
-chat_model = init_chat_model("deepseek-chat", model_provider="deepseek")
\ No newline at end of file
+def get_chat_model():
+    """Build the chat model on first use; importing langchain and the provider SDK costs ~1s of cold start."""
+    global _chat_model
+    if _chat_model is None:
+        with _lock:
+            if _chat_model is None:
+                from model.router import create_chat_model, model_specs
+                specs = model_specs()
+                provider_kwargs = {}
+                if any(provider == "deepseek" for provider, _ in specs.values()):
+                    # The Key Vault value (prefetched at startup) wins over the app setting it falls back to
+                    deepseek_api_key = get_secret_provider().get("DEEPSEEK_API_KEY", None)
+                    if not deepseek_api_key:
+                        raise ValueError("DEEPSEEK_API_KEY not found in Key Vault or environment variables")
+                    provider_kwargs["deepseek"] = {"api_key": deepseek_api_key}
+                # Routes across providers when more than one is configured (see model/router.py)
+                _chat_model = create_chat_model(specs, provider_kwargs)
+    return _chat_model
+
+
+def __getattr__(name):
+    # Keep `from model.chat_model import chat_model` working
+    if name == "chat_model":
+        return get_chat_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
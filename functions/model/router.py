@@ -0,0 +1,339 @@
+"""
+Route chat model calls across providers.
+
+RoutedChatModel looks like a single chat model to the agent. Per call it picks
+an ordered list of providers from a route (by default "fast" for plain turns and
+"after_tools" once the turn has tool results), then:
+
+- fails over to the next provider on a timeout, 429, 5xx or connection error,
+- hedges: if the first provider hasn't answered within `hedge_after` seconds,
+  starts the next one too and takes whichever answers first (async calls only),
+- skips a provider for `cooldown` seconds after `failure_threshold` consecutive
+  failures, so one provider's brownout doesn't hold every request to its timeout.
+
+Latency per provider and outcome is observed into `llm_provider_latency_ms`, and
+failovers, hedges and circuit trips are counted in `llm_provider_events_total`.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage, BaseMessageChunk, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from utils.telemetry import metrics
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated name=provider:model entries, in default preference order
+CHAT_MODELS = os.getenv("CHAT_MODELS", "deepseek=deepseek:deepseek-chat")
+# Provider names per route; empty means every provider in CHAT_MODELS order
+CHAT_MODEL_ROUTE_FAST = os.getenv("CHAT_MODEL_ROUTE_FAST", "")
+CHAT_MODEL_ROUTE_AFTER_TOOLS = os.getenv("CHAT_MODEL_ROUTE_AFTER_TOOLS", "")
+CHAT_MODEL_TIMEOUT = float(os.getenv("CHAT_MODEL_TIMEOUT", "60"))
+CHAT_MODEL_HEDGE_AFTER = float(os.getenv("CHAT_MODEL_HEDGE_AFTER", "15"))
+CHAT_MODEL_FAILURE_THRESHOLD = int(os.getenv("CHAT_MODEL_FAILURE_THRESHOLD", "3"))
+CHAT_MODEL_COOLDOWN = float(os.getenv("CHAT_MODEL_COOLDOWN", "30"))
+
+provider_latency = metrics.histogram("llm_provider_latency_ms", "Chat model call latency by provider and outcome")
+provider_events = metrics.counter("llm_provider_events_total", "Chat model failovers, hedges and circuit trips")
+
+# Status codes worth trying another provider for; anything else (bad request, auth) fails the same everywhere
+FAILOVER_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+FAILOVER_ERROR_NAMES = ("Timeout", "RateLimit", "APIConnection", "ServiceUnavailable", "InternalServer", "Overloaded")
+
+
+def is_failover_error(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status in FAILOVER_STATUS
+    return any(name in type(error).__name__ for name in FAILOVER_ERROR_NAMES)
+
+
+def default_route(messages: Sequence[BaseMessage]) -> str:
+    """'after_tools' once the current turn has tool results to reason over, else 'fast'."""
+    for message in reversed(messages):
+        if isinstance(message, ToolMessage):
+            return "after_tools"
+        if isinstance(message, HumanMessage):
+            break
+    return "fast"
+
+
+def _as_chunk(message: BaseMessage) -> BaseMessageChunk:
+    """Providers without native streaming yield one whole message; re-wrap it as a chunk."""
+    if isinstance(message, BaseMessageChunk):
+        return message
+    return AIMessageChunk(
+        content=message.content, id=message.id, response_metadata=message.response_metadata,
+        additional_kwargs=message.additional_kwargs, usage_metadata=getattr(message, "usage_metadata", None),
+        tool_call_chunks=[{"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                          for index, call in enumerate(getattr(message, "tool_calls", None) or [])],
+    )
+
+
+class ProviderPool:
+    """Health and latency bookkeeping for each provider, shared by every bound copy of the router."""
+
+    def __init__(self, names: Sequence[str], failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {
+            name: {"calls": 0, "errors": 0, "consecutive_failures": 0, "open_until": 0.0, "ewma_ms": 0.0}
+            for name in names
+        }
+
+    def candidates(self, order: Sequence[str]) -> List[str]:
+        """`order` with tripped providers moved to the back (still tried if all else fails)."""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [name for name in order if self._stats[name]["open_until"] <= now]
+        return healthy + [name for name in order if name not in healthy]
+
+    def record(self, name: str, elapsed: float, error: Optional[BaseException] = None):
+        outcome = "ok" if error is None else ("timeout" if isinstance(error, (TimeoutError, asyncio.TimeoutError))
+                                             else "error")
+        provider_latency.observe(elapsed * 1000, provider=name, outcome=outcome)
+        with self._lock:
+            stats = self._stats[name]
+            stats["calls"] += 1
+            if error is None:
+                stats["consecutive_failures"] = 0
+                stats["ewma_ms"] = elapsed * 1000 if not stats["ewma_ms"] else \
+                    0.8 * stats["ewma_ms"] + 0.2 * elapsed * 1000
+                return
+            stats["errors"] += 1
+            if not is_failover_error(error):
+                return
+            stats["consecutive_failures"] += 1
+            tripped = stats["consecutive_failures"] >= self.failure_threshold
+            if tripped:
+                stats["open_until"] = time.monotonic() + self.cooldown
+                stats["consecutive_failures"] = 0
+        if tripped:
+            provider_events.inc(provider=name, event="circuit_open")
+            logger.warning("Chat provider %s failing; skipping it for %.0fs", name, self.cooldown)
+
+    def event(self, name: str, event: str):
+        provider_events.inc(provider=name, event=event)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {"calls": int(s["calls"]), "errors": int(s["errors"]), "ewma_ms": round(s["ewma_ms"], 1),
+                       "healthy": s["open_until"] <= now}
+                for name, s in self._stats.items()
+            }
+
+
+class RoutedChatModel(BaseChatModel):
+    """A chat model that routes each call to one of several providers; see the module docstring."""
+
+    providers: Dict[str, Any]  # name -> chat model (or its tool-bound runnable)
+    routes: Dict[str, List[str]]  # route name -> provider names in preference order
+    route: Callable[[Sequence[BaseMessage]], str] = default_route
+    timeout: float = 60.0
+    hedge_after: float = 0.0  # seconds; 0 disables hedging
+    pool: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        unknown = {name for order in self.routes.values() for name in order} - set(self.providers)
+        if unknown:
+            raise ValueError(f"Routes reference unknown providers: {sorted(unknown)}")
+        if self.pool is None:
+            self.pool = ProviderPool(list(self.providers))
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"providers": list(self.providers), "routes": self.routes}
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={
+            "providers": {name: model.bind_tools(tools, **kwargs) for name, model in self.providers.items()},
+        })
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return self.pool.stats()
+
+    def _candidates(self, messages: Sequence[BaseMessage]) -> List[str]:
+        route = self.route(messages)
+        order = self.routes.get(route) or self.routes.get("fast") or list(self.providers)
+        return self.pool.candidates(order)
+
+    @staticmethod
+    def _result(message: BaseMessage, name: str) -> ChatResult:
+        message.response_metadata = {**(message.response_metadata or {}), "provider": name}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    # Provider calls get no callbacks: the router's own run already reports the LLM call and its tokens
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        """Sync calls fail over in order; each provider's client enforces the timeout."""
+        error: Optional[BaseException] = None
+        for index, name in enumerate(self._candidates(messages)):
+            if index:
+                self.pool.event(name, "failover")
+            start = time.perf_counter()
+            try:
+                message = self.providers[name].invoke(messages, {"callbacks": []}, stop=stop, **kwargs)
+            except Exception as e:
+                self.pool.record(name, time.perf_counter() - start, e)
+                if not is_failover_error(e):
+                    raise
+                error = e
+                continue
+            self.pool.record(name, time.perf_counter() - start)
+            return self._result(message, name)
+        raise error
+
+    async def _acall(self, name: str, messages, stop, kwargs) -> BaseMessage:
+        start = time.perf_counter()
+        try:
+            message = await asyncio.wait_for(
+                self.providers[name].ainvoke(messages, {"callbacks": []}, stop=stop, **kwargs), self.timeout)
+        except asyncio.CancelledError:
+            raise  # lost a hedge race
+        except Exception as e:
+            self.pool.record(name, time.perf_counter() - start, e)
+            raise
+        self.pool.record(name, time.perf_counter() - start)
+        return message
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        remaining = self._candidates(messages)
+        pending: Dict[asyncio.Task, str] = {}
+        hedged = set()
+        error: Optional[BaseException] = None
+
+        def launch(event: Optional[str] = None):
+            name = remaining.pop(0)
+            if event:
+                self.pool.event(name, event)
+            if event == "hedge":
+                hedged.add(name)
+            pending[asyncio.ensure_future(self._acall(name, messages, stop, kwargs))] = name
+
+        launch()
+        try:
+            while pending:
+                hedge = self.hedge_after if self.hedge_after and remaining and len(pending) == 1 else None
+                done, _ = await asyncio.wait(pending, timeout=hedge, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch("hedge")
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        if name in hedged:
+                            self.pool.event(name, "hedge_win")
+                        return self._result(task.result(), name)
+                    if not is_failover_error(task.exception()):
+                        raise task.exception()
+                    error = task.exception()
+                if not pending and remaining:
+                    launch("failover")
+            raise error
+        finally:
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # finished alongside the winner; mark its error as handled
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        """Stream from the first provider that starts answering; fail over only before the first chunk."""
+        error: Optional[BaseException] = None
+        for index, name in enumerate(self._candidates(messages)):
+            if index:
+                self.pool.event(name, "failover")
+            start = time.perf_counter()
+            stream = self.providers[name].astream(messages, {"callbacks": []}, stop=stop, **kwargs).__aiter__()
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), self.timeout)
+            except StopAsyncIteration:
+                self.pool.record(name, time.perf_counter() - start)
+                return
+            except Exception as e:
+                self.pool.record(name, time.perf_counter() - start, e)
+                if not is_failover_error(e):
+                    raise
+                error = e
+                continue
+            yield ChatGenerationChunk(message=_as_chunk(first))
+            try:
+                async for chunk in stream:
+                    yield ChatGenerationChunk(message=_as_chunk(chunk))
+            except Exception as e:
+                self.pool.record(name, time.perf_counter() - start, e)
+                raise
+            self.pool.record(name, time.perf_counter() - start)
+            return
+        raise error
+
+
+def model_specs(models: str = CHAT_MODELS) -> Dict[str, Tuple[str, str]]:
+    """Parse CHAT_MODELS; Azure OpenAI is added as "azure" when its deployment is configured."""
+    specs: Dict[str, Tuple[str, str]] = {}
+    for entry in filter(None, (e.strip() for e in models.split(","))):
+        name, _, target = entry.partition("=")
+        provider, _, model = target.partition(":")
+        if not (name and provider and model):
+            raise ValueError(f"CHAT_MODELS entries look like name=provider:model, got {entry!r}")
+        specs[name.strip()] = (provider.strip(), model.strip())
+    deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+    if os.getenv("AZURE_OPENAI_ENDPOINT") and deployment and "azure" not in specs:
+        specs["azure"] = ("azure_openai", deployment)
+    return specs
+
+
+def build_provider(provider: str, model: str, **kwargs) -> BaseChatModel:
+    from langchain.chat_models import init_chat_model
+    if provider == "azure_openai":
+        kwargs.update(azure_deployment=model, azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
+                      api_version=os.environ["AZURE_OPENAI_API_VERSION"])
+    return init_chat_model(model, model_provider=provider, **kwargs)
+
+
+def _route_order(value: str, names: List[str]) -> List[str]:
+    return [name.strip() for name in value.split(",") if name.strip()] or names
+
+
+def create_chat_model(specs: Optional[Dict[str, Tuple[str, str]]] = None,
+                      provider_kwargs: Optional[Dict[str, Dict[str, Any]]] = None) -> BaseChatModel:
+    """
+    The configured chat model: the provider itself when only one is configured, else a RoutedChatModel.
+    `provider_kwargs` adds constructor arguments per provider (e.g. {"deepseek": {"api_key": ...}}).
+    """
+    specs = model_specs() if specs is None else specs
+    provider_kwargs = provider_kwargs or {}
+    if len(specs) == 1:
+        provider, model = next(iter(specs.values()))
+        return build_provider(provider, model, **provider_kwargs.get(provider, {}))
+    # Fail fast inside each provider so the router can move on instead of the SDK retrying
+    providers = {name: build_provider(provider, model, timeout=CHAT_MODEL_TIMEOUT, max_retries=1,
+                                      **provider_kwargs.get(provider, {}))
+                 for name, (provider, model) in specs.items()}
+    names = list(providers)
+    return RoutedChatModel(
+        providers=providers,
+        routes={"fast": _route_order(CHAT_MODEL_ROUTE_FAST, names),
+                "after_tools": _route_order(CHAT_MODEL_ROUTE_AFTER_TOOLS, names)},
+        timeout=CHAT_MODEL_TIMEOUT,
+        hedge_after=CHAT_MODEL_HEDGE_AFTER,
+        pool=ProviderPool(names, CHAT_MODEL_FAILURE_THRESHOLD, CHAT_MODEL_COOLDOWN),
+    )
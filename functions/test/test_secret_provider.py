@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from utils.secret_provider import FakeVault, SecretProvider
+
+NAMES = ["DEEPSEEK_API_KEY", "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET"]
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_prefetch_fetches_declared_secrets_concurrently():
+    vault = FakeVault({"deepseek-api-key": "ds", "google-client-id": "gid", "google-client-secret": "gs"},
+                      latency=0.2)
+    provider = SecretProvider(vault.get_secret, NAMES)
+    start = time.time()
+    assert provider.prefetch() == 3
+    assert time.time() - start < 0.45
+    assert sorted(vault.fetches) == ["deepseek-api-key", "google-client-id", "google-client-secret"]
+    assert provider.get("DEEPSEEK_API_KEY") == "ds"
+    assert len(vault.fetches) == 3  # reads come from the cache
+    provider.close()
+
+
+def test_refresh_before_expiry_and_keep_stale_value_on_failure():
+    vault = FakeVault({"deepseek-api-key": "v1"})
+    clock = Clock()
+    provider = SecretProvider(vault.get_secret, ["DEEPSEEK_API_KEY"], ttl=100, refresh_before=10, clock=clock)
+    provider.prefetch()
+    vault.secrets["deepseek-api-key"] = "v2"
+    clock.now += 80
+    assert provider.refresh_due() == 0
+    clock.now += 11
+    assert provider.refresh_due() == 1
+    assert wait_for(lambda: provider.get("DEEPSEEK_API_KEY") == "v2")
+
+    del vault.secrets["deepseek-api-key"]
+    clock.now += 91
+    provider.refresh_due()
+    assert wait_for(lambda: "DEEPSEEK_API_KEY" in provider._retry_at)
+    assert provider.get("DEEPSEEK_API_KEY") == "v2"
+    provider.close()
+
+
+def test_uncached_secrets_fall_back_to_the_environment(monkeypatch):
+    monkeypatch.setenv("OTHER_SECRET", "from-env")
+    monkeypatch.delenv("MISSING_SECRET", raising=False)
+    vault = FakeVault({"other-secret": "from-vault"})
+    provider = SecretProvider(vault.get_secret)
+    assert provider.get("OTHER_SECRET") == "from-env"
+    assert wait_for(lambda: provider.get("OTHER_SECRET") == "from-vault")
+    assert provider.get("MISSING_SECRET", None) is None
+    assert provider.get("MISSING_SECRET", "fallback") == "fallback"
+    with pytest.raises(ValueError):
+        provider.get("MISSING_SECRET")
+    assert SecretProvider().get("OTHER_SECRET") == "from-env"
+    provider.close()
@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(os.getenv("TOOL_OUTPUT_MAX_BYTES", "4000"))
+DEFAULT_MAX_ITEMS = int(os.getenv("TOOL_OUTPUT_MAX_ITEMS", "20"))
+DESCRIPTION_MAX_CHARS = int(os.getenv("TOOL_OUTPUT_DESCRIPTION_CHARS", "400"))
+
+
+def payload_size(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode())
+
+
+def flatten_resource(resource: Dict[str, Any]) -> Dict[str, Any]:
+    """Collapse a JSON:API resource into {id, **attributes, <relation>_id(s)}."""
+    flat = {"id": resource.get("id"), **resource.get("attributes", {})}
+    for name, relation in resource.get("relationships", {}).items():
+        data = relation.get("data")
+        if isinstance(data, list):
+            flat[f"{name.rstrip('s')}_ids"] = [ref.get("id") for ref in data]
+        elif isinstance(data, dict):
+            flat[f"{name}_id"] = data.get("id")
+    return flat
+
+
+def _range(value: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not value:
+        return None
+    low, high = value.get("min"), value.get("max")
+    return f"{low}-{high}" if low != high else str(low)
+
+
+def _shorten(text: Optional[str], limit: int = DESCRIPTION_MAX_CHARS) -> Optional[str]:
+    if not text or len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def compact_breed(breed: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the breed fields the model answers from; ranges become 'min-max' strings."""
+    compact = {
+        "id": breed.get("id"),
+        "name": breed.get("name"),
+        "description": _shorten(breed.get("description")),
+        "life_years": _range(breed.get("life")),
+        "male_weight_kg": _range(breed.get("male_weight")),
+        "female_weight_kg": _range(breed.get("female_weight")),
+        "hypoallergenic": breed.get("hypoallergenic"),
+        "group": breed.get("group"),
+        "group_id": breed.get("group_id"),
+    }
+    return {key: value for key, value in compact.items() if value is not None}
+
+
+def compact_breed_summary(breed: Dict[str, Any]) -> Dict[str, Any]:
+    return {"id": breed.get("id"), "name": breed.get("name")}
+
+
+def compact_group(group: Dict[str, Any]) -> Dict[str, Any]:
+    breed_ids = group.get("breed_ids") or []
+    compact = {"id": group.get("id"), "name": group.get("name"), "breed_count": len(breed_ids)}
+    if breed_ids:
+        compact["breed_ids"] = breed_ids[:DEFAULT_MAX_ITEMS]
+    return compact
+
+
+def compact_group_summary(group: Dict[str, Any]) -> Dict[str, Any]:
+    return {"id": group.get("id"), "name": group.get("name"), "breed_count": len(group.get("breed_ids") or [])}
+
+
+def compact_fact(fact: Dict[str, Any]) -> str:
+    return fact.get("body", "")
+
+
+def project_resource(payload: Dict[str, Any], project: Callable[[Dict[str, Any]], Any]) -> Any:
+    return project(flatten_resource(payload.get("data") or {}))
+
+
+def project_page(payload: Dict[str, Any], project: Callable[[Dict[str, Any]], Any],
+                 max_items: int = DEFAULT_MAX_ITEMS) -> Dict[str, Any]:
+    """Flatten a JSON:API list response into {items, page, next_page, total}."""
+    items = [project(flatten_resource(resource)) for resource in payload.get("data", [])]
+    pagination = payload.get("meta", {}).get("pagination", {})
+    page = {"items": items[:max_items]}
+    if len(items) > max_items:
+        page["more_available"] = f"{len(items) - max_items} more items on this page were omitted."
+    for key, source in (("page", "current"), ("next_page", "next"), ("total", "records")):
+        if pagination.get(source) is not None:
+            page[key] = pagination[source]
+    return page
+
+
+def fit_budget(result: Any, max_bytes: int = DEFAULT_MAX_BYTES) -> Any:
+    """Drop trailing list items until the result fits max_bytes, leaving a 'more available' hint."""
+    if payload_size(result) <= max_bytes:
+        return result
+    if isinstance(result, dict) and isinstance(result.get("items"), list):
+        result = dict(result)
+        items: List[Any] = list(result["items"])
+        dropped = 0
+        while items and payload_size({**result, "items": items}) > max_bytes:
+            items.pop()
+            dropped += 1
+        result["items"] = items
+        hint = f"{dropped} more items omitted to save space."
+        if result.get("next_page"):
+            hint += f" More results are on page {result['next_page']}."
+        result["more_available"] = hint
+        return result
+    text = json.dumps(result, ensure_ascii=False)
+    return {"truncated": text[:max_bytes], "more_available": "Output truncated to save space."}
+
+
+class ProjectionStats:
+    """Running per-tool totals of raw vs projected bytes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tools: Dict[str, Dict[str, int]] = {}
+
+    def record(self, tool_name: str, raw_bytes: int, projected_bytes: int):
+        with self._lock:
+            totals = self.tools.setdefault(tool_name, {"calls": 0, "raw_bytes": 0, "projected_bytes": 0})
+            totals["calls"] += 1
+            totals["raw_bytes"] += raw_bytes
+            totals["projected_bytes"] += projected_bytes
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                name: {**totals, "saved_bytes": totals["raw_bytes"] - totals["projected_bytes"]}
+                for name, totals in self.tools.items()
+            }
+
+
+projection_stats = ProjectionStats()
+
+
+def compact_output(tool_name: str, raw: Any, project: Callable[[Any], Any],
+                   max_bytes: int = DEFAULT_MAX_BYTES) -> Any:
+    """Project a raw tool payload, enforce the byte budget and record the bytes saved."""
+    result = fit_budget(project(raw), max_bytes)
+    raw_bytes, projected_bytes = payload_size(raw), payload_size(result)
+    projection_stats.record(tool_name, raw_bytes, projected_bytes)
+    logger.debug("Tool %s output %d -> %d bytes (saved %d)", tool_name, raw_bytes, projected_bytes,
+                 raw_bytes - projected_bytes)
+    return result
@@ -0,0 +1,94 @@
+"""
+Registry of the agent's tools.
+
+Every `tools/<name>_tools.py` module lists its LangChain tools in a `TOOLS`
+sequence; the registry imports those modules on first use and groups their tools
+into a toolset named after the module (`dogapi_tools` -> "dogapi"). Tool modules
+build their API clients on first call, so discovering them is cheap, and clients
+for one base URL share a pooled HTTP session (see utils.webclient).
+
+ENABLED_TOOLS picks what a deployment binds to the model: a comma-separated list
+of toolset and tool names, or "all". Every enabled tool's schema is sent on each
+model call, so enabling fewer tools means fewer prompt tokens.
+"""
+
+import importlib
+import logging
+import os
+import pkgutil
+import threading
+from typing import Dict, Iterable, List, Optional, Union
+
+from langchain_core.tools import BaseTool
+
+logger = logging.getLogger(__name__)
+
+ENABLED_TOOLS = os.getenv("ENABLED_TOOLS", "dogapi")
+TOOL_MODULE_SUFFIX = "_tools"
+
+
+class ToolRegistry:
+    def __init__(self, package: str = __package__, path: Optional[str] = None):
+        self.package = package
+        self.path = path or os.path.dirname(os.path.abspath(__file__))
+        self._toolsets: Optional[Dict[str, List[BaseTool]]] = None
+        self._lock = threading.Lock()
+
+    def toolsets(self) -> Dict[str, List[BaseTool]]:
+        """Toolset name -> tools, in module order; modules are imported on the first call."""
+        if self._toolsets is None:
+            with self._lock:
+                if self._toolsets is None:
+                    self._toolsets = self._discover()
+        return self._toolsets
+
+    def _discover(self) -> Dict[str, List[BaseTool]]:
+        toolsets: Dict[str, List[BaseTool]] = {}
+        seen: Dict[str, str] = {}
+        for module_info in sorted(pkgutil.iter_modules([self.path]), key=lambda m: m.name):
+            if not module_info.name.endswith(TOOL_MODULE_SUFFIX):
+                continue
+            module = importlib.import_module(f"{self.package}.{module_info.name}")
+            tools = list(getattr(module, "TOOLS", ()))
+            if not tools:
+                logger.warning("Tool module %s defines no TOOLS", module.__name__)
+                continue
+            toolset = module_info.name[:-len(TOOL_MODULE_SUFFIX)]
+            for tool in tools:
+                if tool.name in seen:
+                    raise ValueError(f"Tool '{tool.name}' is defined by both {seen[tool.name]} and {toolset}")
+                seen[tool.name] = toolset
+            toolsets[toolset] = tools
+        return toolsets
+
+    def tools(self) -> Dict[str, BaseTool]:
+        return {tool.name: tool for tools in self.toolsets().values() for tool in tools}
+
+    def select(self, spec: Union[str, Iterable[str], None] = None) -> List[BaseTool]:
+        """
+        Tools for a comma-separated string (or list) of toolset and tool names, in the
+        order given and without duplicates; "all" or "*" selects every tool.
+        """
+        names = spec.split(",") if isinstance(spec, str) else list(spec if spec is not None else [ENABLED_TOOLS])
+        names = [name.strip() for name in names if name and name.strip()]
+        toolsets, tools = self.toolsets(), self.tools()
+        selected: Dict[str, BaseTool] = {}
+        for name in names:
+            if name in ("all", "*"):
+                matches = list(tools.values())
+            elif name in toolsets:
+                matches = toolsets[name]
+            elif name in tools:
+                matches = [tools[name]]
+            else:
+                raise ValueError(f"Unknown tool or toolset '{name}'; available: {', '.join([*toolsets, *tools])}")
+            for tool in matches:
+                selected.setdefault(tool.name, tool)
+        return list(selected.values())
+
+
+_registry = ToolRegistry()
+
+
+def get_tool_registry() -> ToolRegistry:
+    return _registry
@@ -0,0 +1,105 @@
+import asyncio
+import random
+import weakref
+import httpx
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+from utils.response_cache import ResponseCache
+from utils.telemetry import span, http_requests, http_response_bytes
+from utils.webclient import (
+    DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, DEFAULT_POOL_SIZE, DEFAULT_MAX_RETRIES,
+    DEFAULT_BACKOFF_FACTOR, DEFAULT_BACKOFF_JITTER, RETRY_STATUSES,
+)
+
+MAX_RETRY_AFTER = 30.0
+
+# httpx.AsyncClient connections are bound to the loop that opened them, so pools are kept per event loop
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, int], httpx.AsyncClient]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def get_async_client(base_url: str, pool_size: int = DEFAULT_POOL_SIZE) -> httpx.AsyncClient:
+    """Return the shared pooled AsyncClient for a base URL on the running event loop."""
+    loop = asyncio.get_running_loop()
+    clients = _clients.setdefault(loop, {})
+    key = (base_url, pool_size)
+    client = clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        clients[key] = client
+    return client
+
+
+async def close_async_clients():
+    """Close the pooled clients opened on the running event loop."""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+class AsyncWebClient:
+    def __init__(self, base_url: str, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT, pool_size: int = DEFAULT_POOL_SIZE,
+                 max_retries: int = DEFAULT_MAX_RETRIES, backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+                 cache: Optional[ResponseCache] = None):
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_RETRY_AFTER)
+        return self.backoff_factor * (2 ** attempt) + random.uniform(0, DEFAULT_BACKOFF_JITTER)
+
+    async def request(self, endpoint: str, method: str = 'GET', params: Optional[Dict[str, Any]] = None,
+                      body: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        method = method.upper()
+        retries = self.max_retries if method in ("GET", "HEAD", "OPTIONS") else 0
+        client = get_async_client(self.base_url, self.pool_size)
+        host = urlsplit(self.base_url).netloc
+        with span("http.request", name=host, method=method, url=url) as request_span:
+            for attempt in range(retries + 1):
+                response = None
+                try:
+                    response = await client.request(method, url, params=params, json=body, headers=headers,
+                                                     timeout=self.timeout)
+                    if response.status_code not in RETRY_STATUSES or attempt == retries:
+                        break
+                except httpx.TransportError:
+                    if attempt == retries:
+                        http_requests.inc(host=host, status="error")
+                        raise
+                await asyncio.sleep(self._backoff(attempt, response))
+            size = len(response.content)
+            request_span.set_attributes({"status": response.status_code, "bytes": size, "retries": attempt})
+            http_requests.inc(host=host, status=response.status_code)
+            http_response_bytes.observe(size, host=host)
+            if response.is_error:
+                response.raise_for_status()
+        return response
+
+    async def get_json(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Async counterpart of WebClient.get_json sharing the same cache semantics."""
+        if self.cache is None or self.cache.ttl_for(endpoint) <= 0:
+            return (await self.request(endpoint, method="GET", params=params)).json()
+        key = self.cache.make_key(endpoint, params)
+        entry, fresh = self.cache.lookup(key)
+        if fresh:
+            return entry.value
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+        response = await self.request(endpoint, method="GET", params=params, headers=headers)
+        if response.status_code == 304:
+            value = self.cache.refresh(key, endpoint)
+            if value is not None:
+                return value
+            response = await self.request(endpoint, method="GET", params=params)
+        value = response.json()
+        self.cache.store(key, endpoint, value, etag=response.headers.get("ETag"))
+        return value
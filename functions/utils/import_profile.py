@@ -0,0 +1,114 @@
+"""
+Import-time profile of a module, to track cold start in milliseconds across releases.
+
+    python -m utils.import_profile function_app --repeat 3 --json > import-profile.json
+
+Each run imports the module in a fresh interpreter with `-X importtime`, so the
+numbers match what a new worker pays. Run it from the app/ or functions/ folder.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$")
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` output into [{"module", "self_ms", "cumulative_ms", "depth"}] in import order."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append({
+                "module": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": (len(indent) - 1) // 2,
+            })
+    return rows
+
+
+def summarize(rows: List[Dict[str, Any]], module: str, top: int = 15) -> Dict[str, Any]:
+    """Total for `module`, its slowest direct imports, and self time per top-level package."""
+    # importtime prints children before their parent, so the subtree is the run of rows above the target
+    index = next((i for i, r in enumerate(rows) if r["module"] == module and r["depth"] == 0), None)
+    subtree = []
+    if index is not None:
+        start = index
+        while start > 0 and rows[start - 1]["depth"] > 0:
+            start -= 1
+        subtree = rows[start:index + 1]
+    direct = [r for r in subtree if r["depth"] == 1]
+    packages: Dict[str, float] = defaultdict(float)
+    for row in subtree:
+        packages[row["module"].split(".")[0]] += row["self_ms"]
+    return {
+        "module": module,
+        "total_ms": round(rows[index]["cumulative_ms"], 1) if index is not None else None,
+        "direct_imports": [
+            {"module": r["module"], "cumulative_ms": round(r["cumulative_ms"], 1)}
+            for r in sorted(direct, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+        ],
+        "packages": [
+            {"package": name, "self_ms": round(ms, 1)}
+            for name, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+    }
+
+
+def profile_imports(module: str, top: int = 15, repeat: int = 1, env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Import `module` in `repeat` fresh interpreters and report the median run."""
+    runs = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, env={**os.environ, **(env or {})},
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+        report = summarize(parse_importtime(result.stderr), module, top)
+        report["wall_ms"] = round(wall_ms, 1)
+        runs.append(report)
+    runs.sort(key=lambda r: r["total_ms"] or 0)
+    report = runs[len(runs) // 2]
+    report["runs_total_ms"] = [r["total_ms"] for r in runs]
+    if len(runs) > 1:
+        report["stdev_ms"] = round(statistics.stdev(r["total_ms"] or 0 for r in runs), 1)
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Report import time of a module in milliseconds.")
+    parser.add_argument("module", nargs="?", default="function_app")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = profile_imports(args.module, top=args.top, repeat=args.repeat)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{report['module']}: {report['total_ms']} ms import, {report['wall_ms']} ms wall "
+          f"(runs: {report['runs_total_ms']})")
+    print("\nSlowest direct imports:")
+    for row in report["direct_imports"]:
+        print(f"  {row['cumulative_ms']:>9.1f} ms  {row['module']}")
+    print("\nSelf time by package:")
+    for row in report["packages"]:
+        print(f"  {row['self_ms']:>9.1f} ms  {row['package']}")
+
+
+if __name__ == "__main__":
+    main()
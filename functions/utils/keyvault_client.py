@@ -5,6 +5,7 @@ This is useful when you need to dynamically fetch secrets at runtime.
 
 import os
 import logging
+import threading
 from azure.keyvault.secrets import SecretClient
 from azure.identity import DefaultAzureCredential
 
@@ -51,17 +52,21 @@ class KeyVaultClient:
 
 # Global instance (initialize once)
 _keyvault_client = None
+_keyvault_client_lock = threading.Lock()
 
 def get_keyvault_client() -> KeyVaultClient:
-    """Get a singleton KeyVault client instance."""
+    """Get a singleton KeyVault client instance (secrets are prefetched from several threads)."""
     global _keyvault_client
     if _keyvault_client is None:
-        _keyvault_client = KeyVaultClient()
+        with _keyvault_client_lock:
+            if _keyvault_client is None:
+                _keyvault_client = KeyVaultClient()
     return _keyvault_client
 
 def get_secret_from_keyvault(secret_name: str) -> str:
     """
-    Convenience function to get a secret from Key Vault.
+    Convenience function to get a secret from Key Vault. This is a network round trip on
+    every call; request handlers should read secrets through utils.secret_provider instead.
     
     Args:
         secret_name: The name of the secret in Key Vault
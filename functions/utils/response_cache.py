@@ -0,0 +1,139 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class CacheEntry:
+    __slots__ = ("value", "etag", "expires_at")
+
+    def __init__(self, value: Any, etag: Optional[str], expires_at: float):
+        self.value = value
+        self.etag = etag
+        self.expires_at = expires_at
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of decoded JSON responses keyed by (endpoint, params).
+
+    TTLs are looked up by endpoint prefix, longest match first; a TTL of 0
+    means the endpoint is never cached. Expired entries are kept so they can
+    be revalidated with If-None-Match when the upstream sent an ETag.
+    When persist_path is set, entries are also written to a SQLite file so a
+    warm cache survives process restarts.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 0,
+                 max_entries: int = 512, persist_path: Optional[str] = None):
+        self.ttls = sorted((ttls or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._db = None
+        if persist_path:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, etag TEXT, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._load()
+
+    @staticmethod
+    def make_key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> str:
+        items = sorted((k, str(v)) for k, v in (params or {}).items() if v is not None)
+        return json.dumps([endpoint.strip('/'), items], separators=(",", ":"))
+
+    def ttl_for(self, endpoint: str) -> float:
+        endpoint = endpoint.strip('/')
+        for prefix, ttl in self.ttls:
+            if endpoint.startswith(prefix):
+                return ttl
+        return self.default_ttl
+
+    def lookup(self, key: str) -> Tuple[Optional[CacheEntry], bool]:
+        """Return (entry, fresh). A stale entry is returned so its ETag can be revalidated."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            if entry.is_fresh():
+                self.hits += 1
+                return entry, True
+            self.misses += 1
+            return entry, False
+
+    def store(self, key: str, endpoint: str, value: Any, etag: Optional[str] = None):
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0:
+            return
+        entry = CacheEntry(value, etag, time.time() + ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                self._delete_persisted(evicted)
+            self._persist(key, entry)
+
+    def refresh(self, key: str, endpoint: str) -> Optional[Any]:
+        """Extend a stale entry after a 304 Not Modified and return its value."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.expires_at = time.time() + self.ttl_for(endpoint)
+            self.revalidations += 1
+            self._persist(key, entry)
+            return entry.value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }
+
+    def _load(self):
+        rows = self._db.execute(
+            "SELECT key, value, etag, expires_at FROM responses ORDER BY expires_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for key, value, etag, expires_at in reversed(rows):
+            self._entries[key] = CacheEntry(json.loads(value), etag, expires_at)
+
+    def _persist(self, key: str, entry: CacheEntry):
+        if self._db is None:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (key, value, etag, expires_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(entry.value), entry.etag, entry.expires_at),
+        )
+        self._db.commit()
+
+    def _delete_persisted(self, key: str):
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
@@ -0,0 +1,204 @@
+"""
+In-memory secret cache in front of Key Vault.
+
+SecretProvider fetches a declared set of secrets (PREFETCH_SECRETS) concurrently
+when the worker starts, keeps them for SECRET_CACHE_TTL seconds and refreshes
+each one on a background thread SECRET_REFRESH_BEFORE seconds before it expires.
+get() only reads the cache: a secret that is not cached yet (or could not be
+fetched) comes from the environment via utils.secrets, and is fetched in the
+background for later calls, so request handlers never wait on the vault.
+
+App settings name secrets DEEPSEEK_API_KEY; the vault names them deepseek-api-key.
+Without KEYVAULT_NAME (local runs) only the environment is used. FakeVault stands
+in for Key Vault in tests and local experiments.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.secrets import get_secret
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_SECRETS = os.getenv("PREFETCH_SECRETS", "DEEPSEEK_API_KEY,GOOGLE_CLIENT_ID,GOOGLE_CLIENT_SECRET")
+SECRET_CACHE_TTL = float(os.getenv("SECRET_CACHE_TTL", "3600"))
+SECRET_REFRESH_BEFORE = float(os.getenv("SECRET_REFRESH_BEFORE", "300"))
+SECRET_FETCH_WORKERS = 4
+# After a failed fetch, try again this much later rather than on every refresh tick
+RETRY_AFTER_FAILURE = 30.0
+
+_MISSING = object()
+
+
+def vault_secret_name(name: str) -> str:
+    """DEEPSEEK_API_KEY -> deepseek-api-key (Key Vault names can't contain underscores)."""
+    return name.lower().replace("_", "-")
+
+
+class FakeVault:
+    """Dict-backed stand-in for KeyVaultClient that counts fetches and can be slow or fail."""
+
+    def __init__(self, secrets: Optional[Dict[str, str]] = None, latency: float = 0.0):
+        self.secrets = dict(secrets or {})
+        self.latency = latency
+        self.fetches: List[str] = []
+        self._lock = threading.Lock()
+
+    def get_secret(self, secret_name: str) -> str:
+        with self._lock:
+            self.fetches.append(secret_name)
+        if self.latency:
+            time.sleep(self.latency)
+        if secret_name not in self.secrets:
+            raise KeyError(f"Secret '{secret_name}' not found in vault")
+        return self.secrets[secret_name]
+
+
+class SecretProvider:
+    def __init__(self, fetch: Optional[Callable[[str], str]] = None, names: Iterable[str] = (),
+                 ttl: float = SECRET_CACHE_TTL, refresh_before: float = SECRET_REFRESH_BEFORE,
+                 clock: Callable[[], float] = time.time):
+        """
+        `fetch` reads one secret by its vault name (e.g. KeyVaultClient().get_secret);
+        without one the provider only reads the environment.
+        """
+        self.fetch = fetch
+        self.names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+        self.ttl = ttl
+        self.refresh_before = min(refresh_before, ttl / 2)
+        self.clock = clock
+        # name -> (value, fetched_at, next_refresh_at)
+        self._entries: Dict[str, Tuple[str, float, float]] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._refresher: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(max_workers=SECRET_FETCH_WORKERS, thread_name_prefix="secrets")
+
+    # -- reads --------------------------------------------------------------
+
+    def get(self, name: str, default=_MISSING) -> str:
+        """The cached vault value, else the environment value (or `default`); never calls the vault."""
+        entry = self._entries.get(name)
+        if entry is not None:
+            return entry[0]
+        if self.fetch is not None:
+            with self._lock:
+                if name not in self.names:
+                    self.names.append(name)
+            self._submit([name])
+        if default is _MISSING:
+            return get_secret(name)  # raises ValueError when the app setting is missing too
+        return os.getenv(name, default)
+
+    def cached(self) -> List[str]:
+        return list(self._entries)
+
+    # -- fetching -----------------------------------------------------------
+
+    def prefetch(self, timeout: Optional[float] = None) -> int:
+        """
+        Fetch every declared secret concurrently and start the background refresher.
+        Waits up to `timeout` seconds (0 to not wait, None for no limit); returns how many are cached.
+        """
+        if self.fetch is None:
+            return 0
+        futures = self._submit([name for name in self.names if name not in self._entries])
+        self._start_refresher()
+        if timeout != 0 and futures:
+            wait(futures, timeout=timeout)
+        return len(self._entries)
+
+    def _submit(self, names: Iterable[str]) -> List[Future]:
+        """Start a fetch for each name that has none running; returns the futures of all of them."""
+        futures = []
+        with self._lock:
+            if self._stopped:
+                return futures
+            for name in names:
+                future = self._in_flight.get(name)
+                if future is None:
+                    future = self._in_flight[name] = self._executor.submit(self._refresh, name)
+                futures.append(future)
+        return futures
+
+    def _refresh(self, name: str):
+        start = self.clock()
+        try:
+            value = self.fetch(vault_secret_name(name))
+        except Exception as e:
+            # Keep serving the cached (or environment) value and retry later
+            logger.warning("Fetching secret '%s' failed: %s", name, e)
+            with self._lock:
+                self._retry_at[name] = self.clock() + RETRY_AFTER_FAILURE
+                self._in_flight.pop(name, None)
+            return
+        now = self.clock()
+        with self._lock:
+            self._entries[name] = (value, now, now + self.ttl - self.refresh_before)
+            self._retry_at.pop(name, None)
+            self._in_flight.pop(name, None)
+        logger.info("Secret '%s' fetched in %.0f ms", name, (now - start) * 1000)
+        self._wake.set()
+
+    def refresh_due(self) -> int:
+        """Start background refreshes for secrets close to expiry, missing or due a retry; returns how many."""
+        now = self.clock()
+        due = []
+        with self._lock:
+            for name in self.names:
+                retry_at = self._retry_at.get(name)
+                if retry_at is not None:
+                    if retry_at <= now:
+                        due.append(name)
+                elif name not in self._entries or self._entries[name][2] <= now:
+                    due.append(name)
+        return len(self._submit(due))
+
+    def _next_due(self) -> float:
+        with self._lock:
+            deadlines = [entry[2] for entry in self._entries.values()] + list(self._retry_at.values())
+        return min(deadlines, default=self.clock() + self.ttl)
+
+    def _start_refresher(self):
+        with self._lock:
+            if self._refresher is not None or self._stopped:
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="secret-refresher", daemon=True)
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stopped:
+            self._wake.wait(timeout=max(1.0, self._next_due() - self.clock()))
+            self._wake.clear()
+            if not self._stopped:
+                self.refresh_due()
+
+    def close(self):
+        self._stopped = True
+        self._wake.set()
+        self._executor.shutdown(wait=False)
+
+
+_provider: Optional[SecretProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_secret_provider() -> SecretProvider:
+    """The worker's provider, backed by Key Vault when KEYVAULT_NAME is set."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                fetch = None
+                if os.getenv("KEYVAULT_NAME"):
+                    from utils.keyvault_client import get_keyvault_client
+                    fetch = lambda secret_name: get_keyvault_client().get_secret(secret_name)
+                _provider = SecretProvider(fetch, PREFETCH_SECRETS.split(","))
+    return _provider
@@ -0,0 +1,311 @@
+"""
+Request tracing and in-process metrics for the agent hot path.
+
+Spans are nested through a context variable, so a span opened inside a request
+(LLM call, tool call, HTTP request, checkpoint read/write) becomes a child of it
+across threads and asyncio tasks that copy the context. Finished spans are:
+
+- observed into the `span_duration_ms` histogram (labels: span, name),
+- mirrored to OpenTelemetry when `opentelemetry-api` is installed and
+  TELEMETRY_OTEL is not "false" (configure the SDK/exporter as usual), and
+- passed to local exporters; TELEMETRY_EXPORTER=log logs one line per span for dev.
+
+`metrics.render_prometheus()` backs the FastAPI /metrics endpoint.
+"""
+
+import bisect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # optional dependency
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_EXPORTER = os.getenv("TELEMETRY_EXPORTER", "none").lower()
+TELEMETRY_OTEL = os.getenv("TELEMETRY_OTEL", "true").lower() == "true"
+DEFAULT_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in items)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(items, escaped)) + "}"
+
+
+class Histogram:
+    """Fixed-bucket histogram per label set, with quantiles interpolated from the buckets."""
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._series: Dict[LabelKey, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _quantile(self, counts: List[int], total: int, q: float) -> float:
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        return [
+            {
+                "labels": dict(key),
+                "count": count,
+                "sum": round(total, 3),
+                "mean": round(total / count, 3) if count else 0.0,
+                "p50": round(self._quantile(counts, count, 0.50), 3),
+                "p95": round(self._quantile(counts, count, 0.95), 3),
+                "p99": round(self._quantile(counts, count, 0.99), 3),
+            }
+            for key, counts, total, count in series
+        ]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines.extend(f"{self.name}{_format_labels(key)} {value:g}" for key, value in self._values.items())
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS_MS) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, description, buckets)
+            return self._metrics[name]
+
+    def counter(self, name: str, description: str) -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, description)
+            return self._metrics[name]
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+metrics = MetricsRegistry()
+span_duration = metrics.histogram("span_duration_ms", "Duration of traced stages in milliseconds")
+llm_tokens = metrics.histogram("llm_tokens", "Tokens per LLM call", TOKEN_BUCKETS)
+http_response_bytes = metrics.histogram("http_client_response_bytes", "Upstream response body size",
+                                        BYTES_BUCKETS)
+http_requests = metrics.counter("http_client_requests_total", "Upstream HTTP requests by host and status")
+
+
+class Span:
+    """A timed operation with attributes; ended spans are recorded and exported."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_time", "end_time", "attributes",
+                 "status", "_start", "_otel")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "ok"
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self._start = time.perf_counter()
+        self._otel = None
+        if otel_trace is not None and TELEMETRY_OTEL:
+            parent_context = otel_trace.set_span_in_context(parent._otel) if parent is not None and parent._otel \
+                else None
+            self._otel = otel_trace.get_tracer(__name__).start_span(name, context=parent_context)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_time if self.end_time is not None else time.time()
+        return (end - self.start_time) * 1000
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException):
+        self.status = "error"
+        self.attributes["error.type"] = type(error).__name__
+
+    def end(self):
+        if self.end_time is not None:
+            return
+        self.end_time = self.start_time + (time.perf_counter() - self._start)
+        span_duration.observe(self.duration_ms, span=self.name, name=self.attributes.get("name", ""))
+        if self._otel is not None:
+            for key, value in self.attributes.items():
+                if isinstance(value, (str, bool, int, float)):
+                    self._otel.set_attribute(key, value)
+            if self.status == "error":
+                self._otel.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR))
+            self._otel.end()
+        for exporter in list(_exporters):
+            try:
+                exporter(self)
+            except Exception:
+                logger.exception("Span exporter failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_exporters: List[Callable[[Span], None]] = []
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def start_span(span_name: str, /, parent: Optional[Span] = None, **attributes) -> Span:
+    """Start a span under `parent` (default: the current span) without making it current."""
+    return Span(span_name, parent if parent is not None else _current_span.get(), attributes)
+
+
+def activate(span: Optional[Span]):
+    """Make `span` current; returns a token for deactivate()."""
+    return _current_span.set(span)
+
+
+def deactivate(token):
+    _current_span.reset(token)
+
+
+@contextmanager
+def span(span_name: str, /, **attributes) -> Iterator[Span]:
+    """Run a block as a child span of the current one. The `name` attribute labels its histogram series."""
+    current = start_span(span_name, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def add_span_exporter(exporter: Callable[[Span], None]):
+    _exporters.append(exporter)
+
+
+def remove_span_exporter(exporter: Callable[[Span], None]):
+    if exporter in _exporters:
+        _exporters.remove(exporter)
+
+
+def log_span_exporter(finished: Span):
+    """Dev exporter: one JSON line per finished span on the `utils.telemetry` logger."""
+    logger.info("span %s", json.dumps(finished.to_dict(), default=str))
+
+
+class InMemorySpanExporter:
+    """Keeps the most recent finished spans, for tests and local inspection."""
+
+    def __init__(self, max_spans: int = 1000):
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+
+    def __call__(self, finished: Span):
+        self.spans.append(finished)
+
+    def by_name(self, name: str) -> List[Span]:
+        return [s for s in self.spans if s.name == name]
+
+
+if TELEMETRY_EXPORTER == "log":
+    add_span_exporter(log_span_exporter)
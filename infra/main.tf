@@ -127,6 +127,8 @@ resource "azurerm_linux_function_app" "function_app" {
     "GOOGLE_CLIENT_SECRET" = "@Microsoft.KeyVault(VaultName=${module.keyvault.keyvault_name};SecretName=${azurerm_key_vault_secret.google_client_secret.name})"
     "KEYVAULT_NAME"        = module.keyvault.keyvault_name
     "DEEPSEEK_API_KEY"     = "@Microsoft.KeyVault(VaultName=${module.keyvault.keyvault_name};SecretName=${azurerm_key_vault_secret.deepseek_api_key.name})"
+    # Required by azurefunctions-extensions-http-fastapi for the streaming ChatStream function
+    "PYTHON_ENABLE_INIT_INDEXING" = "1"
   }
 }
 